@@ -1,3 +1,6 @@
+import time
+_SCRIPT_T0 = time.perf_counter()
+
 import os
 import sys
 from pathlib import Path
@@ -12,13 +15,26 @@ import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient, models
-from sentence_transformers import SentenceTransformer
+
+# Avant les composants : services.py (importé aussi par fragments.py) lit COLLECTION_NAME, qdrant_helpers APP_CACHE_DIR
+load_dotenv()
 
 # Import custom components
 from search import render_search_page
 from analytics import render_analytics_page
-
-load_dotenv()
+from qdrant_helpers import resolve_alias, CACHE_DIR
+from embedding_cache import EmbeddingCache, CachedEmbedder
+from lazy_embedder import LazyEmbedder
+from posters import PosterResolver, PosterCache
+from result_grid import hit_tmdb_ids, result_records, grid_html, summary_frame
+from fragments import section, record_section_run, render_section_report
+
+# Fonctions d'accès Qdrant (sans Streamlit), cf. services.py
+from services import (
+    COLLECTION_NAME, get_telemetry, get_duplicate_index, reset_resources, list_known_genres, search_semantic_paged, search_semantic_more,
+    analytics_counts_by_genre, analytics_decade_mean_vote, analytics_snapshot, analytics_distributions, analytics_top_movies, similar_movies,
+)
+_IMPORTS_S = time.perf_counter() - _SCRIPT_T0
 
 # ----------------------------
 # Config & Styling
@@ -78,46 +94,6 @@ st.markdown("""
         font-weight: 600;
     }
 
-    /* --- NOUVEAU : style pour les cartes de résultats --- */
-    .result-card {
-        display: flex;
-        gap: 16px;
-        padding: 12px;
-        background: #ffffff;
-        border-radius: 10px;
-        box-shadow: 0 6px 18px rgba(20,30,60,0.06);
-        align-items: flex-start;
-        margin-bottom: 12px;
-        border: 1px solid rgba(0,0,0,0.03);
-    }
-    .result-card img {
-        width: 140px;
-        height: 210px;
-        object-fit: cover;
-        border-radius: 6px;
-        flex-shrink: 0;
-        box-shadow: 0 4px 10px rgba(0,0,0,0.06);
-    }
-    .result-card .info {
-        flex: 1;
-        display: flex;
-        flex-direction: column;
-        gap: 6px;
-    }
-    .result-card .title {
-        font-size: 1.05rem;
-        font-weight: 700;
-        margin: 0;
-    }
-    .result-card .meta {
-        color: #556677;
-        font-size: 0.95rem;
-    }
-    .result-card .score {
-        margin-top: 6px;
-        font-weight: 600;
-        color: #0b6df6;
-    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -126,7 +102,6 @@ st.markdown("""
 # ----------------------------
 QDRANT_URL = os.getenv("QDRANT_URL", "").strip()
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "").strip()
-COLLECTION_NAME = os.getenv("COLLECTION_NAME", "tmdb_movies").strip()
 
 @st.cache_resource
 def get_client(url: str, api_key: str) -> QdrantClient:
@@ -134,14 +109,33 @@ def get_client(url: str, api_key: str) -> QdrantClient:
         raise RuntimeError("QDRANT_URL et/ou QDRANT_API_KEY manquants.")
     return QdrantClient(url=url, api_key=api_key, prefer_grpc=False, timeout=30.0)
 
+EMBEDDER_WARMUP = os.getenv("EMBEDDER_WARMUP", "1").strip() not in ("0", "false", "no")
+
 @st.cache_resource
 def get_embedder(name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-    return SentenceTransformer(name)
+    # Modèle chargé à la première recherche (ou en arrière-plan si EMBEDDER_WARMUP), cf. lazy_embedder.py
+    model = LazyEmbedder(name)
+    if EMBEDDER_WARMUP:
+        model.start_warmup()
+    # Les embeddings de requêtes sont mis en cache (LRU mémoire + disque), cf. embedding_cache.py
+    cache = EmbeddingCache(name, directory=CACHE_DIR / "embeddings")
+    return CachedEmbedder(model, name, cache)
+
+@st.cache_resource
+def get_startup_metrics() -> Dict[str, Optional[float]]:
+    # Mesures du premier passage du script dans ce process (les reruns ne ré-importent rien)
+    return {"imports_s": _IMPORTS_S, "first_render_s": None}
 
 # --- NOUVEAU: clé TMDB lue depuis .env
 TMDB_API_KEY = os.getenv("TMDB_API_KEY", "").strip()
 
+@st.cache_resource
+def get_poster_resolver(token: str) -> PosterResolver:
+    # Résolution par lots, en parallèle, avec cache SQLite persistant (cf. posters.py)
+    return PosterResolver(token, PosterCache(CACHE_DIR / "posters.sqlite"), max_workers=8)
+
 # --- NOUVEAU: utilitaire TMDB pour récupérer l'URL du poster (cache)
+# Utilisé seulement pour les résultats sans tmdb_id (recherche par titre)
 @st.cache_data(ttl=3600)
 def get_tmdb_poster_url(tmdb_id: Optional[Any], title: Optional[str]) -> Optional[str]:
     """
@@ -195,110 +189,9 @@ def get_tmdb_poster_url(tmdb_id: Optional[Any], title: Optional[str]) -> Optiona
 
     return None
 
-def to_year(date_str: Optional[str]) -> Optional[int]:
-    if not date_str or not isinstance(date_str, str) or len(date_str) < 4:
-        return None
-    try:
-        return int(date_str[:4])
-    except:
-        return None
-
-def to_decade(year: Optional[int]) -> Optional[int]:
-    return (year // 10) * 10 if year is not None else None
-
-# ----------------------------
-# Qdrant Helper Functions
-# ----------------------------
-def q_count(client: QdrantClient, filter_: Optional[models.Filter]) -> int:
-    res = client.count(collection_name=COLLECTION_NAME, count_filter=filter_, exact=True)
-    return res.count
-
-def fetch_payloads(client: QdrantClient, filter_: Optional[models.Filter] = None, page_size: int = 2000, limit_total: Optional[int] = None) -> List[Dict[str, Any]]:
-    results: List[Dict[str, Any]] = []
-    next_offset = None
-    fetched = 0
-    while True:
-        points, next_offset = client.scroll(
-            collection_name=COLLECTION_NAME,
-            scroll_filter=filter_,
-            with_vectors=False,
-            with_payload=True,
-            limit=page_size,
-            offset=next_offset
-        )
-        if not points:
-            break
-        for p in points:
-            results.append(p.payload or {})
-            fetched += 1
-            if limit_total is not None and fetched >= limit_total:
-                return results
-        if next_offset is None:
-            break
-    return results
-
-def list_known_genres(client: QdrantClient, sample:int=8000) -> List[str]:
-    # Scroll a sample and extract unique genres from payloads
-    points, _ = client.scroll(
-        collection_name=COLLECTION_NAME,
-        scroll_filter=None,
-        with_vectors=False,
-        with_payload=True,
-        limit=sample
-    )
-    genres = set()
-    for p in points:
-        for g in (p.payload or {}).get("genres", []):
-            if isinstance(g, str) and g:
-                genres.add(g)
-    return sorted(genres)
-
-def search_semantic(client: QdrantClient, query: str, top_k: int, embedder, genres: List[str], year_min: Optional[int], year_max: Optional[int]) -> List[models.ScoredPoint]:
-    qvec = embedder.encode([query], normalize_embeddings=True)[0].tolist()
-    filter_obj = None
-    if genres:
-        should = [models.FieldCondition(key="genres", match=models.MatchValue(value=g)) for g in genres]
-        filter_obj = models.Filter(should=should)  # OR logique sur les genres sélectionnés
-
-    hits = client.search(
-        collection_name=COLLECTION_NAME,
-        query_vector=qvec,
-        limit=top_k,
-        with_payload=True,
-        query_filter=filter_obj
-    )
-
-    # Local post-filter on release_date string
-    if (year_min is not None or year_max is not None):
-        filtered = []
-        for h in hits:
-            y = to_year((h.payload or {}).get("release_date"))
-            if year_min is not None and (y is None or y < year_min): 
-                continue
-            if year_max is not None and (y is None or y > year_max): 
-                continue
-            filtered.append(h)
-        return filtered
-    return hits
-
-def analytics_counts_by_genre(client: QdrantClient, genres: List[str]) -> pd.DataFrame:
-    rows = []
-    for g in genres:
-        f = models.Filter(must=[models.FieldCondition(key="genres", match=models.MatchValue(value=g))])
-        rows.append({"genre": g, "count": q_count(client, f)})
-    return pd.DataFrame(rows).sort_values("count", ascending=False)
-
-def analytics_decade_mean_vote(client: QdrantClient, decades: List[int]) -> pd.DataFrame:
-    rows = []
-    for d in decades:
-        payloads = fetch_payloads(client, None)
-        payloads = [p for p in payloads if to_year(p.get("release_date")) and d <= to_year(p.get("release_date")) <= d+9]
-        vals = [float(p.get("vote_average", 0) or 0) for p in payloads if p.get("vote_average") is not None]
-        mean_vote = (sum(vals)/len(vals)) if vals else np.nan
-        rows.append({"decade": d, "mean_vote": mean_vote, "n": len(vals)})
-    return pd.DataFrame(rows).sort_values("decade")
-
 # --- CHANGEMENT: définir render_search_with_posters ICI (avant la sidebar / routage) ---
+# Fragment : les widgets de la recherche ne relancent que cette section (cf. fragments.py)
+@section("Recherche")
 def render_search_with_posters(client: QdrantClient, embedder):
     """
     Affiche l'interface de recherche avec affiches TMDB :
@@ -332,64 +225,139 @@ def render_search_with_posters(client: QdrantClient, embedder):
     y_min_val = int(year_min) if use_min else None
     y_max_val = int(year_max) if use_max else None
 
+    # Proposé seulement si duplicates.py a été lancé sur la collection
+    duplicates = get_duplicate_index(COLLECTION_NAME)
+    collapse = False
+    if duplicates:
+        collapse = st.checkbox(
+            "Masquer les quasi-doublons", value=True,
+            help=f"{len(duplicates)} groupes de films quasi identiques (cosinus ≥ {duplicates.meta.get('threshold')}) : seul le mieux classé de chaque groupe est affiché."
+        )
+    min_score = st.slider("Score minimum (0 = sans seuil)", min_value=0.0, max_value=1.0, value=0.0, step=0.05)
+
     if st.button("Rechercher"):
+        telemetry = get_telemetry()
+        timings: Dict[str, float] = {}
+        t_start = time.perf_counter()
         with st.spinner("Recherche sémantique en cours..."):
-            hits = search_semantic(client, query, top_k, embedder, sel_genres, y_min_val, y_max_val)
+            hits, cursor = search_semantic_paged(
+                client, query, int(top_k), embedder, sel_genres, y_min_val, y_max_val,
+                score_threshold=min_score or None, timings=timings, collapse_duplicates=collapse
+            )
+        # Derniers résultats gardés dans la session : ils restent affichés quand on clique « Films similaires »
+        # ou « Plus de résultats » ; le curseur garde le vecteur de la requête et les filtres
+        st.session_state["search_hits"] = hits
+        st.session_state["search_cursor"] = cursor
+        for key in ("similar_to", "res_similar", "sim_similar"):
+            st.session_state.pop(key, None)
+        if hits:
+            st.markdown("### Résultats")
+            render_result_cards(hits, timings, key_prefix="res", t_start=t_start)
+        timings["search_total"] = (time.perf_counter() - t_start) * 1000
+        telemetry.observe("search_total", timings["search_total"])
+        telemetry.record_event("Recherche", query[:80], len(hits), timings)
         if not hits:
             st.warning("Aucun résultat avec ces filtres.")
             return
-
-        rows = []
+    elif st.session_state.get("search_hits"):
         st.markdown("### Résultats")
-        # Cards grid (remplacement du rendu précédent par HTML + CSS)
-        for idx, h in enumerate(hits, 1):
-            p = h.payload or {}
-            title = p.get("title") or p.get("name") or "N/A"
-            tmdb_id = p.get("tmdb_id") or p.get("tmdbId") or p.get("id")
-            poster_url = get_tmdb_poster_url(tmdb_id, title) if TMDB_API_KEY else None
-
-            # Construire HTML de la carte (image réduite + bloc info)
-            if poster_url:
-                img_tag = f'<img src="{poster_url}" alt="poster" />'
-            else:
-                # petite placeholder grise (inline) pour garder alignement
-                img_tag = '<div style="width:140px;height:210px;background:#f0f2f5;border-radius:6px;display:inline-block"></div>'
-
-            genres = ", ".join(p.get("genres", []))
-            release = p.get("release_date", "N/A")
-            vote = p.get("vote_average", "N/A")
-            popularity = p.get("popularity", "N/A")
-            score = round(h.score or 0, 4)
-
-            card_html = f"""
-            <div class="result-card">
-                {img_tag}
-                <div class="info">
-                    <div class="title">{idx}. {title}</div>
-                    <div class="meta">Date: {release} &nbsp;•&nbsp; Genres: {genres}</div>
-                    <div class="meta">Note: {vote} &nbsp;•&nbsp; Popularité: {popularity}</div>
-                    <div class="score">Score (search): {score}</div>
-                </div>
-            </div>
-            """
-            st.markdown(card_html, unsafe_allow_html=True)
-            st.divider()
-
-            rows.append({
-                "title": title,
-                "release_date": release,
-                "genres": genres,
-                "vote_average": vote,
-                "popularity": popularity,
-                "score": score,
-                "poster_url": poster_url
-            })
+        render_result_cards(st.session_state["search_hits"], {}, key_prefix="res")
+
+    cursor = st.session_state.get("search_cursor")
+    if st.session_state.get("search_hits") and cursor is not None and (cursor["buffer"] or not cursor["exhausted"]):
+        st.button("Plus de résultats", on_click=_load_more_results, args=(client, embedder))
+
+    similar_to = st.session_state.get("similar_to")
+    if similar_to:
+        timings = {}
+        with st.spinner("Recherche de films similaires..."):
+            similar_hits = similar_movies(client, similar_to["id"], int(top_k), timings=timings)
+        st.markdown(f"### Films similaires à « {similar_to['title']} »")
+        if similar_hits:
+            render_result_cards(similar_hits, timings, key_prefix="sim", score_label="similarité")
+        else:
+            st.info("Aucun film similaire trouvé.")
+        get_telemetry().record_event("Similaires", similar_to["title"][:80], len(similar_hits), timings)
+
+def _load_more_results(client: QdrantClient, embedder):
+    # Page suivante : ni ré-encodage de la requête (encodée au plus une fois), ni re-téléchargement des pages déjà affichées
+    cursor = st.session_state.get("search_cursor")
+    if cursor is None:
+        return
+    timings: Dict[str, float] = {}
+    t_start = time.perf_counter()
+    more = search_semantic_more(client, cursor, timings=timings, embedder=embedder)
+    st.session_state["search_hits"] = st.session_state.get("search_hits", []) + more
+    timings["search_total"] = (time.perf_counter() - t_start) * 1000
+    get_telemetry().record_event("Recherche (suite)", f"{cursor['query'][:70]} (page {cursor['pages']})", len(more), timings)
+
+def _show_similar(point_id: int, title: str):
+    st.session_state["similar_to"] = {"id": point_id, "title": title}
+
+def _similar_selected(key: str, titles: Dict[Any, str]):
+    point_id = st.session_state.get(key)
+    if point_id is not None:
+        _show_similar(point_id, titles.get(point_id, str(point_id)))
+
+def render_result_cards(hits: List[Any], timings: Dict[str, float], key_prefix: str, score_label: str = "search", t_start: Optional[float] = None):
+    """
+    Grille de résultats en un seul bloc HTML (vignettes srcset chargées à
+    l'affichage, cf. result_grid.py), choix « Films similaires » et tableau
+    récapitulatif construit à partir des mêmes enregistrements. Si `t_start`
+    est donné, le temps jusqu'à l'envoi de la grille est mesuré (first_result).
+    """
+    telemetry = get_telemetry()
+    # Affiches de tous les résultats résolues en un seul lot
+    with telemetry.span("posters", timings):
+        hit_ids = hit_tmdb_ids(hits)
+        paths = get_poster_resolver(TMDB_API_KEY).resolve_paths([i for i in hit_ids if i]) if TMDB_API_KEY else {}
+    with telemetry.span("render", timings):
+        records = result_records(hits, paths, _title_poster_path if TMDB_API_KEY else None)
+        st.html(grid_html(records, score_label))
+        if t_start is not None:
+            timings["first_result"] = (time.perf_counter() - t_start) * 1000
+            telemetry.observe("first_result", timings["first_result"])
+
+        titles = {r["id"]: r["title"] for r in records}
+        st.selectbox(
+            "Films similaires à…", list(titles), index=None, placeholder="Choisir un film",
+            format_func=lambda i: titles.get(i, str(i)), key=f"{key_prefix}_similar",
+            on_change=_similar_selected, args=(f"{key_prefix}_similar", titles)
+        )
 
         # Dataframe récapitulatif en dessous
-        if rows:
-            df = pd.DataFrame(rows)
+        if records:
             st.markdown("### Tableau récapitulatif")
-            st.dataframe(df, use_container_width=True)
+            st.dataframe(summary_frame(records), use_container_width=True)
+
+def _title_poster_path(title: str) -> Optional[str]:
+    # Résultats sans tmdb_id : recherche TMDB par titre (URL w342 en cache), réduite au poster_path
+    url = get_tmdb_poster_url(None, title)
+    return "/" + url.rsplit("/", 1)[-1] if url else None
+
+@section("Activité")
+def render_activity():
+    """Journal et latences par étape (fragment : « Rafraîchir » ne relance pas la page)"""
+    telemetry = get_telemetry()
+    st.markdown("Activité récente")
+    st.button("Rafraîchir", key="activity_refresh")
+    activity_data = [
+        {"Timestamp": e["ts"], "Action": e["action"], "Détails": e["details"], "Résultats": e["results"], "Durée (ms)": (e.get("timings") or {}).get("search_total")}
+        for e in telemetry.recent_events(20)
+    ]
+    if activity_data:
+        st.dataframe(pd.DataFrame(activity_data), use_container_width=True)
+    else:
+        st.caption("Aucune activité enregistrée pour l'instant.")
+
+    # Latences par étape (histogrammes en mémoire, depuis le démarrage + journal)
+    stages = telemetry.stage_summary()
+    if stages:
+        st.markdown("Latences par étape")
+        st.dataframe(pd.DataFrame([
+            {"Étape": stage, "Mesures": h["count"], "p50 (ms)": h["p50_ms"], "p95 (ms)": h["p95_ms"], "p99 (ms)": h["p99_ms"]}
+            for stage, h in stages.items()
+        ]).round(1), use_container_width=True)
 
 # ----------------------------
 # Admin Sidebar
@@ -421,13 +389,29 @@ with st.sidebar:
         client = get_client(QDRANT_URL, QDRANT_API_KEY)
         embedder = get_embedder()
         st.success("Qdrant connecté")
-        st.success("Embedder prêt")
+        model_status = embedder.model.status()
+        if model_status["state"] == "chargé":
+            st.success(f"Embedder prêt ({model_status['import_seconds'] + model_status['load_seconds']:.1f}s)")
+        elif model_status["state"] == "erreur":
+            st.warning("Embedder : " + (model_status["error"] or "erreur")[:80])
+        else:
+            st.info(f"Embedder {model_status['state']}")
+        cache_stats = embedder.cache.summary()
+        st.caption(f"Cache embeddings : {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits / {cache_stats['misses']} miss")
         collection_info = client.get_collection(COLLECTION_NAME)
         st.metric("Documents", f"{collection_info.points_count:,}")
+        # Version servie par l'alias (réindexation blue/green, cf. reindex.py)
+        served_version = resolve_alias(client, COLLECTION_NAME)
+        if served_version:
+            st.caption(f"Version : {served_version}")
     except Exception as e:
         st.error("Erreur connexion")
         st.error(str(e)[:80])
         st.stop()
+    startup = get_startup_metrics()
+    if startup["first_render_s"] is None:
+        startup["first_render_s"] = time.perf_counter() - _SCRIPT_T0
+    st.caption(f"Démarrage : {startup['first_render_s'] * 1000:.0f} ms (imports {startup['imports_s'] * 1000:.0f} ms)")
     st.markdown("---")
     st.caption("v1.2.0 - Admin Dashboard")
 
@@ -447,10 +431,17 @@ if current_page == "dashboard":
     with col2:
         genres_count = len(list_known_genres(client))
         st.metric("Genres", genres_count, delta=f"{genres_count-20} vs standard")
+    telemetry = get_telemetry()
+    searches_today = telemetry.count_for_day("Recherche")
+    searches_yesterday = telemetry.count_for_day("Recherche", days_ago=1)
+    latency = telemetry.stage_summary().get("search_total", {})
     with col3:
-        st.metric("Recherches/jour", "1,247", delta="+15.2%")
+        st.metric("Recherches aujourd'hui", f"{searches_today:,}", delta=f"{searches_today - searches_yesterday:+d} vs hier")
     with col4:
-        st.metric("Latence moy.", "45ms", delta="-12ms")
+        if latency.get("count"):
+            st.metric("Latence p50", f"{latency['p50_ms']:.0f}ms", delta=f"p95 {latency['p95_ms']:.0f}ms · p99 {latency['p99_ms']:.0f}ms", delta_color="off")
+        else:
+            st.metric("Latence p50", "—")
     
     st.markdown("---")
     # Quick actions (libellés sans emoji)
@@ -466,24 +457,21 @@ if current_page == "dashboard":
             st.rerun()
     with col3:
         if st.button("Actualiser cache", use_container_width=True):
+            # Caches Streamlit et ressources partagées de services.py (miroir, instantané, index...)
             st.cache_resource.clear()
+            reset_resources()
             st.success("Cache actualisé")
     # Recent activity
     st.markdown("---")
-    st.markdown("Activité récente")
-    activity_data = [
-        {"Timestamp": "2024-01-15 14:30", "Action": "Recherche", "Détails": "science-fiction futuriste", "Résultats": 15},
-        {"Timestamp": "2024-01-15 14:25", "Action": "Analytics", "Détails": "Genre: Action", "Résultats": 1247},
-        {"Timestamp": "2024-01-15 14:20", "Action": "Recherche", "Détails": "comédie romantique", "Résultats": 23},
-    ]
-    st.dataframe(pd.DataFrame(activity_data), use_container_width=True)
+    render_activity()
+    render_section_report()
 
 elif current_page == "search":
     # Utilise la version locale qui affiche les affiches TMDB
     render_search_with_posters(client, embedder)
 
 elif current_page == "analytics":
-    render_analytics_page(client, list_known_genres, analytics_counts_by_genre, analytics_decade_mean_vote)
+    render_analytics_page(client, list_known_genres, analytics_counts_by_genre, analytics_decade_mean_vote, analytics_snapshot, analytics_distributions, analytics_top_movies)
 
 # Footer (sans emojis)
 st.markdown("---")
@@ -495,6 +483,9 @@ with col2:
 with col3:
     st.caption("Dernière MAJ: 15/01/2024")
 
+# Passage complet du script (les reruns de fragments ne l'exécutent pas), cf. fragments.py
+record_section_run("Script complet", (time.perf_counter() - _SCRIPT_T0) * 1000)
+
 # Handle navigation overrides
 if 'nav_override' in st.session_state:
     if st.session_state['nav_override'] == 'search':
@@ -0,0 +1,167 @@
+from bisect import bisect_right
+from typing import List, Dict, Any, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from qdrant_client import QdrantClient
+
+from qdrant_helpers import to_year, iter_payload_pages
+
+
+class _Bucket:
+    """Accumulateur d'une décennie (ou d'un couple décennie/genre)."""
+
+    __slots__ = ("count", "n", "total", "vmin", "vmax")
+
+    def __init__(self):
+        self.count = 0      # films dont l'année tombe dans la décennie
+        self.n = 0          # films avec un vote_average renseigné
+        self.total = 0      # somme des votes (même ordre que sum() sur la liste)
+        self.vmin = None
+        self.vmax = None
+
+    def add(self, vote: Optional[float]):
+        self.count += 1
+        if vote is None:
+            return
+        self.n += 1
+        self.total += vote
+        if self.vmin is None or vote < self.vmin:
+            self.vmin = vote
+        if self.vmax is None or vote > self.vmax:
+            self.vmax = vote
+
+    def row(self) -> Dict[str, Any]:
+        return {
+            "mean_vote": (self.total / self.n) if self.n else np.nan,
+            "n": self.n,
+            "count": self.count,
+            "min_vote": self.vmin if self.vmin is not None else np.nan,
+            "max_vote": self.vmax if self.vmax is not None else np.nan,
+        }
+
+
+class DecadeAggregator:
+    """
+    Remplit tous les buckets de décennies en un seul passage sur les payloads.
+
+    Chaque décennie `d` couvre les années `d..d+9` (les décennies peuvent se
+    chevaucher, un film est alors compté dans chacune). Les règles reprennent
+    celles de l'ancienne boucle : année lue via `to_year` (une année nulle est
+    ignorée), vote lu via `float(vote_average or 0)` quand il n'est pas None.
+    """
+
+    def __init__(self, decades: List[int]):
+        self.decades = list(decades)
+        self._starts = sorted(set(self.decades))
+        self._buckets: Dict[int, _Bucket] = {d: _Bucket() for d in self._starts}
+        self._genre_buckets: Dict[int, Dict[str, _Bucket]] = {d: {} for d in self._starts}
+
+    def _matching_decades(self, year: int) -> List[int]:
+        # Décennies d telles que d <= year <= d+9
+        hi = bisect_right(self._starts, year)
+        lo = bisect_right(self._starts, year - 10)
+        return self._starts[lo:hi]
+
+    def add(self, payload: Dict[str, Any]):
+        year = to_year(payload.get("release_date"))
+        if not year:
+            return
+        matches = self._matching_decades(year)
+        if not matches:
+            return
+        raw = payload.get("vote_average")
+        vote = float(raw or 0) if raw is not None else None
+        genres = [g for g in (payload.get("genres") or []) if isinstance(g, str) and g]
+        for d in matches:
+            self._buckets[d].add(vote)
+            per_genre = self._genre_buckets[d]
+            for g in genres:
+                bucket = per_genre.get(g)
+                if bucket is None:
+                    bucket = per_genre[g] = _Bucket()
+                bucket.add(vote)
+
+    def add_many(self, payloads: Iterable[Dict[str, Any]]):
+        for p in payloads:
+            self.add(p)
+
+    def decade_frame(self) -> pd.DataFrame:
+        """Une ligne par décennie demandée (doublons conservés), triée par décennie."""
+        rows = [{"decade": d, **self._buckets[d].row()} for d in self.decades]
+        columns = ["decade", "mean_vote", "n", "count", "min_vote", "max_vote"]
+        return pd.DataFrame(rows, columns=columns).sort_values("decade")
+
+    def genre_frame(self) -> pd.DataFrame:
+        """Les mêmes statistiques par couple (décennie, genre)."""
+        rows = []
+        for d in self._starts:
+            for g, bucket in self._genre_buckets[d].items():
+                rows.append({"decade": d, "genre": g, **bucket.row()})
+        columns = ["decade", "genre", "mean_vote", "n", "count", "min_vote", "max_vote"]
+        return pd.DataFrame(rows, columns=columns).sort_values(["decade", "genre"]).reset_index(drop=True)
+
+
+def aggregate_decades(client: QdrantClient, collection_name: str, decades: List[int], page_size: int = 2000) -> DecadeAggregator:
+    """Parcourt la collection une seule fois et rend l'agrégateur rempli."""
+    agg = DecadeAggregator(decades)
+    for page in iter_payload_pages(client, collection_name, None, page_size=page_size):
+        agg.add_many(page)
+    return agg
+
+
+# ----------------------------
+# Version vectorisée (DataFrame de columnar.fetch_frame)
+# ----------------------------
+def _ordered_sum(votes: pd.Series) -> float:
+    # Somme Python dans l'ordre des lignes (= ordre du scroll) : bit à bit la même que _Bucket.total,
+    # là où Series.sum (sommation par paires) peut différer de quelques ulp
+    return sum(votes.dropna().tolist())
+
+def _stats(frame: pd.DataFrame) -> Dict[str, Any]:
+    votes = frame["vote_average"]
+    n = int(votes.notna().sum())
+    return {
+        "mean_vote": float(_ordered_sum(votes) / n) if n else np.nan,
+        "n": n,
+        "count": int(len(frame)),
+        "min_vote": float(votes.min()) if n else np.nan,
+        "max_vote": float(votes.max()) if n else np.nan,
+    }
+
+def _decade_rows(frame: pd.DataFrame, decade: int) -> pd.DataFrame:
+    years = frame["year"]
+    # Mêmes règles que DecadeAggregator : année nulle ignorée, d <= année <= d+9
+    mask = years.notna() & (years != 0) & (years >= decade) & (years <= decade + 9)
+    return frame[mask.fillna(False).to_numpy(dtype=bool)]
+
+def decade_frame_from(frame: pd.DataFrame, decades: List[int]) -> pd.DataFrame:
+    """Même résultat que `DecadeAggregator.decade_frame()`, calculé par masques sur les colonnes year / vote_average."""
+    stats = {d: _stats(_decade_rows(frame, d)) for d in sorted(set(decades))}
+    rows = [{"decade": d, **stats[d]} for d in decades]
+    columns = ["decade", "mean_vote", "n", "count", "min_vote", "max_vote"]
+    return pd.DataFrame(rows, columns=columns).sort_values("decade")
+
+def genre_frame_from(frame: pd.DataFrame, decades: List[int]) -> pd.DataFrame:
+    """Même résultat que `DecadeAggregator.genre_frame()` (nécessite la colonne genres)."""
+    parts = []
+    for d in sorted(set(decades)):
+        sub = _decade_rows(frame, d)[["genres", "vote_average"]]
+        exploded = sub.assign(genres=sub["genres"].map(lambda gs: [g for g in (gs or []) if isinstance(g, str) and g])).explode("genres")
+        exploded = exploded[exploded["genres"].notna()]
+        if exploded.empty:
+            continue
+        grouped = exploded.groupby("genres", sort=False)["vote_average"].agg([_ordered_sum, "count", "size", "min", "max"])
+        parts.append(pd.DataFrame({
+            "decade": d,
+            "genre": grouped.index.astype(str),
+            "mean_vote": (grouped["_ordered_sum"] / grouped["count"]).where(grouped["count"] > 0),
+            "n": grouped["count"].astype(int),
+            "count": grouped["size"].astype(int),
+            "min_vote": grouped["min"],
+            "max_vote": grouped["max"],
+        }).reset_index(drop=True))
+    columns = ["decade", "genre", "mean_vote", "n", "count", "min_vote", "max_vote"]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts, ignore_index=True)[columns].sort_values(["decade", "genre"]).reset_index(drop=True)
@@ -4,8 +4,24 @@ import plotly.graph_objects as go
 from typing import List
 from qdrant_client import QdrantClient
 
-def render_analytics_page(client: QdrantClient, list_known_genres_func, analytics_counts_by_genre_func, analytics_decade_mean_vote_func):
+from fragments import section
+from qdrant_helpers import resolve_alias
+from services import COLLECTION_NAME
+
+def _format_age(seconds) -> str:
+    if seconds is None:
+        return "jamais"
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+def render_analytics_page(client: QdrantClient, list_known_genres_func, analytics_counts_by_genre_func, analytics_decade_mean_vote_func, analytics_snapshot_func=None, analytics_distributions_func=None, analytics_top_movies_func=None):
     """Rendu de la page d'analytics"""
+    # Snapshot matérialisé des agrégats (optionnel) : rafraîchi si la collection a changé
+    snapshot = analytics_snapshot_func(client) if analytics_snapshot_func else None
+    snapshot_status = snapshot.status() if snapshot is not None else None
     
     # Header with KPIs (icons via Material Icons)
     st.markdown('<h3><span class="material-icons" style="vertical-align:middle">insights</span>&nbsp; Analytics Dashboard</h3>', unsafe_allow_html=True)
@@ -14,95 +30,173 @@ def render_analytics_page(client: QdrantClient, list_known_genres_func, analytic
     # KPI Cards
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total films", "Chargement...", delta="Base Qdrant")
+        if snapshot_status is not None:
+            st.metric("Total films", f"{snapshot_status['points']:,}", delta="Snapshot local")
+        else:
+            st.metric("Total films", "Chargement...", delta="Base Qdrant")
     with col2:
         st.metric("Genres", len(list_known_genres_func(client)))
     with col3:
         st.metric("Période", "1900-2024")
     with col4:
-        st.metric("Mise à jour", "En temps réel")
+        if snapshot_status is not None:
+            st.metric("Mise à jour", f"il y a {_format_age(snapshot_status['age_seconds'])}")
+        else:
+            st.metric("Mise à jour", "En temps réel")
     
     st.markdown("---")
     
     # Genre Analysis Section
     st.markdown("#### Analyse par genre")
     
-    tabs = st.tabs(["Distribution"])
-    with tabs[0]:
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.markdown("**Paramètres**")
-            all_genres = list_known_genres_func(client)
-            genres_for_count = st.multiselect(
-                "Sélectionnez les genres",
-                options=all_genres,
-                default=all_genres[:8] if len(all_genres) >= 8 else all_genres
-            )
-            
-            chart_type = st.radio("Type de graphique", ["Barres", "Secteurs", "Histogramme"])
-            
-            analyze_clicked = st.button("Analyser", type="primary")
-        
-        with col2:
-            if analyze_clicked and genres_for_count:
-                with st.spinner("Analyse en cours..."):
-                    df_counts = analytics_counts_by_genre_func(client, genres_for_count)
-                
-                if not df_counts.empty:
-                    if chart_type == "Barres":
-                        fig = px.bar(
-                            df_counts, 
-                            x='genre', 
-                            y='count',
-                            title="Distribution des films par genre",
-                            color='count',
-                            color_continuous_scale='plasma'
-                        )
-                        fig.update_layout(xaxis_tickangle=-45)
-                    
-                    elif chart_type == "Secteurs":
-                        fig = px.pie(
-                            df_counts, 
-                            values='count', 
-                            names='genre',
-                            title="Répartition des genres"
-                        )
-                    
-                    else:  # Histogramme
-                        fig = px.histogram(
-                            df_counts, 
-                            x='genre', 
-                            y='count',
-                            title="Histogramme par genre"
-                        )
-                    
-                    st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Data table
-                    st.dataframe(
-                        df_counts,
-                        use_container_width=True,
-                        column_config={
-                            "genre": st.column_config.TextColumn("Genre"),
-                            "count": st.column_config.NumberColumn("Nombre de films", format="%d")
-                        }
-                    )
+    tab_names = ["Distribution"]
+    if snapshot is not None:
+        tab_names.append("Genres × décennies")
+    if analytics_top_movies_func is not None:
+        tab_names.append("Top films")
+    tabs = dict(zip(tab_names, st.tabs(tab_names)))
+    with tabs["Distribution"]:
+        render_genre_distribution(client, list_known_genres_func, analytics_counts_by_genre_func)
+    
+    if "Top films" in tabs:
+        with tabs["Top films"]:
+            render_top_movies(client, list_known_genres_func, analytics_top_movies_func)
+
+    if snapshot is not None:
+        with tabs["Genres × décennies"]:
+            df_gd = snapshot.genre_decade_frame()
+            if not df_gd.empty:
+                heat = df_gd.pivot(index="genre", columns="decade", values="count").fillna(0)
+                fig_heat = px.imshow(
+                    heat,
+                    aspect="auto",
+                    color_continuous_scale="blues",
+                    labels={"x": "Décennie", "y": "Genre", "color": "Films"},
+                    title="Nombre de films par genre et par décennie"
+                )
+                st.plotly_chart(fig_heat, use_container_width=True)
+                st.dataframe(
+                    snapshot.genre_frame(),
+                    use_container_width=True,
+                    column_config={
+                        "genre": st.column_config.TextColumn("Genre"),
+                        "count": st.column_config.NumberColumn("Films", format="%d"),
+                        "n": st.column_config.NumberColumn("Films notés", format="%d"),
+                        "mean_vote": st.column_config.NumberColumn("Note moyenne", format="%.2f"),
+                        "mean_popularity": st.column_config.NumberColumn("Popularité moyenne", format="%.1f"),
+                    }
+                )
     
     st.markdown("---")
     
     # Decade Analysis Section
+    render_decade_trends(client, analytics_decade_mean_vote_func, snapshot_status)
+
+    if analytics_distributions_func is not None:
+        render_distributions(client, analytics_distributions_func)
+
+
+@section("Distribution")
+def render_genre_distribution(client: QdrantClient, list_known_genres_func, analytics_counts_by_genre_func):
+    """Comptage des films par genre (fragment : ses widgets ne relancent que cette section)"""
+    col1, col2 = st.columns([1, 2])
+
+    with col1:
+        st.markdown("**Paramètres**")
+        all_genres = list_known_genres_func(client)
+        genres_for_count = st.multiselect(
+            "Sélectionnez les genres",
+            options=all_genres,
+            default=all_genres[:8] if len(all_genres) >= 8 else all_genres
+        )
+
+        chart_type = st.radio("Type de graphique", ["Barres", "Secteurs", "Histogramme"])
+        approx_counts = st.checkbox("Comptage approximatif (plus rapide)", value=False)
+
+        analyze_clicked = st.button("Analyser", type="primary")
+
+    with col2:
+        # Dernier comptage gardé en session : changer de type de graphique ne le relance pas
+        # Collection physique servie par l'alias : après une bascule ou un rollback, le comptage est à refaire
+        served = resolve_alias(client, COLLECTION_NAME) or COLLECTION_NAME
+        if analyze_clicked and genres_for_count:
+            with st.spinner("Analyse en cours..."):
+                st.session_state["genre_counts"] = {
+                    "genres": list(genres_for_count), "exact": not approx_counts, "collection": served,
+                    "df": analytics_counts_by_genre_func(client, genres_for_count, exact=not approx_counts),
+                }
+        last = st.session_state.get("genre_counts")
+        if last is not None and last.get("collection") != served:
+            st.session_state.pop("genre_counts", None)
+            last = None
+        if last is not None:
+            df_counts = last["df"]
+            if last["genres"] != list(genres_for_count) or last["exact"] != (not approx_counts):
+                st.caption("Paramètres modifiés : cliquer sur « Analyser » pour mettre à jour le comptage.")
+
+            if not df_counts.empty:
+                if chart_type == "Barres":
+                    fig = px.bar(
+                        df_counts, 
+                        x='genre', 
+                        y='count',
+                        title="Distribution des films par genre",
+                        color='count',
+                        color_continuous_scale='plasma'
+                    )
+                    fig.update_layout(xaxis_tickangle=-45)
+
+                elif chart_type == "Secteurs":
+                    fig = px.pie(
+                        df_counts, 
+                        values='count', 
+                        names='genre',
+                        title="Répartition des genres"
+                    )
+
+                else:  # Histogramme
+                    fig = px.histogram(
+                        df_counts, 
+                        x='genre', 
+                        y='count',
+                        title="Histogramme par genre"
+                    )
+
+                st.plotly_chart(fig, use_container_width=True)
+
+                # Data table
+                st.dataframe(
+                    df_counts,
+                    use_container_width=True,
+                    column_config={
+                        "genre": st.column_config.TextColumn("Genre"),
+                        "count": st.column_config.NumberColumn("Nombre de films", format="%d")
+                    }
+                )
+
+
+@section("Évolution temporelle", fragment=False)
+def render_decade_trends(client: QdrantClient, analytics_decade_mean_vote_func, snapshot_status):
+    """Notes et volumes par décennie (sans widget : exécutée seulement aux passages complets du script)"""
     st.markdown("#### Évolution temporelle")
-    
+
     decades = list(range(1960, 2030, 10))
-    
+
     with st.spinner("Calcul des tendances temporelles..."):
         df_dec = analytics_decade_mean_vote_func(client, decades)
-    
+
+    if snapshot_status is not None:
+        last = snapshot_status["last_refresh"]
+        detail = f" ({'incrémental' if last.get('mode') == 'incremental' else 'complet'} : {last.get('scanned', 0):,} points relus en {last.get('ms', 0):.0f} ms)" if last else ""
+        st.caption(
+            f"Calculé depuis le snapshot local, actualisé il y a {_format_age(snapshot_status['age_seconds'])}{detail} ; "
+            f"version de la collection vérifiée il y a {_format_age(snapshot_status['checked_seconds_ago'])}."
+        )
+
     if not df_dec.empty:
         # Charts row
         col1, col2 = st.columns(2)
-        
+
         with col1:
             # Line chart for ratings
             fig_line = px.line(
@@ -116,7 +210,7 @@ def render_analytics_page(client: QdrantClient, list_known_genres_func, analytic
             fig_line.update_layout(yaxis_range=[0, 10])
             fig_line.update_traces(line_color='#FF6B6B', marker_color='#FF6B6B')
             st.plotly_chart(fig_line, use_container_width=True)
-        
+
         with col2:
             # Bar chart for volume
             fig_bar = px.bar(
@@ -129,10 +223,10 @@ def render_analytics_page(client: QdrantClient, list_known_genres_func, analytic
                 color_continuous_scale='blues'
             )
             st.plotly_chart(fig_bar, use_container_width=True)
-        
+
         # Combined view
         fig_combined = go.Figure()
-        
+
         # Add bar chart
         fig_combined.add_trace(go.Bar(
             x=df_dec['decade'],
@@ -142,7 +236,7 @@ def render_analytics_page(client: QdrantClient, list_known_genres_func, analytic
             opacity=0.7,
             marker_color='lightblue'
         ))
-        
+
         # Add line chart
         fig_combined.add_trace(go.Scatter(
             x=df_dec['decade'],
@@ -153,7 +247,7 @@ def render_analytics_page(client: QdrantClient, list_known_genres_func, analytic
             line=dict(color='red', width=3),
             marker=dict(size=8)
         ))
-        
+
         # Update layout for dual y-axis
         fig_combined.update_layout(
             title="Volume vs Qualité par décennie",
@@ -162,13 +256,13 @@ def render_analytics_page(client: QdrantClient, list_known_genres_func, analytic
             yaxis2=dict(title="Note moyenne", side="right", overlaying="y"),
             hovermode='x unified'
         )
-        
+
         st.plotly_chart(fig_combined, use_container_width=True)
-        
+
         # Stats summary
         st.markdown("Résumé statistique")
         col1, col2, col3, col4 = st.columns(4)
-        
+
         with col1:
             st.metric("Décennies", len(df_dec))
         with col2:
@@ -177,4 +271,123 @@ def render_analytics_page(client: QdrantClient, list_known_genres_func, analytic
             best_decade = df_dec.loc[df_dec['mean_vote'].idxmax(), 'decade']
             st.metric("Meilleure décennie", f"{best_decade}s")
         with col4:
-            st.metric("Total analysé", f"{df_dec['n'].sum():,}")    
+            st.metric("Total analysé", f"{df_dec['n'].sum():,}")
+
+
+@section("Top films")
+def render_top_movies(client: QdrantClient, list_known_genres_func, analytics_top_movies_func):
+    """Tops triés par Qdrant (scroll order_by), cf. services.analytics_top_movies"""
+    rankings = {"Plus populaires": "popularity", "Mieux notés": "vote_average", "Plus récents": "recent"}
+    col1, col2 = st.columns([1, 2])
+
+    with col1:
+        st.markdown("**Paramètres**")
+        ranking = st.radio("Classement", list(rankings))
+        n = st.slider("Nombre de films", min_value=5, max_value=50, value=10, step=5)
+        min_votes = st.number_input("Votes minimum", min_value=0, value=100, step=50) if ranking == "Mieux notés" else 0
+        scope = st.radio("Restreindre à", ["Toute la collection", "Une décennie", "Un genre"])
+        decade = st.selectbox("Décennie", list(range(2020, 1900, -10)), format_func=lambda d: f"{d}s") if scope == "Une décennie" else None
+        genre = st.selectbox("Genre", list_known_genres_func(client)) if scope == "Un genre" else None
+
+    with col2:
+        # Classement gardé en session : un passage complet du script (autre section, navigation) ne le recalcule pas,
+        # sauf si l'alias sert une autre collection physique
+        params = (rankings[ranking], int(n), int(min_votes), decade, genre, resolve_alias(client, COLLECTION_NAME) or COLLECTION_NAME)
+        last = st.session_state.get("top_movies")
+        if last is None or last["params"] != params:
+            timings = {}
+            with st.spinner("Chargement du classement..."):
+                df_top = analytics_top_movies_func(client, rankings[ranking], int(n), min_votes=int(min_votes), decade=decade, genre=genre, timings=timings)
+            last = st.session_state["top_movies"] = {"params": params, "df": df_top, "timings": timings}
+        df_top, timings = last["df"], last["timings"]
+        if df_top.empty:
+            hint = " (champ vote_count absent : relancer l'ingestion avec --sync)" if min_votes else ""
+            st.info(f"Aucun film pour ces critères{hint}.")
+            return
+        st.dataframe(
+            df_top.drop(columns=["tmdb_id"]),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "title": st.column_config.TextColumn("Titre"),
+                "release_date": st.column_config.TextColumn("Sortie"),
+                "genres": st.column_config.ListColumn("Genres"),
+                "vote_average": st.column_config.NumberColumn("Note", format="%.1f"),
+                "vote_count": st.column_config.NumberColumn("Votes", format="%d"),
+                "popularity": st.column_config.NumberColumn("Popularité", format="%.1f"),
+            }
+        )
+        ms = timings.get("top_movies", 0.0)
+        if df_top.attrs.get("mode") == "order_by":
+            st.caption(f"Trié par Qdrant (order_by sur un index de payload) en {ms:.0f} ms.")
+        else:
+            st.caption(f"Tri local (parcours complet de la sélection) en {ms:.0f} ms.")
+
+
+@section("Distributions")
+def render_distributions(client: QdrantClient, analytics_distributions_func):
+    """Médianes, percentiles et histogrammes (sketches en flux, cf. sketches.py)"""
+    st.markdown("---")
+    st.markdown("#### Distributions")
+
+    with st.spinner("Calcul des distributions..."):
+        sketches = analytics_distributions_func(client)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        metric_label = st.radio("Mesure", ["Note moyenne", "Popularité"], horizontal=True)
+    with col2:
+        by_label = st.radio("Regrouper par", ["Décennie", "Genre"], horizontal=True)
+    metric = "vote_average" if metric_label == "Note moyenne" else "popularity"
+    by = "decade" if by_label == "Décennie" else "genre"
+
+    df_q = sketches.summary_frame(metric, by=by)
+    if df_q.empty:
+        st.info("Aucune donnée à afficher.")
+        return
+
+    # Boîtes p10 / p25 / médiane / p75 / p90 précalculées
+    labels = df_q[by].astype(str) + ("s" if by == "decade" else "")
+    fig_box = go.Figure(go.Box(
+        x=labels,
+        lowerfence=df_q["p10"], q1=df_q["p25"], median=df_q["p50"], q3=df_q["p75"], upperfence=df_q["p90"],
+        mean=df_q["mean"],
+        name=metric_label,
+        marker_color="#0b6df6"
+    ))
+    fig_box.update_layout(title=f"{metric_label} : p10, quartiles, médiane et p90 par {by_label.lower()}", showlegend=False)
+    if metric == "popularity":
+        fig_box.update_yaxes(type="log")
+    st.plotly_chart(fig_box, use_container_width=True)
+
+    st.dataframe(
+        df_q,
+        use_container_width=True,
+        column_config={
+            "decade": st.column_config.NumberColumn("Décennie", format="%d"),
+            "genre": st.column_config.TextColumn("Genre"),
+            "n": st.column_config.NumberColumn("Films", format="%d"),
+            **{c: st.column_config.NumberColumn(c, format="%.2f") for c in ["mean", "min", "p10", "p25", "p50", "p75", "p90", "max"]},
+        }
+    )
+
+    # Histogramme d'un groupe (ou de toute la collection)
+    options = ["Toute la collection"] + df_q[by].tolist()
+    choice = st.selectbox("Histogramme", options, format_func=lambda k: f"{k}s" if isinstance(k, (int, float)) and by == "decade" else str(k))
+    if choice == "Toute la collection":
+        sketch = sketches.overall(metric)
+    else:
+        sketch = (sketches.by_decade if by == "decade" else sketches.by_genre)[choice][metric]
+    dist = sketch.distribution()
+    if not dist.empty:
+        fig_hist = go.Figure(go.Bar(
+            x=(dist["low"] + dist["high"]) / 2,
+            y=dist["count"],
+            width=dist["high"] - dist["low"],
+            marker_color="#FF6B6B"
+        ))
+        fig_hist.update_layout(title=f"Distribution : {metric_label.lower()}", xaxis_title=metric_label, yaxis_title="Films", bargap=0)
+        if metric == "popularity":
+            fig_hist.update_xaxes(type="log")
+        st.plotly_chart(fig_hist, use_container_width=True)
+        st.caption(f"Médiane {sketch.quantile(0.5):.2f} — p90 {sketch.quantile(0.9):.2f} — {sketch.n:,} films")
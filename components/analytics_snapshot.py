@@ -0,0 +1,304 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from qdrant_client import QdrantClient, models
+
+from qdrant_helpers import collection_version, resolve_alias
+from columnar import page_to_frame
+
+SNAPSHOT_FIELDS = ["release_date", "vote_average", "popularity", "genres", "ingested_at"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS facts (id INTEGER PRIMARY KEY, year INTEGER, vote REAL, popularity REAL);
+CREATE TABLE IF NOT EXISTS fact_genres (id INTEGER NOT NULL, genre TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS fact_genres_id ON fact_genres (id);
+CREATE INDEX IF NOT EXISTS facts_year ON facts (year);
+CREATE TABLE IF NOT EXISTS agg_decade (decade INTEGER PRIMARY KEY, count INTEGER, n INTEGER, sum_vote REAL, min_vote REAL, max_vote REAL);
+CREATE TABLE IF NOT EXISTS agg_genre (genre TEXT PRIMARY KEY, count INTEGER, n INTEGER, sum_vote REAL, n_popularity INTEGER, sum_popularity REAL);
+CREATE TABLE IF NOT EXISTS agg_genre_decade (decade INTEGER, genre TEXT, count INTEGER, n INTEGER, sum_vote REAL, min_vote REAL, max_vote REAL, PRIMARY KEY (decade, genre));
+"""
+
+# Agrégats recalculés en SQL à partir des faits après chaque rafraîchissement
+_REBUILD_AGGREGATES = """
+DELETE FROM agg_decade;
+INSERT INTO agg_decade
+    SELECT (year / 10) * 10, COUNT(*), COUNT(vote), ordered_sum(id, vote), MIN(vote), MAX(vote)
+    FROM facts WHERE year IS NOT NULL GROUP BY (year / 10) * 10;
+DELETE FROM agg_genre;
+INSERT INTO agg_genre
+    SELECT g.genre, COUNT(*), COUNT(f.vote), ordered_sum(f.id, f.vote), COUNT(f.popularity), ordered_sum(f.id, f.popularity)
+    FROM fact_genres g JOIN facts f ON f.id = g.id GROUP BY g.genre;
+DELETE FROM agg_genre_decade;
+INSERT INTO agg_genre_decade
+    SELECT (f.year / 10) * 10, g.genre, COUNT(*), COUNT(f.vote), ordered_sum(f.id, f.vote), MIN(f.vote), MAX(f.vote)
+    FROM fact_genres g JOIN facts f ON f.id = g.id WHERE f.year IS NOT NULL GROUP BY (f.year / 10) * 10, g.genre;
+"""
+
+
+class _OrderedSum:
+    """
+    Agrégat SQLite ordered_sum(id, valeur) : somme Python des valeurs dans
+    l'ordre des identifiants, celui du scroll Qdrant que suit DecadeAggregator.
+    SUM() additionne dans l'ordre de parcours de la table (et compense les
+    erreurs d'arrondi), d'où des moyennes qui différaient de quelques ulp.
+    """
+
+    def __init__(self):
+        self.values: List[Tuple[int, float]] = []
+
+    def step(self, point_id: int, value: Optional[float]):
+        if value is not None:
+            self.values.append((point_id, value))
+
+    def finalize(self) -> Optional[float]:
+        if not self.values:
+            return None
+        self.values.sort(key=lambda item: item[0])
+        return sum(v for _, v in self.values)
+
+
+class AnalyticsSnapshot:
+    """
+    Agrégats analytics matérialisés dans SQLite : une ligne compacte par film
+    (année, vote, popularité, genres) et des tables d'agrégats par décennie,
+    par genre et par (décennie, genre). Le snapshot est tagué avec la version
+    de la collection ; quand elle change, seuls les points dont `ingested_at`
+    dépasse le dernier filigrane moins `overlap_seconds` sont relus (lots
+    d'ingestion écrits dans le désordre, horodatage à la seconde ; relire le
+    recouvrement est idempotent), et ce recouvrement est relu à chaque
+    vérification tant que la dernière écriture a moins de `overlap_seconds`. Les suppressions sont rattrapées en
+    comparant les identifiants ; un effectif incohérent ou un changement de
+    collection physique derrière l'alias (bascule, rollback) déclenche une
+    relecture complète. Les règles de calcul sont
+    celles de DecadeAggregator (année via to_year, année nulle ignorée, vote
+    None exclu de la moyenne) sur des décennies calendaires.
+    """
+
+    def __init__(self, collection_name: str, path: Path, check_interval: float = 30.0, page_size: int = 2000, overlap_seconds: float = 600.0):
+        self.collection_name = collection_name
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.check_interval = check_interval
+        self.page_size = page_size
+        self.overlap_seconds = overlap_seconds
+        self.last_refresh: Dict[str, Any] = {}
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.create_aggregate("ordered_sum", 2, _OrderedSum)
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        try:
+            self.last_refresh = json.loads(self._meta("last_refresh") or "{}")
+        except ValueError:
+            self.last_refresh = {}
+
+    # ---- Métadonnées
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values: Any):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(k, None if v is None else str(v)) for k, v in values.items()]
+        )
+
+    def _stored_count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+
+    @property
+    def version(self) -> Optional[str]:
+        with self._lock:
+            return self._meta("version") if self._meta("collection") == self.collection_name else None
+
+    def status(self) -> Dict[str, Any]:
+        """Version, filigrane ingested_at, date et détail du dernier rafraîchissement."""
+        with self._lock:
+            refreshed_at = self._meta("refreshed_at")
+            points = self._stored_count()
+            return {
+                "version": self.version,
+                "watermark": self._meta("watermark"),
+                "refreshed_at": float(refreshed_at) if refreshed_at else None,
+                "age_seconds": time.time() - float(refreshed_at) if refreshed_at else None,
+                "checked_seconds_ago": time.monotonic() - self._checked_at if self._checked_at else None,
+                "points": points,
+                "last_refresh": dict(self.last_refresh),
+            }
+
+    # ---- Rafraîchissement
+    def ensure_fresh(self, client: QdrantClient) -> "AnalyticsSnapshot":
+        """Rafraîchit le snapshot si la collection a changé (vérifié au plus toutes les `check_interval` s)."""
+        with self._lock:
+            now = time.monotonic()
+            if self.version is not None and now - self._checked_at < self.check_interval:
+                return self
+            self.refresh(client)
+            return self
+
+    def refresh(self, client: QdrantClient, full: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            t0 = time.perf_counter()
+            version = collection_version(client, self.collection_name)
+            physical = resolve_alias(client, self.collection_name) or self.collection_name
+            self._checked_at = time.monotonic()
+            same_physical = self._meta("physical") == physical
+            watermark = self._meta("watermark") if self.version is not None else None
+            # Écriture récente : un lot horodaté plus tôt peut encore arriver sans changer la version (même effectif, même max)
+            settling = watermark is not None and _parse_ts(watermark) > datetime.now(timezone.utc) - timedelta(seconds=self.overlap_seconds)
+            if not full and version == self.version and same_physical and not settling:
+                return self.last_refresh
+            latest = version.split(":", 1)[1]
+            # Sans ingested_at (ancienne collection), au premier passage ou sur une autre collection physique : relecture complète
+            incremental = not full and watermark is not None and latest != "-" and same_physical
+            filter_ = models.Filter(must=[
+                models.FieldCondition(key="ingested_at", range=models.DatetimeRange(
+                    gte=_parse_ts(watermark) - timedelta(seconds=self.overlap_seconds)
+                ))
+            ]) if incremental else None
+
+            deleted = 0
+            if incremental:
+                scanned, new_watermark = self._scan(client, filter_, watermark)
+                deleted = self._drop_missing(client)
+                # Points arrivés dans le désordre (lots d'ingestion parallèles) : effectifs incohérents -> relecture complète
+                if self._stored_count() != (client.get_collection(self.collection_name).points_count or 0):
+                    incremental = False
+            if not incremental:
+                self._db.execute("DELETE FROM facts")
+                self._db.execute("DELETE FROM fact_genres")
+                scanned, new_watermark = self._scan(client, None, None)
+            self._db.executescript(_REBUILD_AGGREGATES)
+            self.last_refresh = {
+                "mode": "incremental" if incremental else "full",
+                "scanned": scanned,
+                "deleted": deleted,
+                "ms": round((time.perf_counter() - t0) * 1000, 1),
+            }
+            self._set_meta(
+                collection=self.collection_name, physical=physical, version=version, watermark=new_watermark,
+                refreshed_at=time.time(), last_refresh=json.dumps(self.last_refresh)
+            )
+            self._db.commit()
+            return self.last_refresh
+
+    def _scan(self, client: QdrantClient, filter_: Optional[models.Filter], watermark: Optional[str]) -> Tuple[int, Optional[str]]:
+        scanned = 0
+        next_offset = None
+        while True:
+            points, next_offset = client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=filter_,
+                with_vectors=False,
+                with_payload=SNAPSHOT_FIELDS,
+                limit=self.page_size,
+                offset=next_offset
+            )
+            if points:
+                watermark = self._write_facts([int(p.id) for p in points], [p.payload or {} for p in points], watermark)
+                scanned += len(points)
+            if not points or next_offset is None:
+                break
+        return scanned, watermark
+
+    def _write_facts(self, ids: List[int], payloads: List[Dict[str, Any]], watermark: Optional[str]) -> Optional[str]:
+        frame = page_to_frame(payloads, SNAPSHOT_FIELDS)
+        years = frame["year"].where(frame["year"] != 0)
+        facts = [
+            (pid, None if pd.isna(y) else int(y), None if np.isnan(v) else float(v), None if np.isnan(p) else float(p))
+            for pid, y, v, p in zip(ids, years, frame["vote_average"], frame["popularity"])
+        ]
+        genres = [(pid, g) for pid, gs in zip(ids, frame["genres"]) for g in (gs or []) if isinstance(g, str) and g]
+        self._db.executemany("INSERT OR REPLACE INTO facts (id, year, vote, popularity) VALUES (?, ?, ?, ?)", facts)
+        self._db.executemany("DELETE FROM fact_genres WHERE id = ?", [(pid,) for pid in ids])
+        self._db.executemany("INSERT INTO fact_genres (id, genre) VALUES (?, ?)", genres)
+        stamps = [s for s in frame["ingested_at"] if isinstance(s, str)]
+        if stamps:
+            latest = max(stamps, key=_parse_ts)
+            if watermark is None or _parse_ts(latest) > _parse_ts(watermark):
+                watermark = latest
+        return watermark
+
+    def _drop_missing(self, client: QdrantClient) -> int:
+        """Supprime les faits des points qui n'existent plus (seulement si les effectifs diffèrent)."""
+        info = client.get_collection(self.collection_name)
+        if (info.points_count or 0) == self._stored_count():
+            return 0
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS live_ids (id INTEGER PRIMARY KEY)")
+        self._db.execute("DELETE FROM live_ids")
+        next_offset = None
+        while True:
+            points, next_offset = client.scroll(
+                collection_name=self.collection_name, with_payload=False, with_vectors=False,
+                limit=max(self.page_size, 5000), offset=next_offset
+            )
+            self._db.executemany("INSERT OR IGNORE INTO live_ids (id) VALUES (?)", [(int(p.id),) for p in points])
+            if not points or next_offset is None:
+                break
+        deleted = self._db.execute("DELETE FROM facts WHERE id NOT IN (SELECT id FROM live_ids)").rowcount
+        self._db.execute("DELETE FROM fact_genres WHERE id NOT IN (SELECT id FROM live_ids)")
+        return deleted
+
+    # ---- Lecture
+    def _query(self, sql: str, params: Tuple = ()) -> pd.DataFrame:
+        with self._lock:
+            cur = self._db.execute(sql, params)
+            columns = [c[0] for c in cur.description]
+            return pd.DataFrame(cur.fetchall(), columns=columns)
+
+    def decade_frame(self, decades: List[int]) -> pd.DataFrame:
+        """Même forme que `DecadeAggregator.decade_frame()` (une ligne par décennie demandée)."""
+        agg = self._query("SELECT decade, count, n, sum_vote, min_vote, max_vote FROM agg_decade").set_index("decade")
+        rows = []
+        for d in decades:
+            if d % 10 == 0:
+                stats = agg.loc[d].to_dict() if d in agg.index else {}
+            else:
+                # Décennie non calendaire : calcul direct sur les faits (index sur year)
+                stats = self._query(
+                    "SELECT COUNT(*) AS count, COUNT(vote) AS n, ordered_sum(id, vote) AS sum_vote, MIN(vote) AS min_vote, MAX(vote) AS max_vote FROM facts WHERE year BETWEEN ? AND ?",
+                    (d, d + 9)
+                ).iloc[0].to_dict()
+            rows.append({"decade": d, **_row(stats)})
+        columns = ["decade", "mean_vote", "n", "count", "min_vote", "max_vote"]
+        return pd.DataFrame(rows, columns=columns).sort_values("decade")
+
+    def genre_frame(self) -> pd.DataFrame:
+        df = self._query("SELECT genre, count, n, sum_vote, n_popularity, sum_popularity FROM agg_genre ORDER BY count DESC, genre")
+        df["mean_vote"] = (df["sum_vote"] / df["n"].where(df["n"] > 0)).astype(float)
+        df["mean_popularity"] = (df["sum_popularity"] / df["n_popularity"].where(df["n_popularity"] > 0)).astype(float)
+        return df[["genre", "count", "n", "mean_vote", "mean_popularity"]]
+
+    def genre_decade_frame(self, decades: Optional[List[int]] = None) -> pd.DataFrame:
+        df = self._query("SELECT decade, genre, count, n, sum_vote, min_vote, max_vote FROM agg_genre_decade ORDER BY decade, genre")
+        if decades is not None:
+            df = df[df["decade"].isin(decades)].reset_index(drop=True)
+        df["mean_vote"] = (df["sum_vote"] / df["n"].where(df["n"] > 0)).astype(float)
+        return df[["decade", "genre", "mean_vote", "n", "count", "min_vote", "max_vote"]]
+
+
+def _row(stats: Dict[str, Any]) -> Dict[str, Any]:
+    n = int(stats.get("n") or 0)
+    return {
+        "mean_vote": stats["sum_vote"] / n if n else np.nan,
+        "n": n,
+        "count": int(stats.get("count") or 0),
+        "min_vote": stats["min_vote"] if n else np.nan,
+        "max_vote": stats["max_vote"] if n else np.nan,
+    }
+
+def _parse_ts(value: str) -> datetime:
+    try:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
@@ -0,0 +1,108 @@
+"""
+Recherche sémantique par lots à partir d'un fichier de requêtes.
+
+    python components/batch_search.py requetes.txt --out resultats.jsonl
+    python components/batch_search.py requetes.jsonl --top-k 20 --genres Drama Crime
+
+Le fichier est soit du texte (une requête par ligne), soit du JSONL avec une
+requête par ligne : {"query": "...", "genres": [...], "year_min": 1990,
+"year_max": 2005, "top_k": 10} (seul "query" est obligatoire ; les autres
+champs remplacent les valeurs par défaut de la ligne de commande).
+Chaque ligne de sortie reprend la requête avec ses résultats.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def read_queries(path: Path, defaults: Dict[str, Any]) -> List[Dict[str, Any]]:
+    queries: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    spec = json.loads(line)
+                except ValueError as exc:
+                    raise SystemExit(f"{path}:{n}: JSON invalide ({exc})")
+                if not isinstance(spec, dict) or not spec.get("query"):
+                    raise SystemExit(f"{path}:{n}: champ \"query\" manquant")
+            else:
+                spec = {"query": line}
+            queries.append({"query": spec["query"], **defaults, **spec})
+    return queries
+
+def hit_record(hit) -> Dict[str, Any]:
+    payload = hit.payload or {}
+    return {
+        "id": hit.id,
+        "score": round(float(hit.score), 6),
+        "tmdb_id": payload.get("tmdb_id"),
+        "title": payload.get("title"),
+        "release_date": payload.get("release_date"),
+        "genres": payload.get("genres"),
+    }
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Recherche sémantique par lots (encodage groupé + search_batch).")
+    parser.add_argument("queries", help="Fichier de requêtes (.txt : une par ligne, ou .jsonl)")
+    parser.add_argument("--out", default=None, help="Fichier JSONL de sortie (défaut : sortie standard)")
+    parser.add_argument("--collection", default=None, help="Collection (défaut : COLLECTION_NAME du .env)")
+    parser.add_argument("--path", default=None, help="Qdrant local (dossier ou :memory:) au lieu de QDRANT_URL")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--genres", nargs="*", default=[], help="Genres par défaut (OU)")
+    parser.add_argument("--year-min", type=int, default=None)
+    parser.add_argument("--year-max", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=64, help="Requêtes par appel search_batch")
+    parser.add_argument("--encode-batch-size", type=int, default=64)
+    parser.add_argument("--collapse-duplicates", action="store_true", help="Un seul film par groupe de quasi-doublons (cf. duplicates.py)")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    args = build_arg_parser().parse_args(argv)
+    from qdrant_helpers import client_from_env, CACHE_DIR
+    client = client_from_env(args.path)
+    if args.collection:
+        os.environ["COLLECTION_NAME"] = args.collection
+    # services lit COLLECTION_NAME à l'import
+    import services
+    from lazy_embedder import LazyEmbedder
+    from embedding_cache import EmbeddingCache, CachedEmbedder
+
+    defaults = {"genres": args.genres, "year_min": args.year_min, "year_max": args.year_max, "top_k": args.top_k}
+    queries = read_queries(Path(args.queries), defaults)
+    embedder = CachedEmbedder(LazyEmbedder(args.model), args.model, EmbeddingCache(args.model, directory=CACHE_DIR / "embeddings"))
+
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    results = services.search_semantic_batch(
+        client, queries, args.top_k, embedder,
+        chunk_size=args.chunk_size, encode_batch_size=args.encode_batch_size, timings=timings,
+        collapse_duplicates=args.collapse_duplicates
+    )
+    elapsed = time.perf_counter() - t0
+
+    records = [{**q, "results": [hit_record(h) for h in hits]} for q, hits in zip(queries, results)]
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for rec in records:
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    finally:
+        if args.out:
+            out.close()
+    stages = ", ".join(f"{k} {v:.0f} ms" for k, v in timings.items())
+    print(f"{len(queries)} requêtes en {elapsed:.2f}s ({stages})", file=sys.stderr)
+    return records
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""
+Benchmark reproductible des chemins recherche / analytics de la WebApp.
+
+    python components/benchmark.py --sizes 5000 100000
+    python components/benchmark.py --sizes 1000000 --path ./.cache/bench_qdrant --reuse
+    python components/benchmark.py --sizes 5000 --compare .cache/benchmarks/ancien.json
+
+Une collection synthétique « façon TMDB » (titres, résumés, genres, dates,
+votes, popularité) est générée dans un Qdrant local à partir d'une graine fixe,
+puis chaque fonction publique de services.py est chronométrée, seule puis sous
+la charge de N utilisateurs simulés en parallèle. Les résultats sont écrits en
+JSON (avec le commit git courant) pour être comparés d'un commit à l'autre.
+
+Par défaut les requêtes sont encodées par un embedder déterministe (hachage) :
+les temps mesurés sont ceux de Qdrant et du code Python, pas du modèle. Passer
+`--model sentence-transformers/all-MiniLM-L6-v2` pour inclure le vrai modèle.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+REPO_DIR = Path(__file__).parent.parent
+
+TMDB_GENRES = [
+    "Drama", "Comedy", "Thriller", "Action", "Romance", "Adventure", "Crime", "Science Fiction",
+    "Horror", "Family", "Fantasy", "Mystery", "Animation", "History", "Music", "War",
+    "Documentary", "Western", "Foreign", "TV Movie",
+]
+# Fréquences approximatives du jeu TMDB 5000
+GENRE_WEIGHTS = [
+    2297, 1722, 1274, 1154, 894, 790, 696, 535, 519, 513, 424, 348, 234, 197, 185, 144, 110, 82, 34, 8,
+]
+WORDS = (
+    "love war night city last man woman world dark star life story day king dead lost secret "
+    "return rise blood girl boy house game home road time black red fire ice shadow dream "
+    "family heart ghost planet river ocean island mission escape hunter queen school summer"
+).split()
+
+QUERIES = [
+    "space adventure with aliens", "romantic comedy in paris", "serial killer detective thriller",
+    "animated family movie with talking animals", "world war two soldiers", "haunted house horror",
+    "heist with a team of thieves", "coming of age summer story", "superhero saves the city",
+    "time travel paradox", "mafia family drama", "zombie apocalypse survival",
+    "musical about a young singer", "western outlaw revenge", "spy mission in europe",
+    "dystopian future rebellion", "sports underdog team", "courtroom drama lawyer",
+    "pirates treasure island", "robots and artificial intelligence",
+]
+DECADES = [1950, 1960, 1970, 1980, 1990, 2000, 2010, 2020]
+
+
+class HashEmbedder:
+    """Embedder déterministe (vecteur pseudo-aléatoire dérivé du texte) : même API que SentenceTransformer.encode."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+            out[i] = np.random.default_rng(seed).standard_normal(self.dim)
+        if normalize_embeddings:
+            out /= np.linalg.norm(out, axis=1, keepdims=True)
+        return out
+
+
+# ----------------------------
+# Collection synthétique
+# ----------------------------
+def synthetic_payloads(rng: np.random.Generator, start: int, n: int, ingested_at: str) -> List[Dict[str, Any]]:
+    """`n` payloads au format de l'ingestion (mêmes champs, distributions proches de TMDB)."""
+    weights = np.asarray(GENRE_WEIGHTS, dtype=float) / sum(GENRE_WEIGHTS)
+    years = np.clip(2017 - rng.exponential(18.0, n).astype(int), 1916, 2017)
+    months = rng.integers(1, 13, n)
+    days = rng.integers(1, 29, n)
+    no_date = rng.random(n) < 0.01
+    votes = np.round(np.clip(rng.normal(6.1, 1.1, n), 0, 10), 1)
+    votes[rng.random(n) < 0.04] = 0.0
+    # Générateur à part : les autres champs restent identiques d'une version du benchmark à l'autre
+    vote_counts = np.where(votes > 0, np.random.default_rng([start, n]).lognormal(5.0, 1.6, n).astype(int), 0)
+    popularity = np.round(rng.lognormal(2.3, 1.2, n), 3)
+    n_genres = rng.choice([0, 1, 2, 3, 4], n, p=[0.02, 0.25, 0.35, 0.28, 0.10])
+    payloads = []
+    for i in range(n):
+        genres = [TMDB_GENRES[g] for g in rng.choice(len(TMDB_GENRES), n_genres[i], replace=False, p=weights)]
+        title_words = rng.choice(WORDS, rng.integers(1, 4))
+        overview_words = rng.choice(WORDS, rng.integers(15, 45))
+        release_date = None if no_date[i] else f"{years[i]}-{months[i]:02d}-{days[i]:02d}"
+        payload = {
+            "tmdb_id": start + i,
+            "title": " ".join(w.capitalize() for w in title_words),
+            "overview": " ".join(overview_words).capitalize() + ".",
+            "genres": genres,
+            "release_date": release_date,
+            "popularity": float(popularity[i]),
+            "vote_average": float(votes[i]),
+            "vote_count": int(vote_counts[i]),
+            "ingested_at": ingested_at,
+        }
+        if release_date:
+            payload["release_year"] = int(years[i])
+        payloads.append(payload)
+    return payloads
+
+def build_collection(client: QdrantClient, collection_name: str, size: int, dim: int, seed: int, batch_size: int = 1000, progress: bool = True) -> Dict[str, Any]:
+    """(Re)crée la collection et y écrit `size` points synthétiques, reproductibles pour une même graine."""
+    from qdrant_helpers import ensure_payload_indexes
+
+    t0 = time.perf_counter()
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(collection_name, vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        ensure_payload_indexes(client, collection_name)
+
+    rng = np.random.default_rng(seed)
+    ingested_at = "2024-01-01T00:00:00+00:00"
+    for start in range(0, size, batch_size):
+        n = min(batch_size, size - start)
+        vectors = rng.standard_normal((n, dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        payloads = synthetic_payloads(rng, start + 1, n, ingested_at)
+        client.upsert(
+            collection_name=collection_name,
+            points=models.Batch(ids=list(range(start + 1, start + n + 1)), vectors=vectors.tolist(), payloads=payloads),
+            wait=True
+        )
+        if progress:
+            print(f"\r  génération : {start + n}/{size}", end="", flush=True)
+    if progress:
+        print()
+    return {"points": size, "seconds": round(time.perf_counter() - t0, 3), "reused": False}
+
+def open_client(path: Optional[str], size: int) -> QdrantClient:
+    if not path or path == ":memory:":
+        return QdrantClient(location=":memory:")
+    directory = Path(path) / f"n{size}"
+    directory.mkdir(parents=True, exist_ok=True)
+    return QdrantClient(path=str(directory))
+
+
+# ----------------------------
+# Mesures
+# ----------------------------
+def latency_stats(samples_ms: List[float]) -> Dict[str, Any]:
+    arr = np.asarray(samples_ms, dtype=float)
+    if not len(arr):
+        return {"n": 0}
+    return {
+        "n": int(len(arr)),
+        "min_ms": round(float(arr.min()), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+def time_case(fn: Callable[[int], Optional[Dict[str, float]]], repeat: int, warmup: int) -> Dict[str, Any]:
+    """
+    Appelle `fn(i)` `warmup` fois sans mesurer puis `repeat` fois. Si `fn` rend
+    un dict de temps par étape (ms), ils sont moyennés dans `stages_ms`.
+    """
+    for i in range(warmup):
+        fn(i)
+    samples: List[float] = []
+    stages: Dict[str, float] = {}
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        timings = fn(warmup + i)
+        samples.append((time.perf_counter() - t0) * 1000)
+        if not isinstance(timings, dict):
+            continue
+        for stage, ms in timings.items():
+            stages[stage] = stages.get(stage, 0.0) + ms
+    result = latency_stats(samples)
+    if stages:
+        result["stages_ms"] = {k: round(v / repeat, 3) for k, v in sorted(stages.items())}
+    return result
+
+def search_case(client: QdrantClient, embedder, genres: List[str], year_min: Optional[int], year_max: Optional[int], top_k: int = 10):
+    import services
+
+    def run(i: int) -> Dict[str, float]:
+        timings: Dict[str, float] = {}
+        services.search_semantic(client, QUERIES[i % len(QUERIES)], top_k, embedder, genres, year_min, year_max, timings=timings)
+        return timings
+    return run
+
+def single_user_cases(client: QdrantClient, embedder, mirror: bool = False) -> Dict[str, Callable[[int], Optional[Dict[str, float]]]]:
+    import services
+    from qdrant_helpers import top_payloads
+
+    def list_genres_cold(i: int):
+        services.get_genre_catalog(services.COLLECTION_NAME).invalidate()
+        services.list_known_genres(client)
+
+    # Requêtes = titres de la collection (chemin index des titres)
+    titles = [p["title"] for p in services.fetch_payloads(client, limit_total=50, fields=["title"]) if p.get("title")]
+
+    def title_search(i: int) -> Dict[str, float]:
+        timings: Dict[str, float] = {}
+        services.search_semantic(client, titles[i % len(titles)], 10, embedder, [], None, None, timings=timings)
+        return timings
+
+    # Recherche déjà affichée (page 1) : on ne mesure que la page suivante
+    cursors = [services.search_semantic_paged(client, q, 10, embedder, [], None, None)[1] for q in QUERIES]
+
+    def load_more(i: int) -> Dict[str, float]:
+        timings: Dict[str, float] = {}
+        base = cursors[i % len(cursors)]
+        cursor = dict(base, buffer=list(base["buffer"]), seen=set(base["seen"]))
+        services.search_semantic_more(client, cursor, timings=timings, embedder=embedder)
+        return timings
+
+    cases: Dict[str, Callable[[int], Optional[Dict[str, float]]]] = {
+        "search_semantic": search_case(client, embedder, [], None, None),
+        "search_semantic[title]": title_search,
+        "search_semantic[genres]": search_case(client, embedder, ["Drama", "Crime"], None, None),
+        "search_semantic[genres+years]": search_case(client, embedder, ["Drama", "Crime"], 1990, 2005),
+        "search_semantic[top_k=50]": search_case(client, embedder, [], None, None, top_k=50),
+        "search_semantic_more[page 2]": load_more,
+        "search_semantic_batch[20]": lambda i: services.search_semantic_batch(client, [{"query": q, "genres": ["Drama"] if j % 2 else []} for j, q in enumerate(QUERIES)], 10, embedder),
+        "similar_movies": lambda i: services.similar_movies(client, 1 + (i * 7919) % 1000, 10),
+        "list_known_genres": lambda i: services.list_known_genres(client),
+        "list_known_genres[cold]": list_genres_cold,
+        "analytics_counts_by_genre": lambda i: services.analytics_counts_by_genre(client, ["Drama", "Comedy", "Action", "Horror", "Animation"]),
+        "analytics_counts_by_genre[approx]": lambda i: services.analytics_counts_by_genre(client, ["Drama", "Comedy", "Action", "Horror", "Animation"], exact=False),
+        "analytics_decade_mean_vote": lambda i: services.analytics_decade_mean_vote(client, DECADES),
+        "analytics_decade_mean_vote[live]": lambda i: services.analytics_decade_mean_vote(client, DECADES, live=True),
+        "analytics_distributions[scan]": lambda i: services.sketch_collection(client, services.COLLECTION_NAME),
+        "analytics_top_movies": lambda i: services.analytics_top_movies(client, "popularity", 10),
+        "analytics_top_movies[rated,min_votes]": lambda i: services.analytics_top_movies(client, "vote_average", 10, min_votes=500),
+        "analytics_top_movies[recent,decade]": lambda i: services.analytics_top_movies(client, "recent", 10, decade=1990),
+        "analytics_top_movies[heap]": lambda i: top_payloads(client, services.COLLECTION_NAME, "popularity", 10, fields=services.TOP_MOVIE_FIELDS, server_order=False),
+        "fetch_payloads[limit=1000]": lambda i: services.fetch_payloads(client, limit_total=1000),
+        "fetch_payloads[genre]": lambda i: services.fetch_payloads(client, models.Filter(must=[models.FieldCondition(key="genres", match=models.MatchValue(value="Western"))])),
+        "fetch_payloads[all]": lambda i: services.fetch_payloads(client),
+        "fetch_payloads[projected]": lambda i: services.fetch_payloads(client, fields=["release_date", "vote_average", "genres", "popularity"]),
+        "fetch_payload_frame": lambda i: services.fetch_payload_frame(client),
+    }
+    if mirror:
+        cases["search_semantic[mirror]"] = search_case(client, embedder, [], None, None)
+        cases["search_semantic[mirror,genres+years]"] = search_case(client, embedder, ["Drama", "Crime"], 1990, 2005)
+    return cases
+
+def concurrent_load(client: QdrantClient, embedder, users: int, ops_per_user: int, seed: int) -> Dict[str, Any]:
+    """
+    `users` sessions en parallèle ; chaque session enchaîne `ops_per_user`
+    opérations tirées comme dans l'interface (surtout des recherches, parfois
+    la liste des genres ou un comptage analytics).
+    """
+    import services
+
+    def session(user: int) -> List[tuple]:
+        rnd = random.Random(seed * 1000 + user)
+        samples = []
+        for _ in range(ops_per_user):
+            roll = rnd.random()
+            genres = rnd.sample(TMDB_GENRES[:10], rnd.choice([0, 0, 1, 2]))
+            t0 = time.perf_counter()
+            try:
+                if roll < 0.75:
+                    op = "search_semantic"
+                    year_min = rnd.choice([None, None, 1980, 2000])
+                    services.search_semantic(client, rnd.choice(QUERIES), 10, embedder, genres, year_min, None)
+                elif roll < 0.9:
+                    op = "list_known_genres"
+                    services.list_known_genres(client)
+                else:
+                    op = "analytics_counts_by_genre"
+                    services.analytics_counts_by_genre(client, genres or ["Drama"])
+                ok = True
+            except Exception:
+                ok = False
+            samples.append((op, (time.perf_counter() - t0) * 1000, ok))
+        return samples
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        results = list(pool.map(session, range(users)))
+    wall = time.perf_counter() - t0
+    flat = [s for r in results for s in r]
+    by_op: Dict[str, List[float]] = {}
+    for op, ms, ok in flat:
+        if ok:
+            by_op.setdefault(op, []).append(ms)
+    return {
+        "users": users,
+        "ops": len(flat),
+        "errors": sum(1 for _, _, ok in flat if not ok),
+        "wall_seconds": round(wall, 3),
+        "ops_per_s": round(len(flat) / wall, 2) if wall > 0 else None,
+        "latency": latency_stats([ms for _, ms, ok in flat if ok]),
+        "by_op": {op: latency_stats(v) for op, v in sorted(by_op.items())},
+    }
+
+
+# ----------------------------
+# Exécution / rapport
+# ----------------------------
+def package_version(name: str) -> Optional[str]:
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if out.returncode != 0:
+        return None
+    return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+def run_size(args, size: int, embedder) -> Dict[str, Any]:
+    import services
+
+    client = open_client(args.path, size)
+    name = services.COLLECTION_NAME
+    if args.reuse and client.collection_exists(name) and (client.get_collection(name).points_count or 0) == size:
+        setup = {"points": size, "seconds": 0.0, "reused": True}
+    else:
+        setup = build_collection(client, name, size, args.dim, args.seed, progress=not args.quiet)
+    services.reset_resources()
+
+    if args.mirror:
+        t0 = time.perf_counter()
+        services.get_vector_mirror(name).build(client)
+        setup["mirror_seconds"] = round(time.perf_counter() - t0, 3)
+
+    cases: Dict[str, Any] = {}
+    for case, fn in single_user_cases(client, embedder, mirror=args.mirror).items():
+        if args.only and not any(case.startswith(prefix) for prefix in args.only):
+            continue
+        services.LOCAL_VECTOR_MIRROR = "[mirror" in case
+        repeat = max(1, args.repeat // 5) if case in ("fetch_payloads[all]", "fetch_payloads[projected]", "fetch_payload_frame", "analytics_distributions[scan]") or case.endswith("[cold]") else args.repeat
+        cases[case] = time_case(fn, repeat, args.warmup)
+        if not args.quiet:
+            print(f"  {case:<40} p50 {cases[case]['p50_ms']:>10.2f} ms   p95 {cases[case]['p95_ms']:>10.2f} ms")
+    services.LOCAL_VECTOR_MIRROR = False
+
+    concurrency: Dict[str, Any] = {}
+    for users in args.users:
+        concurrency[str(users)] = concurrent_load(client, embedder, users, args.user_ops, args.seed)
+        if not args.quiet:
+            c = concurrency[str(users)]
+            print(f"  {users:>3} utilisateur(s) : {c['ops_per_s']} op/s, p50 {c['latency'].get('p50_ms')} ms, p95 {c['latency'].get('p95_ms')} ms, {c['errors']} erreur(s)")
+    client.close()
+    return {"setup": setup, "cases": cases, "concurrency": concurrency}
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Écarts de p50 entre deux rapports, pour chaque (taille, cas) présent des deux côtés."""
+    rows = []
+    for size, data in current.get("sizes", {}).items():
+        before = previous.get("sizes", {}).get(size, {})
+        for case, stats in data.get("cases", {}).items():
+            old = before.get("cases", {}).get(case)
+            if not old or not old.get("p50_ms") or stats.get("p50_ms") is None:
+                continue
+            rows.append({
+                "size": size,
+                "case": case,
+                "before_p50_ms": old["p50_ms"],
+                "after_p50_ms": stats["p50_ms"],
+                "change_pct": round((stats["p50_ms"] / old["p50_ms"] - 1) * 100, 1),
+            })
+    return rows
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark des fonctions recherche / analytics sur une collection synthétique.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000], help="Tailles de collection (ex. 5000 100000 1000000)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="Mesures par cas")
+    parser.add_argument("--warmup", type=int, default=2, help="Appels non mesurés avant chaque cas")
+    parser.add_argument("--users", type=int, nargs="*", default=[1, 4, 16], help="Nombres d'utilisateurs simultanés")
+    parser.add_argument("--user-ops", type=int, default=20, help="Opérations par utilisateur simulé")
+    parser.add_argument("--only", nargs="*", default=None, help="Préfixes des cas à mesurer (ex. search_semantic)")
+    parser.add_argument("--path", default=None, help="Dossier du Qdrant local (défaut : en mémoire)")
+    parser.add_argument("--reuse", action="store_true", help="Réutiliser la collection de --path si elle a déjà la bonne taille")
+    parser.add_argument("--mirror", action="store_true", help="Mesurer aussi la recherche sur la copie locale (vector_mirror.py)")
+    parser.add_argument("--model", default=None, help="Modèle SentenceTransformer (défaut : embedder déterministe)")
+    parser.add_argument("--cache-dir", default=None, help="Caches de l'app pendant le benchmark (défaut : dossier temporaire)")
+    parser.add_argument("--out", default=None, help="Fichier JSON de sortie (défaut : .cache/benchmarks/<commit>-<date>.json)")
+    parser.add_argument("--compare", default=None, help="Rapport JSON précédent à comparer")
+    parser.add_argument("--quiet", action="store_true")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = build_arg_parser().parse_args(argv)
+    # Les caches de l'app (catalogue, télémétrie...) ne doivent pas se mélanger à ceux de la vraie collection :
+    # APP_CACHE_DIR est fixé avant le premier import de services.py
+    os.environ["APP_CACHE_DIR"] = args.cache_dir or tempfile.mkdtemp(prefix="tmdb_bench_")
+    import services
+
+    if args.model:
+        from lazy_embedder import LazyEmbedder
+        embedder = LazyEmbedder(args.model)
+        args.dim = embedder.load().get_sentence_embedding_dimension()
+    else:
+        embedder = HashEmbedder(args.dim)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "qdrant_client": package_version("qdrant-client"),
+            "numpy": np.__version__,
+            "collection": services.COLLECTION_NAME,
+            "embedder": args.model or f"hash-{args.dim}",
+            "dim": args.dim,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "user_ops": args.user_ops,
+            "qdrant": args.path or ":memory:",
+        },
+        "sizes": {},
+    }
+    for size in args.sizes:
+        if not args.quiet:
+            print(f"== {size} points")
+        report["sizes"][str(size)] = run_size(args, size, embedder)
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        report["comparison"] = {"against": previous.get("meta", {}).get("git_commit"), "rows": compare(report, previous)}
+        if not args.quiet:
+            for row in report["comparison"]["rows"]:
+                print(f"  [{row['size']}] {row['case']:<40} {row['before_p50_ms']:>10.2f} -> {row['after_p50_ms']:>10.2f} ms ({row['change_pct']:+.1f} %)")
+
+    out = Path(args.out) if args.out else REPO_DIR / ".cache" / "benchmarks" / f"{report['meta']['git_commit'] or 'nogit'}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Rapport écrit dans {out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Profils de collection : compromis vitesse / mémoire / précision nommés.
+
+    python components/ingest.py ./content/tmdb_5000_movies.csv --recreate --profile balanced
+    python components/collection_profiles.py --apply fast          # collection existante, sans ré-encoder
+    python components/collection_profiles.py --show
+
+Chaque profil fixe à la création de la collection la quantification (avec
+rescoring sur les vecteurs d'origine), les paramètres HNSW (m, ef_construct)
+et ce qui est stocké sur disque ; et à la recherche, hnsw_ef et le
+sur-échantillonnage de la quantification (cf. `search_params`). Les
+recall@k / latences de chaque profil se mesurent avec profile_report.py.
+"""
+import argparse
+import json
+import os
+from typing import Dict, Any, Optional
+
+from qdrant_client import QdrantClient, models
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Quantification binaire (32x moins de mémoire) en RAM, vecteurs d'origine sur disque relus pour le rescoring
+    "fast": {
+        "hnsw_m": 8, "ef_construct": 64, "quantization": "binary", "vectors_on_disk": True, "payload_on_disk": True,
+        "hnsw_ef": 32, "oversampling": 3.0,
+    },
+    # Quantification int8 (4x moins de mémoire) en RAM, rescoring sur les vecteurs float32 (disque)
+    "balanced": {
+        "hnsw_m": 16, "ef_construct": 128, "quantization": "int8", "vectors_on_disk": True, "payload_on_disk": True,
+        "hnsw_ef": 64, "oversampling": 1.5,
+    },
+    # Vecteurs float32 en RAM, graphe plus dense et exploration plus large
+    "accurate": {
+        "hnsw_m": 32, "ef_construct": 256, "quantization": None, "vectors_on_disk": False, "payload_on_disk": False,
+        "hnsw_ef": 256, "oversampling": None,
+    },
+}
+
+
+def get_profile(name: str) -> Dict[str, Any]:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Profil inconnu : {name!r} (choix : {', '.join(PROFILES)})")
+
+def quantization_config(profile: Dict[str, Any]) -> Optional[models.QuantizationConfig]:
+    if profile["quantization"] == "int8":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+    if profile["quantization"] == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def collection_config(name: str, dim: int) -> Dict[str, Any]:
+    """Arguments de `create_collection` pour le profil `name`."""
+    profile = get_profile(name)
+    return {
+        "vectors_config": models.VectorParams(size=int(dim), distance=models.Distance.COSINE, on_disk=profile["vectors_on_disk"]),
+        "hnsw_config": models.HnswConfigDiff(m=profile["hnsw_m"], ef_construct=profile["ef_construct"]),
+        "quantization_config": quantization_config(profile),
+        "on_disk_payload": profile["payload_on_disk"],
+    }
+
+def search_params(name: Optional[str] = None, exact: bool = False) -> Optional[models.SearchParams]:
+    """
+    Paramètres de recherche du profil `name` (None : défauts Qdrant). `exact`
+    force une recherche exhaustive sur les vecteurs d'origine (référence du recall).
+    """
+    if exact:
+        return models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+    if not name:
+        return None
+    profile = get_profile(name)
+    quantization = None
+    if profile["quantization"]:
+        quantization = models.QuantizationSearchParams(ignore=False, rescore=True, oversampling=profile["oversampling"])
+    return models.SearchParams(hnsw_ef=profile["hnsw_ef"], quantization=quantization)
+
+def apply_profile(client: QdrantClient, collection_name: str, name: str):
+    """
+    Applique le profil à une collection existante (Qdrant reconstruit index et
+    quantification en arrière-plan ; les vecteurs ne sont pas ré-encodés).
+    """
+    profile = get_profile(name)
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={"": models.VectorParamsDiff(on_disk=profile["vectors_on_disk"])},
+        hnsw_config=models.HnswConfigDiff(m=profile["hnsw_m"], ef_construct=profile["ef_construct"]),
+        quantization_config=quantization_config(profile) or models.Disabled.DISABLED,
+        collection_params=models.CollectionParamsDiff(on_disk_payload=profile["payload_on_disk"]),
+    )
+
+
+if __name__ == "__main__":
+    from qdrant_helpers import client_from_env
+
+    parser = argparse.ArgumentParser(description="Profils de collection (quantification, HNSW, stockage disque).")
+    parser.add_argument("--collection", default=os.getenv("COLLECTION_NAME", "tmdb_movies"))
+    parser.add_argument("--path", default=None, help="Qdrant local (dossier ou :memory:) au lieu de QDRANT_URL")
+    parser.add_argument("--apply", choices=list(PROFILES), default=None, help="Applique ce profil à la collection existante")
+    parser.add_argument("--show", action="store_true", help="Affiche la configuration actuelle de la collection")
+    args = parser.parse_args()
+
+    if not args.apply and not args.show:
+        print(json.dumps(PROFILES, indent=1))
+        raise SystemExit(0)
+    client = client_from_env(args.path)
+    if args.apply:
+        apply_profile(client, args.collection, args.apply)
+        print(f"Profil {args.apply} appliqué à {args.collection} (optimisation en arrière-plan côté serveur)")
+    config = client.get_collection(args.collection).config
+    print(json.dumps({
+        "hnsw": config.hnsw_config.model_dump() if config.hnsw_config else None,
+        "quantization": config.quantization_config.model_dump() if config.quantization_config else None,
+        "vectors_on_disk": getattr(config.params.vectors, "on_disk", None),
+        "payload_on_disk": config.params.on_disk_payload,
+    }, indent=1, default=str))
@@ -0,0 +1,66 @@
+from typing import List, Dict, Any, Iterator, Optional
+
+import pandas as pd
+from qdrant_client import QdrantClient, models
+
+from qdrant_helpers import iter_payload_pages
+
+# Champs utiles aux analytics (pas de title/overview : le gros du payload)
+ANALYTICS_FIELDS = ["release_date", "vote_average", "popularity", "genres"]
+
+# Colonnes numériques : converties en float64 (None / valeur invalide -> NaN, "" ou 0 -> 0.0)
+NUMERIC_FIELDS = {"vote_average", "popularity", "release_year", "tmdb_id"}
+
+
+def years_from_dates(dates: pd.Series) -> pd.Series:
+    """
+    Équivalent vectorisé de `to_year` : entier des 4 premiers caractères des
+    chaînes d'au moins 4 caractères, <NA> sinon (type Int32).
+    """
+    text = dates.where(dates.map(lambda v: isinstance(v, str)), None).astype("string")
+    head = text.str.slice(0, 4)
+    valid = (text.str.len() >= 4) & head.str.fullmatch(r"\s*[+-]?\d+\s*")
+    years = pd.to_numeric(head.where(valid.fillna(False)), errors="coerce")
+    return years.astype("Int32")
+
+def page_to_frame(payloads: List[Dict[str, Any]], fields: List[str]) -> pd.DataFrame:
+    """Une page de payloads -> DataFrame typé (une colonne par champ demandé)."""
+    columns: Dict[str, Any] = {}
+    for field in fields:
+        values = [p.get(field) for p in payloads]
+        if field in NUMERIC_FIELDS:
+            values = [v if v is None or v else 0 for v in values]
+            columns[field] = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("float64")
+        else:
+            columns[field] = pd.Series(values, dtype=object)
+    frame = pd.DataFrame(columns)
+    if "release_date" in frame:
+        frame["year"] = years_from_dates(frame["release_date"])
+    elif "release_year" in frame:
+        frame["year"] = frame["release_year"].astype("Int32")
+    return frame
+
+def iter_frames(client: QdrantClient, collection_name: str, fields: Optional[List[str]] = None, filter_: Optional[models.Filter] = None, page_size: int = 2000) -> Iterator[pd.DataFrame]:
+    """Pages du scroll sous forme de DataFrames, en ne demandant que `fields` à Qdrant."""
+    fields = list(fields or ANALYTICS_FIELDS)
+    for page in iter_payload_pages(client, collection_name, filter_, page_size=page_size, fields=fields):
+        yield page_to_frame(page, fields)
+
+def fetch_frame(client: QdrantClient, collection_name: str, fields: Optional[List[str]] = None, filter_: Optional[models.Filter] = None, page_size: int = 2000, limit_total: Optional[int] = None) -> pd.DataFrame:
+    """
+    Collection (ou sous-ensemble filtré) en un DataFrame colonne par colonne :
+    seuls les champs demandés transitent, et chaque page de dicts est libérée
+    dès qu'elle est convertie.
+    """
+    fields = list(fields or ANALYTICS_FIELDS)
+    frames: List[pd.DataFrame] = []
+    fetched = 0
+    for frame in iter_frames(client, collection_name, fields, filter_, page_size):
+        if limit_total is not None and fetched + len(frame) >= limit_total:
+            frames.append(frame.iloc[:limit_total - fetched])
+            break
+        frames.append(frame)
+        fetched += len(frame)
+    if not frames:
+        return page_to_frame([], fields)
+    return pd.concat(frames, ignore_index=True)
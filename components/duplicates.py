@@ -0,0 +1,190 @@
+"""
+Détection des quasi-doublons du catalogue (ressorties, remakes, lignes sales).
+
+    python components/duplicates.py --threshold 0.95
+    python components/duplicates.py --threshold 0.97 --path :memory:
+
+Les vecteurs stockés (copie locale de vector_mirror.py) sont comparés par
+blocs, sans jamais construire la matrice N x N : seules les paires au-dessus
+du seuil cosinus sont gardées, puis regroupées en clusters (composantes
+connexes). Pour chaque cluster, le film le plus populaire est le
+représentant. Le résultat (.cache/duplicates_<collection>.json) sert à
+masquer les doublons à la recherche, ou à les ignorer à l'ingestion :
+
+    python components/ingest.py ./content/tmdb_5000_movies.csv --sync --skip-duplicates
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+
+def duplicate_pairs(mat: np.ndarray, threshold: float, block_rows: int = 1024, block_cols: int = 8192, progress=None) -> List[Tuple[int, int, float]]:
+    """
+    Paires (i, j, score) avec i < j et cosinus >= `threshold`, sur une matrice
+    de vecteurs normalisés. Seul le triangle supérieur est calculé, bloc par bloc.
+    """
+    n = len(mat)
+    pairs: List[Tuple[int, int, float]] = []
+    for r0 in range(0, n, block_rows):
+        rows = np.asarray(mat[r0:r0 + block_rows], dtype=np.float32)
+        for c0 in range(r0 - r0 % block_cols, n, block_cols):
+            cols = np.asarray(mat[c0:c0 + block_cols], dtype=np.float32)
+            sims = rows @ cols.T
+            ii, jj = np.nonzero(sims >= threshold)
+            gi, gj = ii + r0, jj + c0
+            keep = gi < gj
+            pairs.extend(zip(gi[keep].tolist(), gj[keep].tolist(), sims[ii[keep], jj[keep]].tolist()))
+        if progress:
+            progress(min(r0 + block_rows, n), n)
+    return pairs
+
+def cluster_pairs(n: int, pairs: List[Tuple[int, int, float]]) -> List[List[int]]:
+    """Composantes connexes (union-find) des paires ; seuls les groupes de 2 films ou plus sont rendus."""
+    parent = list(range(n))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j, _ in pairs:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    groups: Dict[int, Set[int]] = {}
+    for i, j, _ in pairs:
+        groups.setdefault(find(i), set()).update((i, j))
+    return [sorted(members) for members in groups.values()]
+
+
+class DuplicateIndex:
+    """
+    Clusters de quasi-doublons chargés depuis le JSON du job : représentant de
+    chaque film et ensemble des films à masquer (membres non représentants).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta: Dict[str, Any] = {}
+        self.clusters: List[Dict[str, Any]] = []
+        self.canonical_of: Dict[int, int] = {}
+        self._mtime: Optional[float] = None
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self.clusters)
+
+    def reload(self):
+        """(Re)lit le fichier s'il a changé depuis la dernière lecture."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        self.meta = {k: v for k, v in data.items() if k != "clusters"}
+        self.clusters = data.get("clusters") or []
+        self.canonical_of = {int(m): int(c["canonical"]) for c in self.clusters for m in c["members"]}
+        self._mtime = mtime
+
+    def duplicate_ids(self) -> Set[int]:
+        """Films à ignorer : tous les membres sauf le représentant de leur cluster."""
+        return {m for m, c in self.canonical_of.items() if m != c}
+
+    def collapse(self, hits: List[Any], top_k: int) -> List[Any]:
+        """Garde le premier (meilleur) résultat de chaque cluster, dans l'ordre des scores."""
+        seen: Set[int] = set()
+        kept = []
+        for h in hits:
+            key = self.canonical_of.get(int(h.id), int(h.id))
+            if key in seen:
+                continue
+            seen.add(key)
+            kept.append(h)
+            if len(kept) >= top_k:
+                break
+        return kept
+
+
+def find_duplicates(ids: np.ndarray, vectors: np.ndarray, payloads: List[Dict[str, Any]], threshold: float, block_rows: int = 1024, block_cols: int = 8192, progress=None) -> List[Dict[str, Any]]:
+    """Clusters de quasi-doublons, du plus gros au plus petit, avec leur représentant (le plus populaire)."""
+    pairs = duplicate_pairs(vectors, threshold, block_rows=block_rows, block_cols=block_cols, progress=progress)
+    groups = cluster_pairs(len(ids), pairs)
+    group_of = {m: g for g, members in enumerate(groups) for m in members}
+    # Plus faible similarité retenue dans chaque cluster (chaînage : peut être < aux autres paires)
+    min_scores = [1.0] * len(groups)
+    for i, _, score in pairs:
+        g = group_of[i]
+        min_scores[g] = min(min_scores[g], score)
+    clusters = []
+    for g, members in enumerate(groups):
+        canonical = max(members, key=lambda m: (float(payloads[m].get("popularity") or 0), -int(ids[m])))
+        clusters.append({
+            "canonical": int(ids[canonical]),
+            "members": [int(ids[m]) for m in members],
+            "titles": [payloads[m].get("title") for m in members],
+            "min_score": round(float(min_scores[g]), 4),
+        })
+    clusters.sort(key=lambda c: (-len(c["members"]), c["canonical"]))
+    return clusters
+
+def run_job(client, collection_name: str, cache_dir: Path, threshold: float = 0.95, out: Optional[Path] = None, block_rows: int = 1024, block_cols: int = 8192, progress=None) -> Dict[str, Any]:
+    """Reconstruit la copie locale des vecteurs si besoin, cherche les doublons et écrit le JSON."""
+    from qdrant_helpers import collection_version
+    from vector_mirror import VectorMirror
+
+    t0 = time.perf_counter()
+    mirror = VectorMirror(collection_name, Path(cache_dir) / f"mirror_{collection_name}")
+    if mirror.version is None or mirror.version != collection_version(client, collection_name):
+        mirror.build(client)
+    state = mirror.state
+    clusters = find_duplicates(state.ids, state.vectors, state.payloads, threshold, block_rows=block_rows, block_cols=block_cols, progress=progress)
+    report = {
+        "collection": collection_name,
+        "version": state.version,
+        "threshold": threshold,
+        "points": len(state.ids),
+        "clusters_count": len(clusters),
+        "duplicates": sum(len(c["members"]) - 1 for c in clusters),
+        "seconds": round(time.perf_counter() - t0, 2),
+        "clusters": clusters,
+    }
+    out = Path(out) if out else Path(cache_dir) / f"duplicates_{collection_name}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    tmp.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    tmp.replace(out)
+    return report
+
+
+if __name__ == "__main__":
+    from qdrant_helpers import client_from_env, CACHE_DIR
+
+    parser = argparse.ArgumentParser(description="Cherche les quasi-doublons de la collection (cosinus >= seuil) et écrit les clusters.")
+    parser.add_argument("--collection", default=os.getenv("COLLECTION_NAME", "tmdb_movies"))
+    parser.add_argument("--path", default=None, help="Qdrant local (dossier ou :memory:) au lieu de QDRANT_URL")
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--out", default=None, help="Fichier JSON (défaut : .cache/duplicates_<collection>.json)")
+    parser.add_argument("--block-rows", type=int, default=1024)
+    parser.add_argument("--block-cols", type=int, default=8192)
+    args = parser.parse_args()
+
+    client = client_from_env(args.path)
+    report = run_job(
+        client, args.collection, CACHE_DIR, threshold=args.threshold, out=args.out,
+        block_rows=args.block_rows, block_cols=args.block_cols,
+        progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True)
+    )
+    print(f"\n{report['points']} films, {report['clusters_count']} clusters, {report['duplicates']} doublons ({report['seconds']}s)")
+    for c in report["clusters"][:10]:
+        print(f"  {len(c['members'])} x {c['titles'][:3]}")
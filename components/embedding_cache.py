@@ -0,0 +1,238 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import List, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Forme canonique d'une requête : Unicode NFC, espaces fusionnés, sans espaces aux bords."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+def cache_key(model_name: str, text: str, normalize_embeddings: bool = True) -> str:
+    raw = f"{model_name}\0{int(normalize_embeddings)}\0{normalize_query(text)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class DiskVectorStore:
+    """
+    Tier disque : vecteurs float32 dans un fichier mappé en mémoire (np.memmap)
+    et index SQLite clé -> slot. Quand les `capacity` slots sont pleins, le slot
+    utilisé le moins récemment est réutilisé.
+
+    Les dates d'accès des lectures sont gardées en mémoire et écrites par lots
+    (à l'écriture suivante, à la fermeture ou toutes les `touch_batch` lectures).
+    """
+
+    def __init__(self, directory: Path, dim: int, capacity: int, touch_batch: int = 64):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.capacity = capacity
+        self.touch_batch = touch_batch
+        self.evictions = 0
+        self._touched: Dict[str, float] = {}
+        self._db = sqlite3.connect(str(self.directory / "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER UNIQUE, last_used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)")
+        meta = dict(self._db.execute("SELECT k, v FROM meta").fetchall())
+        vectors_path = self.directory / "vectors.f32"
+        if meta.get("dim") != str(dim) or meta.get("capacity") != str(capacity) or not vectors_path.exists():
+            # Géométrie différente (ou premier lancement) : on repart d'un fichier vide
+            self._db.execute("DELETE FROM entries")
+            self._db.executemany("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", [("dim", str(dim)), ("capacity", str(capacity))])
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="w+", shape=(capacity, dim))
+        else:
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        self._db.commit()
+        # Les slots sont attribués dans l'ordre et une éviction réutilise le slot libéré :
+        # le prochain slot libre est donc toujours MAX(slot) + 1
+        self._next_slot = self._db.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._touched[key] = time.time()
+        if len(self._touched) >= self.touch_batch:
+            self._flush_touched()
+            self._db.commit()
+        return np.array(self._vectors[row[0]])
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(ts, key) for key, ts in self._touched.items()])
+            self._touched.clear()
+
+    def _slot_for(self, key: str) -> int:
+        row = self._db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            return row[0]
+        if self._next_slot < self.capacity:
+            self._next_slot += 1
+            return self._next_slot - 1
+        slot, old_key = self._db.execute("SELECT slot, key FROM entries ORDER BY last_used LIMIT 1").fetchone()
+        self._db.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+        self.evictions += 1
+        return slot
+
+    def put(self, key: str, vector: np.ndarray):
+        self.put_many([(key, vector)])
+
+    def put_many(self, items: Sequence[Tuple[str, np.ndarray]]):
+        """Écrit un lot de vecteurs : une seule transaction SQLite et un seul flush du fichier."""
+        if not items:
+            return
+        # Les accès en attente d'abord, pour que l'éviction suive le vrai ordre LRU
+        self._flush_touched()
+        now = time.time()
+        for key, vector in items:
+            slot = self._slot_for(key)
+            self._vectors[slot] = vector
+            self._db.execute("INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)", (key, slot, now))
+        self._vectors.flush()
+        self._db.commit()
+
+    def close(self):
+        self._flush_touched()
+        self._db.commit()
+        self._vectors.flush()
+        self._db.close()
+
+
+class EmbeddingCache:
+    """
+    Cache des embeddings de requêtes à deux niveaux : LRU en mémoire
+    (`memory_items` entrées) puis stockage disque borné à `disk_bytes` octets.
+    Sans `directory`, seul le niveau mémoire est utilisé.
+    """
+
+    def __init__(self, model_name: str, directory: Optional[Path] = None, memory_items: int = 512, disk_bytes: int = 32 * 1024 * 1024):
+        self.model_name = model_name
+        self.directory = Path(directory) / hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:12] if directory else None
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.stats: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk: Optional[DiskVectorStore] = None
+        self._lock = threading.Lock()
+        dim = _stored_dim(self.directory) if self.directory is not None else None
+        if dim:
+            self._disk_store(dim)
+
+    def _disk_store(self, dim: int) -> Optional[DiskVectorStore]:
+        if self.directory is None:
+            return None
+        if self._disk is None or self._disk.dim != dim:
+            capacity = max(1, self.disk_bytes // (dim * 4))
+            self._disk = DiskVectorStore(self.directory, dim, capacity)
+        return self._disk
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return vec
+            if self._disk is not None:
+                vec = self._disk.get(key)
+                if vec is not None:
+                    self._remember(key, vec)
+                    self.stats["disk_hits"] += 1
+                    return vec
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, vector: np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            disk = self._disk_store(vector.shape[-1])
+            if disk is not None:
+                disk.put(key, vector)
+
+    def put_many(self, items: Sequence[Tuple[str, np.ndarray]]):
+        items = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in items]
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            disk = self._disk_store(items[0][1].shape[-1])
+            if disk is not None:
+                disk.put_many(items)
+
+    def summary(self) -> Dict[str, Union[int, float]]:
+        total = sum(self.stats.values())
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "memory_size": len(self._memory),
+            "disk_size": len(self._disk) if self._disk is not None else 0,
+            "disk_evictions": self._disk.evictions if self._disk is not None else 0,
+        }
+
+
+def _stored_dim(directory: Path) -> Optional[int]:
+    if not (directory / "index.sqlite").exists():
+        return None
+    try:
+        with closing(sqlite3.connect(str(directory / "index.sqlite"))) as db:
+            row = db.execute("SELECT v FROM meta WHERE k = 'dim'").fetchone()
+        return int(row[0]) if row else None
+    except sqlite3.Error:
+        return None
+
+
+class CachedEmbedder:
+    """
+    Enveloppe d'un SentenceTransformer : même appel `encode(...)`, mais les
+    textes déjà vus sont servis par l'EmbeddingCache et seuls les autres sont
+    encodés (en un seul lot).
+    """
+
+    def __init__(self, model, model_name: str, cache: EmbeddingCache):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def encode(self, sentences: Union[str, Sequence[str]], normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts: List[str] = [sentences] if single else list(sentences)
+        keys = [cache_key(self.model_name, t, normalize_embeddings) for t in texts]
+        vectors: List[Optional[np.ndarray]] = [self.cache.get(k) for k in keys]
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            kwargs.pop("convert_to_numpy", None)
+            encoded = self.model.encode([normalize_query(texts[i]) for i in missing], normalize_embeddings=normalize_embeddings, convert_to_numpy=True, **kwargs)
+            for i, vec in zip(missing, encoded):
+                vectors[i] = np.asarray(vec, dtype=np.float32)
+            self.cache.put_many([(keys[i], vectors[i]) for i in missing])
+
+        out = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return out[0] if single else out
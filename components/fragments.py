@@ -0,0 +1,78 @@
+"""
+Sections de page exécutées en fragments Streamlit (st.fragment) : un widget
+d'une section ne relance que cette section, pas tout le script (sidebar et
+get_collection, catalogue des genres, agrégats des autres sections). Leurs
+entrées et résultats sont gardés dans st.session_state pour survivre aux
+reruns partiels comme complets.
+
+Chaque exécution d'une section est comptée (passage complet du script ou
+rerun isolé du fragment) et chronométrée : par session, cf.
+`render_section_report`, et dans la télémétrie (étape « section:<nom> »).
+"""
+import functools
+import time
+from typing import Callable, Dict, Any
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from services import get_telemetry
+
+RUNS_KEY = "_section_runs"
+
+
+def is_fragment_rerun() -> bool:
+    """Vrai si ce passage ne relance qu'un (ou des) fragment(s), pas le script complet."""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def record_section_run(name: str, ms: float, isolated: bool = False):
+    runs: Dict[str, Dict[str, Any]] = st.session_state.setdefault(RUNS_KEY, {})
+    stats = runs.setdefault(name, {"full": 0, "isolated": 0, "last_ms": 0.0, "total_ms": 0.0})
+    stats["isolated" if isolated else "full"] += 1
+    stats["last_ms"] = ms
+    stats["total_ms"] += ms
+    get_telemetry().observe(f"section:{name}", ms)
+
+def section(name: str, fragment: bool = True) -> Callable[[Callable], Callable]:
+    """
+    Décorateur : la fonction de rendu devient un fragment (sauf `fragment=False`,
+    pour une section sans widget qu'on veut seulement chronométrer) et chacune
+    de ses exécutions est enregistrée sous `name`.
+    """
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            isolated = is_fragment_rerun()
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_section_run(name, (time.perf_counter() - t0) * 1000, isolated)
+        return st.fragment(run) if fragment else run
+    return decorate
+
+def section_frame() -> pd.DataFrame:
+    rows = [
+        {
+            "Section": name,
+            "Passages complets": stats["full"],
+            "Reruns isolés": stats["isolated"],
+            "Dernier (ms)": stats["last_ms"],
+            "Moyenne (ms)": stats["total_ms"] / max(1, stats["full"] + stats["isolated"]),
+        }
+        for name, stats in st.session_state.get(RUNS_KEY, {}).items()
+    ]
+    return pd.DataFrame(rows).round(1) if rows else pd.DataFrame()
+
+@section("Exécutions par section")
+def render_section_report():
+    """Exécutions de chaque section dans cette session (rafraîchir sans relancer la page)."""
+    st.markdown("Exécutions par section (cette session)")
+    st.button("Rafraîchir", key="section_report_refresh")
+    df = section_frame()
+    if df.empty:
+        st.caption("Aucune section exécutée pour l'instant.")
+    else:
+        st.dataframe(df, use_container_width=True, hide_index=True)
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from qdrant_client import QdrantClient
+
+from qdrant_helpers import collection_version
+
+
+class GenreCatalog:
+    """
+    Catalogue des genres (liste triée + nombre de films par genre) calculé sur
+    toute la collection, puis gardé en mémoire et sur disque avec la version de
+    la collection. Il n'est recalculé que lorsque cette version change.
+    """
+
+    def __init__(self, collection_name: str, cache_path: Optional[Path] = None, check_interval: float = 30.0, page_size: int = 2000):
+        self.collection_name = collection_name
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.check_interval = check_interval
+        self.page_size = page_size
+        self.version: Optional[str] = None
+        self.counts: Dict[str, int] = {}
+        self.computed_at: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def genres(self) -> List[str]:
+        return sorted(self.counts)
+
+    def get(self, client: QdrantClient) -> "GenreCatalog":
+        """Rend le catalogue, après l'avoir rafraîchi si la collection a changé."""
+        with self._lock:
+            now = time.monotonic()
+            if self.version is not None and now - self._checked_at < self.check_interval:
+                return self
+            version = collection_version(client, self.collection_name)
+            self._checked_at = now
+            if version != self.version:
+                self._refresh(client, version)
+            return self
+
+    def invalidate(self):
+        with self._lock:
+            self.version = None
+
+    def _refresh(self, client: QdrantClient, version: str):
+        # Scroll complet en ne demandant que le champ "genres"
+        counter: Counter = Counter()
+        next_offset = None
+        while True:
+            points, next_offset = client.scroll(
+                collection_name=self.collection_name,
+                with_vectors=False,
+                with_payload=["genres"],
+                limit=self.page_size,
+                offset=next_offset
+            )
+            for p in points:
+                for g in (p.payload or {}).get("genres") or []:
+                    if isinstance(g, str) and g:
+                        counter[g] += 1
+            if not points or next_offset is None:
+                break
+        self.counts = dict(counter)
+        self.version = version
+        self.computed_at = time.time()
+        self._save()
+
+    def _load(self):
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        if data.get("collection") != self.collection_name:
+            return
+        self.version = data.get("version")
+        self.counts = {str(g): int(n) for g, n in (data.get("counts") or {}).items()}
+        self.computed_at = data.get("computed_at")
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({
+                "collection": self.collection_name,
+                "version": self.version,
+                "computed_at": self.computed_at,
+                "counts": self.counts,
+            }, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.cache_path)
+        except OSError:
+            pass
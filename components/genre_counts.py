@@ -0,0 +1,81 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple
+
+from qdrant_client import QdrantClient, models
+
+from qdrant_helpers import client_from_env
+
+
+def genre_filter(genre: str) -> models.Filter:
+    return models.Filter(must=[models.FieldCondition(key="genres", match=models.MatchValue(value=genre))])
+
+def count_genres_sequential(client: QdrantClient, collection_name: str, genres: List[str], exact: bool = True) -> Dict[str, int]:
+    """Chemin historique : un `client.count` bloquant par genre, l'un après l'autre."""
+    return {
+        g: client.count(collection_name=collection_name, count_filter=genre_filter(g), exact=exact).count
+        for g in genres
+    }
+
+def count_genres(client: QdrantClient, collection_name: str, genres: List[str], exact: bool = True, max_workers: int = 8) -> Dict[str, int]:
+    """
+    Compte les films de chaque genre en parallèle (pool de threads, au plus
+    `max_workers` requêtes en vol). `exact=False` demande à Qdrant un comptage
+    approximatif, plus rapide sur les grosses collections.
+    """
+    genres = list(dict.fromkeys(genres))
+    if not genres:
+        return {}
+    if max_workers <= 1 or len(genres) == 1:
+        return count_genres_sequential(client, collection_name, genres, exact=exact)
+
+    def _count(g: str) -> int:
+        return client.count(collection_name=collection_name, count_filter=genre_filter(g), exact=exact).count
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(genres))) as pool:
+        counts = list(pool.map(_count, genres))
+    return dict(zip(genres, counts))
+
+def compare_count_paths(client: QdrantClient, collection_name: str, genres: List[str], exact: bool = True, max_workers: int = 8, repeat: int = 3) -> Dict[str, Any]:
+    """Compare temps et résultats du chemin séquentiel et du chemin concurrent."""
+    def _best(fn) -> Tuple[float, Dict[str, int]]:
+        best, result = float("inf"), {}
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t0)
+        return best, result
+
+    t_seq, seq = _best(lambda: count_genres_sequential(client, collection_name, genres, exact=exact))
+    t_par, par = _best(lambda: count_genres(client, collection_name, genres, exact=exact, max_workers=max_workers))
+    return {
+        "genres": len(genres),
+        "exact": exact,
+        "max_workers": max_workers,
+        "sequential_ms": round(t_seq * 1000, 2),
+        "concurrent_ms": round(t_par * 1000, 2),
+        "speedup": round(t_seq / t_par, 2) if t_par > 0 else None,
+        "same_counts": seq == par,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare le comptage par genre séquentiel et concurrent.")
+    parser.add_argument("genres", nargs="*", help="Genres à compter (défaut : tous les genres de la collection)")
+    parser.add_argument("--collection", default=os.getenv("COLLECTION_NAME", "tmdb_movies"))
+    parser.add_argument("--path", default=None, help="Qdrant local (dossier ou :memory:) au lieu de QDRANT_URL")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--approx", action="store_true", help="Comptage approximatif (exact=False)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    client = client_from_env(args.path)
+    genres = args.genres
+    if not genres:
+        from genre_catalog import GenreCatalog
+        genres = GenreCatalog(args.collection).get(client).genres
+    report = compare_count_paths(client, args.collection, genres, exact=not args.approx, max_workers=args.workers, repeat=args.repeat)
+    for k, v in report.items():
+        print(f"{k:>14}: {v}")
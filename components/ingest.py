@@ -0,0 +1,559 @@
+"""
+Ingestion TMDB -> Qdrant en flux (remplace les cellules d'ingestion du notebook).
+
+    python components/ingest.py ./content/tmdb_5000_movies.csv --recreate
+    python components/ingest.py ./content/tmdb_5000_movies.csv --path :memory:
+
+Le CSV est lu par morceaux, chaque lot est encodé puis envoyé à Qdrant par un
+pool de threads ; les files entre étapes sont bornées pour garder la mémoire
+constante. Un fichier de checkpoint note les lots déjà envoyés : relancer la
+même commande après un échec reprend là où elle s'était arrêtée.
+
+    python components/ingest.py ./content/tmdb_5000_movies.csv --sync
+
+Le mode `--sync` compare des empreintes de contenu stockées sur chaque point :
+seuls les films dont le titre/résumé a changé sont ré-encodés, les autres
+métadonnées sont mises à jour par set_payload, et les films absents du CSV
+sont supprimés.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from qdrant_client import QdrantClient, models
+
+from qdrant_helpers import client_from_env, ensure_payload_indexes, is_local_client, resolve_alias, CACHE_DIR
+from duplicates import DuplicateIndex
+from collection_profiles import PROFILES, collection_config
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+_DONE = object()
+
+# Champs couverts par meta_hash (tout sauf le texte encodé et les champs techniques)
+META_FIELDS = ("tmdb_id", "genres", "release_date", "release_year", "popularity", "vote_average", "vote_count")
+
+
+# ----------------------------
+# Nettoyage et payloads (mêmes règles que le notebook)
+# ----------------------------
+def parse_genres(x) -> List[str]:
+    """Convertit la chaîne JSON de genres en liste de noms."""
+    if pd.isna(x) or not isinstance(x, str) or x.strip() == "":
+        return []
+    try:
+        arr = ast.literal_eval(x)  # ex: "[{'id': 28, 'name': 'Action'}]"
+        return [g.get("name") for g in arr if isinstance(g, dict) and "name" in g]
+    except Exception:
+        return []
+
+def clean_chunk(df: pd.DataFrame, seen_ids: Set[int]) -> pd.DataFrame:
+    """Nettoie un morceau du CSV ; `seen_ids` sert au dédoublonnage sur id entre morceaux."""
+    df = df.copy()
+    df["id"] = pd.to_numeric(df["id"], errors="coerce")
+    df = df[df["id"].notna()]
+    df["id"] = df["id"].astype(int)
+    df["title"] = df["title"].fillna("").astype(str) if "title" in df.columns else ""
+    df["overview"] = df["overview"].fillna("").astype(str) if "overview" in df.columns else ""
+    df["genres_list"] = df["genres"].apply(parse_genres) if "genres" in df.columns else [[] for _ in range(len(df))]
+    df["release_date"] = pd.to_datetime(df["release_date"], errors="coerce") if "release_date" in df.columns else pd.NaT
+    for col in ["popularity", "vote_average"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0) if col in df.columns else 0.0
+    df["vote_count"] = pd.to_numeric(df["vote_count"], errors="coerce").fillna(0).astype(int) if "vote_count" in df.columns else 0
+
+    # On garde des lignes avec au moins un texte pour faire un embedding
+    df = df[(df["overview"].str.strip() != "") | (df["title"].str.strip() != "")]
+    df = df.drop_duplicates(subset=["id"], keep="first")
+    df = df[~df["id"].isin(seen_ids)]
+    seen_ids.update(df["id"].tolist())
+    return df
+
+def embedding_texts(df: pd.DataFrame) -> List[str]:
+    # Texte = title + overview pour de meilleurs embeddings
+    return (df["title"] + ". " + df["overview"]).tolist()
+
+def frame_payloads(df: pd.DataFrame, ingested_at: str) -> List[Dict[str, Any]]:
+    """Payloads Qdrant d'un morceau nettoyé (colonnes lues une fois, sans iterrows)."""
+    dates = df["release_date"]
+    release_date = dates.dt.strftime("%Y-%m-%d").where(dates.notna(), None).tolist()
+    release_year = [int(y) if not pd.isna(y) else None for y in dates.dt.year]
+    return [
+        with_hashes({
+            "tmdb_id": int(tmdb_id),
+            "title": title,
+            "overview": overview,
+            "genres": list(genres),
+            "release_date": date,
+            "release_year": year,
+            "popularity": float(pop),
+            "vote_average": float(vote),
+            "vote_count": int(votes),
+            "ingested_at": ingested_at,
+        })
+        for tmdb_id, title, overview, genres, date, year, pop, vote, votes in zip(
+            df["id"], df["title"], df["overview"], df["genres_list"], release_date, release_year,
+            df["popularity"], df["vote_average"], df["vote_count"]
+        )
+    ]
+
+def text_hash(title: str, overview: str) -> str:
+    return hashlib.sha1(f"{title}\0{overview}".encode("utf-8")).hexdigest()
+
+def meta_hash(payload: Dict[str, Any]) -> str:
+    meta = {k: payload.get(k) for k in META_FIELDS}
+    return hashlib.sha1(json.dumps(meta, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def with_hashes(payload: Dict[str, Any]) -> Dict[str, Any]:
+    payload["text_hash"] = text_hash(payload.get("title") or "", payload.get("overview") or "")
+    payload["meta_hash"] = meta_hash(payload)
+    return payload
+
+def utc_now() -> str:
+    return pd.Timestamp.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def stamp_payloads(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Date `ingested_at` au moment de l'écriture (et non de la lecture du CSV) :
+    c'est sur ce champ que les caches (instantané analytics...) repèrent les
+    points modifiés depuis leur dernier passage.
+    """
+    stamp = utc_now()
+    for payload in payloads:
+        payload["ingested_at"] = stamp
+    return payloads
+
+
+# ----------------------------
+# Collection
+# ----------------------------
+def prepare_collection(client: QdrantClient, collection_name: str, dim: int, recreate: bool = False, profile: Optional[str] = None):
+    """
+    Crée la collection (ou la recrée si `recreate`) puis les index de payload.
+    `profile` (cf. collection_profiles.py) fixe quantification, HNSW et stockage
+    disque à la création ; sans profil, configuration par défaut de Qdrant.
+    """
+    # Nom servi par un alias (cf. reindex.py) : on écrit à travers l'alias, jamais de suppression
+    aliased = resolve_alias(client, collection_name)
+    if aliased and recreate:
+        raise ValueError(f"{collection_name} est un alias (vers {aliased}) : reconstruire avec components/reindex.py")
+    exists = aliased is not None or client.collection_exists(collection_name)
+    if exists and recreate:
+        client.delete_collection(collection_name)
+        exists = False
+    if not exists:
+        if profile:
+            client.create_collection(collection_name=collection_name, **collection_config(profile, dim))
+        else:
+            client.create_collection(
+                collection_name=collection_name,
+                vectors_config=models.VectorParams(size=int(dim), distance=models.Distance.COSINE)
+            )
+    ensure_payload_indexes(client, collection_name)
+
+
+# ----------------------------
+# Checkpoint et mesures
+# ----------------------------
+class Checkpoint:
+    """
+    Lots déjà envoyés pour une exécution donnée. L'empreinte (fichier CSV,
+    taille des morceaux et des lots, modèle, collection) invalide le checkpoint
+    si l'un de ces paramètres change ; il est effacé quand l'exécution se
+    termine sans erreur (seule une exécution interrompue est reprise).
+    """
+
+    def __init__(self, path: Optional[Path], fingerprint: str):
+        self.path = Path(path) if path else None
+        self.fingerprint = fingerprint
+        self.done: Set[int] = set()
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("fingerprint") == fingerprint:
+                    self.done = set(data.get("done_batches") or [])
+            except (OSError, ValueError):
+                pass
+
+    def mark(self, batch_no: int):
+        with self._lock:
+            self.done.add(batch_no)
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self.done = set()
+            if self.path and self.path.exists():
+                self.path.unlink()
+
+    def _save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"fingerprint": self.fingerprint, "done_batches": sorted(self.done)}), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+class StageStats:
+    """Lignes traitées et temps actif d'une étape (lecture, embedding, upsert)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, rows: int, seconds: float):
+        with self._lock:
+            self.rows += rows
+            self.seconds += seconds
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "seconds": round(self.seconds, 3), "rows_per_s": round(self.rows_per_s, 1)}
+
+
+def file_fingerprint(csv_path: Path, *parts: Any) -> str:
+    st = csv_path.stat()
+    raw = "|".join([str(csv_path.resolve()), str(st.st_size), str(int(st.st_mtime))] + [str(p) for p in parts])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def ingest_fingerprint(csv_path: Path, chunk_size: int, batch_size: int, model_name: str, collection_name: str, sync: bool = False, skip_ids: Optional[Set[int]] = None) -> str:
+    """Empreinte d'un checkpoint d'ingestion : un checkpoint n'est repris que pour le même CSV et les mêmes réglages."""
+    parts: List[Any] = [chunk_size, batch_size, model_name, collection_name, "sync" if sync else "full"]
+    # Les lots sont numérotés après filtrage : la liste des doublons fait partie de l'empreinte
+    if skip_ids:
+        parts.append(hashlib.sha1(",".join(map(str, sorted(skip_ids))).encode("utf-8")).hexdigest())
+    return file_fingerprint(csv_path, *parts)
+
+
+# ----------------------------
+# Pipeline
+# ----------------------------
+Batch = Tuple[int, List[int], List[str], List[Dict[str, Any]]]
+
+class IngestPipeline:
+    """
+    Lecture CSV -> embedding -> upsert, reliés par des files bornées :
+
+    - un thread lit et nettoie le CSV par morceaux et découpe les lots ;
+    - un thread encode les lots (le modèle batch déjà en interne) ;
+    - `upsert_workers` threads envoient les points à Qdrant.
+
+    Avec `sync=True`, chaque lot est d'abord comparé aux points existants
+    (text_hash / meta_hash) et seuls les changements sont appliqués.
+    """
+
+    def __init__(self, client: QdrantClient, collection_name: str, embedder, chunk_size: int = 2000, batch_size: int = 500, encode_batch_size: int = 64, upsert_workers: int = 4, queue_size: int = 4, checkpoint: Optional[Checkpoint] = None, progress: bool = True, sync: bool = False, skip_ids: Optional[Set[int]] = None):
+        self.client = client
+        self.collection_name = collection_name
+        self.embedder = embedder
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.encode_batch_size = encode_batch_size
+        self.upsert_workers = upsert_workers
+        self.queue_size = queue_size
+        self.checkpoint = checkpoint or Checkpoint(None, "")
+        self.progress = progress
+        self.stats = {name: StageStats(name) for name in ("read", "embed", "upsert")}
+        self.skipped_batches = 0
+        self.sync = sync
+        self.delta = {"new": 0, "text_changed": 0, "meta_changed": 0, "unchanged": 0, "deleted": 0}
+        self.source_ids: Set[int] = set()
+        # Quasi-doublons à ne pas indexer (cf. duplicates.py) ; absents de source_ids, donc supprimés par --sync
+        self.skip_ids: Set[int] = set(skip_ids or ())
+        self.duplicates_skipped = 0
+        self._delta_lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        # Qdrant embarqué : les upserts sont sérialisés (pas d'écritures concurrentes)
+        self._write_lock = threading.Lock() if is_local_client(client) else None
+
+    def iter_batches(self, csv_path: Path) -> Iterator[Batch]:
+        """Lots numérotés de façon déterministe (même CSV + mêmes tailles => mêmes numéros)."""
+        seen = self.source_ids
+        seen.clear()
+        batch_no = 0
+        t0 = time.perf_counter()
+        for chunk in pd.read_csv(csv_path, chunksize=self.chunk_size):
+            df = clean_chunk(chunk, seen)
+            if self.skip_ids:
+                dup = df["id"].isin(self.skip_ids)
+                if dup.any():
+                    self.duplicates_skipped += int(dup.sum())
+                    seen.difference_update(df.loc[dup, "id"].tolist())
+                    df = df[~dup]
+            ingested_at = utc_now()
+            for i in range(0, len(df), self.batch_size):
+                part = df.iloc[i:i + self.batch_size]
+                if batch_no in self.checkpoint.done:
+                    self.skipped_batches += 1
+                else:
+                    batch = (batch_no, part["id"].astype(int).tolist(), embedding_texts(part), frame_payloads(part, ingested_at))
+                    self.stats["read"].add(len(part), time.perf_counter() - t0)
+                    yield batch
+                    t0 = time.perf_counter()
+                batch_no += 1
+
+    def _write(self, fn, **kwargs):
+        # Qdrant embarqué : les écritures sont sérialisées (pas d'écritures concurrentes)
+        if self._write_lock is None:
+            return fn(collection_name=self.collection_name, **kwargs)
+        with self._write_lock:
+            return fn(collection_name=self.collection_name, **kwargs)
+
+    def _count(self, key: str, n: int = 1):
+        with self._delta_lock:
+            self.delta[key] += n
+
+    def apply_delta(self, ids: List[int], texts: List[str], payloads: List[Dict[str, Any]]) -> Tuple[List[int], List[str], List[Dict[str, Any]]]:
+        """
+        Compare un lot aux points déjà stockés. Met à jour directement les
+        payloads dont seules les métadonnées ont changé et rend les lignes à
+        (ré-)encoder : nouveaux films et films dont le texte a changé.
+        """
+        # Seules les empreintes sont relues ; payload complet uniquement pour les points d'avant les empreintes
+        existing = {
+            int(p.id): p.payload or {}
+            for p in self.client.retrieve(collection_name=self.collection_name, ids=ids, with_payload=["text_hash", "meta_hash"], with_vectors=False)
+        }
+        legacy = [pid for pid, old in existing.items() if "text_hash" not in old]
+        if legacy:
+            existing.update(
+                (int(p.id), p.payload or {})
+                for p in self.client.retrieve(collection_name=self.collection_name, ids=legacy, with_payload=True, with_vectors=False)
+            )
+        keep_ids, keep_texts, keep_payloads = [], [], []
+        meta_changed: List[Tuple[int, Dict[str, Any]]] = []
+        for pid, text, payload in zip(ids, texts, payloads):
+            old = existing.get(pid)
+            if old is None:
+                self._count("new")
+            elif (old.get("text_hash") or text_hash(old.get("title") or "", old.get("overview") or "")) != payload["text_hash"]:
+                self._count("text_changed")
+            else:
+                if (old.get("meta_hash") or meta_hash(old)) != payload["meta_hash"] or "text_hash" not in old:
+                    self._count("meta_changed")
+                    meta_changed.append((pid, payload))
+                else:
+                    self._count("unchanged")
+                continue
+            keep_ids.append(pid)
+            keep_texts.append(text)
+            keep_payloads.append(payload)
+        if meta_changed:
+            stamp_payloads([payload for _, payload in meta_changed])
+            meta_ops = [models.SetPayloadOperation(set_payload=models.SetPayload(payload=payload, points=[pid])) for pid, payload in meta_changed]
+            self._write(self.client.batch_update_points, update_operations=meta_ops, wait=True)
+        return keep_ids, keep_texts, keep_payloads
+
+    def delete_missing(self) -> int:
+        """Supprime les points dont l'id n'apparaît plus dans le CSV."""
+        stale: List[int] = []
+        next_offset = None
+        while True:
+            points, next_offset = self.client.scroll(collection_name=self.collection_name, with_payload=False, with_vectors=False, limit=2000, offset=next_offset)
+            stale.extend(int(p.id) for p in points if int(p.id) not in self.source_ids)
+            if not points or next_offset is None:
+                break
+        for i in range(0, len(stale), 1000):
+            self._write(self.client.delete, points_selector=models.PointIdsList(points=stale[i:i + 1000]), wait=True)
+        self._count("deleted", len(stale))
+        return len(stale)
+
+    def _put(self, q: queue.Queue, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def _fail(self, exc: BaseException):
+        if self._error is None:
+            self._error = exc
+        self._stop.set()
+
+    def _reader(self, csv_path: Path, embed_q: queue.Queue):
+        try:
+            for batch in self.iter_batches(csv_path):
+                if self._stop.is_set():
+                    break
+                self._put(embed_q, batch)
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            self._put(embed_q, _DONE)
+
+    def _embed_worker(self, embed_q: queue.Queue, upsert_q: queue.Queue):
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = embed_q.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                batch_no, ids, texts, payloads = item
+                if self.sync:
+                    ids, texts, payloads = self.apply_delta(ids, texts, payloads)
+                    if not ids:
+                        self.checkpoint.mark(batch_no)
+                        continue
+                t0 = time.perf_counter()
+                vectors = np.asarray(self.embedder.encode(texts, batch_size=self.encode_batch_size, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=True), dtype=np.float32)
+                self.stats["embed"].add(len(ids), time.perf_counter() - t0)
+                self._put(upsert_q, (batch_no, ids, vectors, payloads))
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            for _ in range(self.upsert_workers):
+                self._put(upsert_q, _DONE)
+
+    def upsert_batch(self, ids: List[int], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        stamp_payloads(payloads)
+        points = [
+            models.PointStruct(id=int(pid), vector=vec.tolist(), payload=payload)
+            for pid, vec, payload in zip(ids, vectors, payloads)
+        ]
+        self._write(self.client.upsert, points=points, wait=True)
+
+    def _upsert_worker(self, upsert_q: queue.Queue):
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = upsert_q.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                batch_no, ids, vectors, payloads = item
+                t0 = time.perf_counter()
+                self.upsert_batch(ids, vectors, payloads)
+                self.stats["upsert"].add(len(ids), time.perf_counter() - t0)
+                self.checkpoint.mark(batch_no)
+                if self.progress:
+                    print(f"\rlot {batch_no} envoyé — {self.stats['upsert'].rows} points", end="", flush=True)
+        except BaseException as exc:
+            self._fail(exc)
+
+    def run(self, csv_path: Path) -> Dict[str, Any]:
+        csv_path = Path(csv_path)
+        embed_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        upsert_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=2 + self.upsert_workers) as pool:
+            futures = [
+                pool.submit(self._reader, csv_path, embed_q),
+                pool.submit(self._embed_worker, embed_q, upsert_q),
+            ] + [pool.submit(self._upsert_worker, upsert_q) for _ in range(self.upsert_workers)]
+            for f in futures:
+                f.result()
+        if self.progress:
+            print()
+        if self._error is not None:
+            raise self._error
+        if self.sync:
+            self.delete_missing()
+        # Exécution terminée : le checkpoint ne sert qu'à reprendre une exécution interrompue
+        self.checkpoint.clear()
+        wall = time.perf_counter() - t0
+        report = {
+            "collection": self.collection_name,
+            "points": self.stats["upsert"].rows,
+            "skipped_batches": self.skipped_batches,
+            "duplicates_skipped": self.duplicates_skipped,
+            "wall_seconds": round(wall, 3),
+            "rows_per_s": round(self.stats["upsert"].rows / wall, 1) if wall > 0 else 0.0,
+            "stages": {name: s.as_dict() for name, s in self.stats.items()},
+        }
+        if self.sync:
+            report["delta"] = dict(self.delta)
+        return report
+
+
+def load_embedder(model_name: str = EMBEDDING_MODEL_NAME, device: Optional[str] = None):
+    from sentence_transformers import SentenceTransformer
+    if device is None:
+        import torch
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    return SentenceTransformer(model_name, device=device)
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Ingestion en flux du CSV TMDB dans Qdrant (reprise sur checkpoint).")
+    parser.add_argument("csv", help="Chemin du CSV (ex: ./content/tmdb_5000_movies.csv)")
+    parser.add_argument("--collection", default=os.getenv("COLLECTION_NAME", "tmdb_movies"))
+    parser.add_argument("--path", default=None, help="Qdrant local (dossier ou :memory:) au lieu de QDRANT_URL")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Lignes lues par morceau de CSV")
+    parser.add_argument("--batch-size", type=int, default=500, help="Points par upsert")
+    parser.add_argument("--encode-batch-size", type=int, default=64)
+    parser.add_argument("--upsert-workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=4, help="Lots en attente max entre deux étapes")
+    parser.add_argument("--recreate", action="store_true", help="Supprime et recrée la collection (repart de zéro)")
+    parser.add_argument("--sync", action="store_true", help="Synchronisation incrémentale : n'applique que les changements du CSV")
+    parser.add_argument("--checkpoint", default=None, help="Fichier de checkpoint (défaut : .cache/ingest_<collection>.json)")
+    parser.add_argument("--profile", choices=list(PROFILES), default=os.getenv("COLLECTION_PROFILE") or "balanced",
+                        help="Profil appliqué si la collection est créée (cf. collection_profiles.py)")
+    parser.add_argument("--skip-duplicates", nargs="?", const="", default=None, metavar="JSON",
+                        help="N'indexe pas les quasi-doublons trouvés par duplicates.py (défaut : .cache/duplicates_<collection>.json)")
+    parser.add_argument("--quiet", action="store_true")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = build_arg_parser().parse_args(argv)
+    csv_path = Path(args.csv)
+    client = client_from_env(args.path)
+    embedder = load_embedder(args.model, args.device)
+
+    checkpoint_path = Path(args.checkpoint) if args.checkpoint else CACHE_DIR / f"ingest_{args.collection}.json"
+    skip_ids: Set[int] = set()
+    if args.skip_duplicates is not None:
+        duplicates_path = Path(args.skip_duplicates) if args.skip_duplicates else CACHE_DIR / f"duplicates_{args.collection}.json"
+        if not duplicates_path.exists():
+            raise SystemExit(f"{duplicates_path} introuvable : lancer d'abord components/duplicates.py.")
+        skip_ids = DuplicateIndex(duplicates_path).duplicate_ids()
+        print(f"{len(skip_ids)} quasi-doublon(s) ignoré(s) ({duplicates_path})")
+    fingerprint = ingest_fingerprint(csv_path, args.chunk_size, args.batch_size, args.model, args.collection, sync=args.sync, skip_ids=skip_ids)
+    checkpoint = Checkpoint(checkpoint_path, fingerprint)
+    if args.recreate and args.sync:
+        raise SystemExit("--recreate et --sync sont incompatibles.")
+    if args.recreate and resolve_alias(client, args.collection):
+        raise SystemExit(f"{args.collection} est un alias : reconstruire sans interruption avec components/reindex.py.")
+    if args.recreate:
+        checkpoint.clear()
+    elif checkpoint.done:
+        print(f"Reprise : {len(checkpoint.done)} lot(s) déjà envoyés")
+
+    prepare_collection(client, args.collection, embedder.get_sentence_embedding_dimension(), recreate=args.recreate, profile=args.profile)
+    pipeline = IngestPipeline(
+        client, args.collection, embedder,
+        chunk_size=args.chunk_size, batch_size=args.batch_size, encode_batch_size=args.encode_batch_size,
+        upsert_workers=args.upsert_workers, queue_size=args.queue_size, checkpoint=checkpoint, progress=not args.quiet,
+        sync=args.sync, skip_ids=skip_ids
+    )
+    report = pipeline.run(csv_path)
+    for name, s in report["stages"].items():
+        print(f"{name:>7}: {s['rows']} lignes en {s['seconds']}s ({s['rows_per_s']} lignes/s)")
+    print(f"  total: {report['points']} points en {report['wall_seconds']}s ({report['rows_per_s']} lignes/s)")
+    if "delta" in report:
+        print("  delta: " + ", ".join(f"{k}={v}" for k, v in report["delta"].items()))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+class LazyEmbedder:
+    """
+    SentenceTransformer chargé à la demande : ni `sentence_transformers` ni
+    torch ne sont importés avant le premier `encode(...)` (ou `load()`).
+    `start_warmup()` lance ce chargement dans un thread d'arrière-plan pour
+    qu'il soit prêt avant la première recherche.
+    """
+
+    def __init__(self, model_name: str, device: Optional[str] = None):
+        self.model_name = model_name
+        self.device = device
+        self.import_seconds: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self._model = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def loading(self) -> bool:
+        return self._model is None and self._thread is not None and self._thread.is_alive()
+
+    def load(self):
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None:
+                t0 = time.perf_counter()
+                from sentence_transformers import SentenceTransformer
+                t1 = time.perf_counter()
+                model = SentenceTransformer(self.model_name, device=self.device)
+                self.import_seconds = t1 - t0
+                self.load_seconds = time.perf_counter() - t1
+                self._model = model
+        return self._model
+
+    def _warmup(self):
+        try:
+            # Un premier encode initialise aussi les noyaux torch
+            self.load().encode(["warmup"], normalize_embeddings=True)
+        except BaseException as exc:
+            self.error = exc
+
+    def start_warmup(self) -> "LazyEmbedder":
+        with self._lock:
+            if self._model is None and self._thread is None:
+                self._thread = threading.Thread(target=self._warmup, name="embedder-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def encode(self, *args, **kwargs):
+        return self.load().encode(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def status(self) -> Dict[str, Any]:
+        if self.loaded:
+            state = "chargé"
+        elif self.error is not None:
+            state = "erreur"
+        elif self.loading:
+            state = "en chargement"
+        else:
+            state = "non chargé"
+        return {
+            "state": state,
+            "import_seconds": self.import_seconds,
+            "load_seconds": self.load_seconds,
+            "error": str(self.error) if self.error is not None else None,
+        }
@@ -0,0 +1,167 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TMDB_API_BASE = "https://api.themoviedb.org/3"
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p"
+
+# Résultat d'une requête TMDB : (trouvé ?, poster_path). (False, None) = erreur réseau, à ne pas mettre en cache.
+_Lookup = Tuple[bool, Optional[str]]
+
+
+def poster_url(poster_path: Optional[str], size: str = "w342") -> Optional[str]:
+    return f"{TMDB_IMAGE_BASE}/{size}{poster_path}" if poster_path else None
+
+
+class PosterCache:
+    """
+    Cache persistant tmdb_id -> poster_path (SQLite). Un poster_path NULL est un
+    cache négatif (film sans affiche), revérifié après `negative_ttl` secondes.
+    """
+
+    def __init__(self, path: Path, negative_ttl: float = 7 * 24 * 3600):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS posters (tmdb_id INTEGER PRIMARY KEY, poster_path TEXT, fetched_at REAL)")
+        self._db.commit()
+
+    def get_many(self, ids: List[int]) -> Dict[int, Optional[str]]:
+        """Entrées valides du cache (les négatifs expirés sont considérés absents)."""
+        found: Dict[int, Optional[str]] = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._db.execute(f"SELECT tmdb_id, poster_path, fetched_at FROM posters WHERE tmdb_id IN ({marks})", chunk)
+                for tmdb_id, path, fetched_at in rows:
+                    if path is None and now - (fetched_at or 0) > self.negative_ttl:
+                        continue
+                    found[tmdb_id] = path
+        return found
+
+    def put_many(self, entries: Dict[int, Optional[str]]):
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO posters (tmdb_id, poster_path, fetched_at) VALUES (?, ?, ?)",
+                [(tmdb_id, path, now) for tmdb_id, path in entries.items()]
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM posters").fetchone()[0]
+
+
+class PosterResolver:
+    """
+    Résout les affiches TMDB d'un lot d'identifiants : lecture du cache
+    persistant, puis requêtes Movie Details en parallèle sur une seule session
+    HTTP (pool de connexions partagé) pour les identifiants manquants.
+    """
+
+    def __init__(self, token: str, cache: Optional[PosterCache] = None, base_url: str = TMDB_API_BASE, max_workers: int = 8, language: str = "fr-FR", timeout: float = 6.0):
+        self.token = token
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.language = language
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {token}", "Accept": "application/json"})
+
+    def _fetch(self, tmdb_id: int) -> _Lookup:
+        try:
+            resp = self.session.get(f"{self.base_url}/movie/{tmdb_id}", params={"language": self.language}, timeout=self.timeout)
+        except requests.RequestException:
+            return False, None
+        if resp.status_code == 404:
+            return True, None
+        if not resp.ok:
+            return False, None
+        try:
+            return True, resp.json().get("poster_path") or None
+        except ValueError:
+            return False, None
+
+    def resolve_paths(self, ids: Iterable[Any]) -> Dict[int, Optional[str]]:
+        """tmdb_id -> poster_path (None si pas d'affiche ou erreur)."""
+        wanted: List[int] = []
+        for raw in ids:
+            try:
+                wanted.append(int(raw))
+            except (TypeError, ValueError):
+                continue
+        wanted = list(dict.fromkeys(wanted))
+        paths = self.cache.get_many(wanted) if self.cache is not None else {}
+        missing = [i for i in wanted if i not in paths]
+        if missing and self.token:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                results = list(pool.map(self._fetch, missing))
+            fresh = {tmdb_id: path for tmdb_id, (ok, path) in zip(missing, results) if ok}
+            if self.cache is not None:
+                self.cache.put_many(fresh)
+            paths.update(fresh)
+        return {i: paths.get(i) for i in wanted}
+
+    def resolve_many(self, ids: Iterable[Any], size: str = "w342") -> Dict[int, Optional[str]]:
+        """tmdb_id -> URL complète de l'affiche (CDN TMDB)."""
+        return {i: poster_url(p, size) for i, p in self.resolve_paths(ids).items()}
+
+    def prewarm(self, ids: Iterable[Any], batch_size: int = 200, progress=None) -> Dict[str, int]:
+        """Remplit le cache pour tout un catalogue, par lots de `batch_size`."""
+        ids = list(ids)
+        found = 0
+        for i in range(0, len(ids), batch_size):
+            paths = self.resolve_paths(ids[i:i + batch_size])
+            found += sum(1 for p in paths.values() if p)
+            if progress:
+                progress(min(i + batch_size, len(ids)), len(ids))
+        return {"ids": len(ids), "with_poster": found}
+
+
+if __name__ == "__main__":
+    from qdrant_helpers import client_from_env, CACHE_DIR
+
+    parser = argparse.ArgumentParser(description="Pré-remplit le cache local des affiches TMDB pour toute la collection.")
+    parser.add_argument("--collection", default=os.getenv("COLLECTION_NAME", "tmdb_movies"))
+    parser.add_argument("--path", default=None, help="Qdrant local (dossier ou :memory:) au lieu de QDRANT_URL")
+    parser.add_argument("--cache", default=str(CACHE_DIR / "posters.sqlite"))
+    parser.add_argument("--base-url", default=TMDB_API_BASE)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    client = client_from_env(args.path)
+    token = os.getenv("TMDB_API_KEY", "").strip()
+    if not token:
+        raise SystemExit("TMDB_API_KEY manquant.")
+
+    ids: List[int] = []
+    next_offset = None
+    while True:
+        points, next_offset = client.scroll(collection_name=args.collection, with_payload=["tmdb_id"], with_vectors=False, limit=2000, offset=next_offset)
+        ids.extend((p.payload or {}).get("tmdb_id") or p.id for p in points)
+        if not points or next_offset is None:
+            break
+
+    resolver = PosterResolver(token, PosterCache(Path(args.cache)), base_url=args.base_url, max_workers=args.workers)
+    t0 = time.perf_counter()
+    report = resolver.prewarm(ids, progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True))
+    print(f"\n{report['ids']} films, {report['with_poster']} avec affiche, {time.perf_counter() - t0:.1f}s")
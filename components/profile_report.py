@@ -0,0 +1,183 @@
+"""
+Recall@k et latence de chaque profil de collection (collection_profiles.py).
+
+    docker run -p 6333:6333 qdrant/qdrant
+    python components/profile_report.py --url http://localhost:6333 --size 50000
+    python components/profile_report.py --url http://localhost:6333 --source tmdb_movies --ef 16 32 64 128
+
+Pour chaque profil, une collection temporaire est créée avec sa configuration,
+remplie avec les mêmes vecteurs (synthétiques regroupés en thèmes, ou copiés
+depuis une collection existante avec --source), puis interrogée une fois
+l'indexation terminée. La référence est la recherche exacte de Qdrant
+(exhaustive, sans quantification) ; une requête sur deux filtre un genre.
+
+Le Qdrant embarqué (--path) ignore HNSW et quantification : le script y
+tourne, mais le recall y vaut toujours 1. Mesurer sur un serveur.
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from benchmark import REPO_DIR, TMDB_GENRES, synthetic_payloads, latency_stats, git_commit, package_version
+from collection_profiles import PROFILES, collection_config, search_params
+from qdrant_helpers import ensure_payload_indexes, build_search_filter, is_local_client
+
+
+def synthetic_vectors(rng: np.random.Generator, n: int, dim: int, themes: int) -> np.ndarray:
+    """Vecteurs normalisés regroupés autour de `themes` centres (plus proche d'embeddings réels qu'un bruit uniforme)."""
+    centers = rng.standard_normal((themes, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, themes, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def load_source(client: QdrantClient, collection_name: str, limit: Optional[int], page_size: int = 1000) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """Vecteurs et genres d'une collection existante (scroll avec vecteurs)."""
+    vectors, payloads = [], []
+    next_offset = None
+    while True:
+        points, next_offset = client.scroll(collection_name=collection_name, with_vectors=True, with_payload=["genres"], limit=page_size, offset=next_offset)
+        for p in points:
+            vectors.append(p.vector)
+            payloads.append(p.payload or {})
+        if not points or next_offset is None or (limit and len(vectors) >= limit):
+            break
+    vectors = np.asarray(vectors[:limit] if limit else vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True), payloads[:len(vectors)]
+
+def make_queries(rng: np.random.Generator, vectors: np.ndarray, n: int, noise: float = 0.3) -> List[Dict[str, Any]]:
+    """Requêtes proches de films existants (vecteur bruité) ; une sur deux filtre un genre."""
+    picks = rng.integers(0, len(vectors), n)
+    qs = vectors[picks] + noise * rng.standard_normal((n, vectors.shape[1])).astype(np.float32) / np.sqrt(vectors.shape[1])
+    qs /= np.linalg.norm(qs, axis=1, keepdims=True)
+    return [
+        {"vector": qs[i].tolist(), "filter": build_search_filter([TMDB_GENRES[i % 6]]) if i % 2 else None}
+        for i in range(n)
+    ]
+
+def create_profile_collection(client: QdrantClient, name: str, profile: str, vectors: np.ndarray, payloads: List[Dict[str, Any]], force_index: bool, batch_size: int = 1000):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    config = collection_config(profile, vectors.shape[1])
+    if force_index:
+        # Petits jeux de test : construire le graphe HNSW même sous les seuils par défaut
+        config["hnsw_config"].full_scan_threshold = 10
+        config["optimizers_config"] = models.OptimizersConfigDiff(indexing_threshold=10)
+    client.create_collection(collection_name=name, **config)
+    ensure_payload_indexes(client, name)
+    for start in range(0, len(vectors), batch_size):
+        end = min(start + batch_size, len(vectors))
+        client.upsert(
+            collection_name=name,
+            points=models.Batch(ids=list(range(start + 1, end + 1)), vectors=vectors[start:end].tolist(), payloads=payloads[start:end]),
+            wait=True
+        )
+
+def wait_indexed(client: QdrantClient, name: str, timeout: float, expect_indexed: bool = False) -> Dict[str, Any]:
+    """
+    Attend la fin de l'optimisation (statut vert et, si `expect_indexed`, tous
+    les vecteurs dans l'index) ; rend les compteurs de la collection.
+    """
+    # Qdrant embarqué : pas d'index, rien à attendre
+    expect_indexed = expect_indexed and not is_local_client(client)
+    deadline = time.monotonic() + timeout
+    while True:
+        info = client.get_collection(name)
+        done = info.status == models.CollectionStatus.GREEN and (not expect_indexed or (info.indexed_vectors_count or 0) >= (info.points_count or 0))
+        if done or time.monotonic() > deadline:
+            return {"status": str(getattr(info.status, "value", info.status)), "points": info.points_count, "indexed_vectors": info.indexed_vectors_count}
+        time.sleep(0.5)
+
+def measure(client: QdrantClient, name: str, queries: List[Dict[str, Any]], truth: List[List[int]], k: int, params: Optional[models.SearchParams], warmup: int = 5) -> Dict[str, Any]:
+    for q in queries[:warmup]:
+        client.search(collection_name=name, query_vector=q["vector"], query_filter=q["filter"], limit=k, search_params=params)
+    samples, recalls = [], []
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        hits = client.search(collection_name=name, query_vector=q["vector"], query_filter=q["filter"], limit=k, search_params=params)
+        samples.append((time.perf_counter() - t0) * 1000)
+        if expected:
+            recalls.append(len({int(h.id) for h in hits} & set(expected)) / len(expected))
+    return {"recall_at_k": round(float(np.mean(recalls)), 4) if recalls else None, **latency_stats(samples)}
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Recall@k et latence des profils de collection (fast / balanced / accurate).")
+    parser.add_argument("--url", default=None, help="Qdrant serveur (ex. http://localhost:6333)")
+    parser.add_argument("--path", default=None, help="Qdrant embarqué (dossier ou :memory:) ; HNSW et quantification y sont ignorés")
+    parser.add_argument("--source", default=None, help="Copier les vecteurs de cette collection au lieu de vecteurs synthétiques")
+    parser.add_argument("--size", type=int, default=20000, help="Nombre de points (synthétiques, ou max copiés depuis --source)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="*", default=None, help="Valeurs de hnsw_ef à balayer (défaut : celle de chaque profil)")
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--prefix", default="profile_report")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-force-index", action="store_true", help="Garder les seuils d'indexation par défaut de Qdrant")
+    parser.add_argument("--index-timeout", type=float, default=600.0)
+    parser.add_argument("--keep", action="store_true", help="Ne pas supprimer les collections de test")
+    parser.add_argument("--out", default=None, help="Fichier JSON (défaut : .cache/benchmarks/profiles-<commit>-<date>.json)")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = build_arg_parser().parse_args(argv)
+    if args.url:
+        client = QdrantClient(url=args.url, timeout=60.0)
+    else:
+        from qdrant_helpers import client_from_env
+        client = client_from_env(args.path or ":memory:")
+
+    rng = np.random.default_rng(args.seed)
+    if args.source:
+        vectors, payloads = load_source(client, args.source, args.size)
+    else:
+        vectors = synthetic_vectors(rng, args.size, args.dim, themes=max(10, args.size // 200))
+        payloads = synthetic_payloads(rng, 1, args.size, "2024-01-01T00:00:00+00:00")
+    queries = make_queries(rng, vectors, args.queries)
+    print(f"{len(vectors)} vecteurs de dimension {vectors.shape[1]}, {len(queries)} requêtes, k={args.k}")
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "git_commit": git_commit(), "qdrant_client": package_version("qdrant-client"), "server": args.url or args.path or ":memory:",
+            "points": len(vectors), "dim": int(vectors.shape[1]), "queries": len(queries), "k": args.k, "source": args.source or "synthetic",
+        },
+        "profiles": {},
+    }
+    truth: Optional[List[List[int]]] = None
+    for profile in args.profiles:
+        name = f"{args.prefix}_{profile}"
+        t0 = time.perf_counter()
+        create_profile_collection(client, name, profile, vectors, payloads, force_index=not args.no_force_index)
+        state = wait_indexed(client, name, args.index_timeout, expect_indexed=not args.no_force_index)
+        state["build_seconds"] = round(time.perf_counter() - t0, 2)
+        if truth is None:
+            # Référence : recherche exhaustive sur les vecteurs d'origine
+            exact = search_params(exact=True)
+            truth = [
+                [int(h.id) for h in client.search(collection_name=name, query_vector=q["vector"], query_filter=q["filter"], limit=args.k, search_params=exact)]
+                for q in queries
+            ]
+        runs = {}
+        for ef in args.ef or [PROFILES[profile]["hnsw_ef"]]:
+            params = search_params(profile)
+            params.hnsw_ef = ef
+            runs[str(ef)] = measure(client, name, queries, truth, args.k, params)
+            r = runs[str(ef)]
+            print(f"  {profile:>8} ef={ef:<4} recall@{args.k}={r['recall_at_k']}  p50={r['p50_ms']} ms  p95={r['p95_ms']} ms")
+        report["profiles"][profile] = {"config": PROFILES[profile], "collection": state, "runs": runs}
+        if not args.keep:
+            client.delete_collection(name)
+
+    out = Path(args.out) if args.out else REPO_DIR / ".cache" / "benchmarks" / f"profiles-{report['meta']['git_commit'] or 'nogit'}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=1), encoding="utf-8")
+    print(f"Rapport écrit dans {out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
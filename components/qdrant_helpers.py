@@ -0,0 +1,244 @@
+import heapq
+import os
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Set, Tuple
+from qdrant_client import QdrantClient, models
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+# Dossier des caches locaux (catalogues, snapshots...)
+CACHE_DIR = Path(os.getenv("APP_CACHE_DIR", Path(__file__).parent.parent / ".cache"))
+
+# Index de payload attendus par les filtres de recherche (créés à l'ingestion)
+PAYLOAD_INDEXES = {
+    "genres": models.PayloadSchemaType.KEYWORD,
+    "release_year": models.PayloadSchemaType.INTEGER,
+    "ingested_at": models.PayloadSchemaType.DATETIME,
+    # Index "range" utilisés par les tops (scroll trié order_by)
+    "popularity": models.PayloadSchemaType.FLOAT,
+    "vote_average": models.PayloadSchemaType.FLOAT,
+    "vote_count": models.PayloadSchemaType.INTEGER,
+    "release_date": models.PayloadSchemaType.DATETIME,
+}
+
+
+def client_from_env(path: Optional[str] = None) -> QdrantClient:
+    """
+    Client pour les scripts en ligne de commande : Qdrant local si `path` est
+    donné (dossier ou ":memory:"), sinon QDRANT_URL / QDRANT_API_KEY du .env.
+    """
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    if path:
+        return QdrantClient(location=":memory:") if path == ":memory:" else QdrantClient(path=path)
+    url = os.getenv("QDRANT_URL", "").strip()
+    api_key = os.getenv("QDRANT_API_KEY", "").strip()
+    if not url:
+        raise RuntimeError("QDRANT_URL manquant (ou utiliser --path pour un Qdrant local).")
+    return QdrantClient(url=url, api_key=api_key or None, prefer_grpc=False, timeout=30.0)
+
+def is_local_client(client: QdrantClient) -> bool:
+    """Vrai pour un Qdrant embarqué (":memory:" ou path=), qui ne supporte pas les écritures concurrentes."""
+    try:
+        from qdrant_client.local.qdrant_local import QdrantLocal
+    except ImportError:
+        return False
+    return isinstance(getattr(client, "_client", None), QdrantLocal)
+
+def resolve_alias(client: QdrantClient, alias: str) -> Optional[str]:
+    """Collection vers laquelle pointe l'alias `alias` (None si `alias` n'est pas un alias)."""
+    try:
+        aliases = client.get_aliases().aliases
+    except Exception:
+        return None
+    return next((a.collection_name for a in aliases if a.alias_name == alias), None)
+
+def to_year(date_str: Optional[str]) -> Optional[int]:
+    if not date_str or not isinstance(date_str, str) or len(date_str) < 4:
+        return None
+    try:
+        return int(date_str[:4])
+    except:
+        return None
+
+def to_decade(year: Optional[int]) -> Optional[int]:
+    return (year // 10) * 10 if year is not None else None
+
+def iter_payload_pages(client: QdrantClient, collection_name: str, filter_: Optional[models.Filter] = None, page_size: int = 2000, fields: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Parcourt la collection page par page (scroll) et rend chaque page de payloads.
+    Une seule page est gardée en mémoire à la fois. `fields` limite les champs
+    renvoyés par Qdrant (projection) ; par défaut tout le payload.
+    """
+    next_offset = None
+    while True:
+        points, next_offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=filter_,
+            with_vectors=False,
+            with_payload=list(fields) if fields else True,
+            limit=page_size,
+            offset=next_offset
+        )
+        if not points:
+            break
+        yield [p.payload or {} for p in points]
+        if next_offset is None:
+            break
+
+def latest_ingested_at(client: QdrantClient, collection_name: str) -> Optional[str]:
+    """Plus récent `ingested_at` de la collection (scroll trié, nécessite l'index datetime côté serveur)."""
+    try:
+        points, _ = client.scroll(
+            collection_name=collection_name,
+            limit=1,
+            with_payload=["ingested_at"],
+            with_vectors=False,
+            order_by=models.OrderBy(key="ingested_at", direction=models.Direction.DESC)
+        )
+    except Exception:
+        return None
+    return (points[0].payload or {}).get("ingested_at") if points else None
+
+def top_payloads(client: QdrantClient, collection_name: str, key: str, n: int, filter_: Optional[models.Filter] = None, descending: bool = True, fields: Optional[List[str]] = None, page_size: int = 2000, server_order: bool = True) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Les `n` payloads de plus grande (ou plus petite) valeur de `key` parmi ceux
+    du filtre. Qdrant les trie lui-même (scroll order_by, index range sur `key`
+    requis) ; si le serveur refuse (version ancienne, champ non indexé), repli
+    sur un parcours complet avec un tas de taille `n`. Les points sans `key`
+    sont ignorés dans les deux cas. Rend (payloads, "order_by" | "heap").
+    """
+    with_payload = sorted(set(fields) | {key}) if fields else None
+    # Qdrant embarqué : order_by sur une date y relit chaque valeur, plus lent qu'un parcours
+    if server_order and is_local_client(client) and PAYLOAD_INDEXES.get(key) == models.PayloadSchemaType.DATETIME:
+        server_order = False
+    if server_order:
+        try:
+            points, _ = client.scroll(
+                collection_name=collection_name,
+                scroll_filter=filter_,
+                limit=n,
+                with_payload=with_payload or True,
+                with_vectors=False,
+                order_by=models.OrderBy(key=key, direction=models.Direction.DESC if descending else models.Direction.ASC)
+            )
+            return [p.payload or {} for p in points], "order_by"
+        except UnexpectedResponse as exc:
+            # Refus du serveur (pas d'index range sur `key`, order_by inconnu) ; le reste (réseau, auth...) remonte
+            if exc.status_code not in (400, 404):
+                raise
+        except ValueError:
+            pass
+    rows = (
+        payload
+        for page in iter_payload_pages(client, collection_name, filter_, page_size, fields=with_payload)
+        for payload in page
+        if payload.get(key) is not None
+    )
+    select = heapq.nlargest if descending else heapq.nsmallest
+    return select(n, rows, key=lambda payload: payload[key]), "heap"
+
+def collection_version(client: QdrantClient, collection_name: str) -> str:
+    """
+    Clé de version de la collection : nombre de points + dernier `ingested_at`.
+    Change dès qu'un film est ajouté, supprimé ou ré-ingéré. Pour un alias, la
+    collection physique servie est en tête ("<collection>@<points>:<date>") :
+    une bascule ou un rollback change la clé, et les caches qui en dépendent
+    sont reconstruits en entier, même à effectif et date égaux.
+    """
+    info = client.get_collection(collection_name)
+    version = f"{info.points_count or 0}:{latest_ingested_at(client, collection_name) or '-'}"
+    physical = resolve_alias(client, collection_name)
+    return f"{physical}@{version}" if physical else version
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str) -> List[str]:
+    """Crée les index de payload manquants (cf. PAYLOAD_INDEXES). Retourne les champs créés."""
+    existing = set((client.get_collection(collection_name).payload_schema or {}).keys())
+    created = []
+    for field, schema in PAYLOAD_INDEXES.items():
+        if field in existing:
+            continue
+        client.create_payload_index(collection_name=collection_name, field_name=field, field_schema=schema)
+        created.append(field)
+    _INDEXED_FIELDS_CACHE.pop(collection_name, None)
+    return created
+
+_INDEXED_FIELDS_CACHE: Dict[str, Tuple[float, Set[str]]] = {}
+
+def indexed_fields(client: QdrantClient, collection_name: str, ttl: float = 60.0) -> Set[str]:
+    """Champs de payload indexés dans la collection (mis en cache `ttl` secondes)."""
+    now = time.monotonic()
+    cached = _INDEXED_FIELDS_CACHE.get(collection_name)
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+    try:
+        fields = set((client.get_collection(collection_name).payload_schema or {}).keys())
+    except Exception:
+        fields = set()
+    _INDEXED_FIELDS_CACHE[collection_name] = (now, fields)
+    return fields
+
+def build_search_filter(genres: Optional[List[str]], year_min: Optional[int] = None, year_max: Optional[int] = None) -> Optional[models.Filter]:
+    """
+    Filtre Qdrant : genres en OU (MatchAny) et plage d'années sur `release_year` (Range).
+    Les bornes d'années ne doivent être passées que si la collection a le champ `release_year`.
+    """
+    must = []
+    if genres:
+        must.append(models.FieldCondition(key="genres", match=models.MatchAny(any=list(genres))))
+    if year_min is not None or year_max is not None:
+        must.append(models.FieldCondition(key="release_year", range=models.Range(gte=year_min, lte=year_max)))
+    return models.Filter(must=must) if must else None
+
+def year_in_range(payload: Dict[str, Any], year_min: Optional[int], year_max: Optional[int]) -> bool:
+    y = to_year(payload.get("release_date"))
+    if year_min is not None and (y is None or y < year_min):
+        return False
+    if year_max is not None and (y is None or y > year_max):
+        return False
+    return True
+
+def search_overfetch(client: QdrantClient, collection_name: str, qvec: List[float], top_k: int, filter_: Optional[models.Filter], year_min: Optional[int], year_max: Optional[int], page_size: Optional[int] = None, max_candidates: int = 5000, timings: Optional[Dict[str, float]] = None, search_params: Optional[models.SearchParams] = None) -> List[models.ScoredPoint]:
+    """
+    Repli pour les collections sans `release_year` : pagine la recherche (offset)
+    et filtre les années côté client jusqu'à obtenir `top_k` résultats
+    (ou épuiser `max_candidates` candidats). Si `timings` est fourni, les temps
+    (ms) passés dans Qdrant et dans le filtre local y sont ajoutés.
+    """
+    kept, _, _ = search_overfetch_from(client, collection_name, qvec, top_k, filter_, year_min, year_max, page_size=page_size, max_candidates=max_candidates, timings=timings, search_params=search_params)
+    return kept[:top_k]
+
+def search_overfetch_from(client: QdrantClient, collection_name: str, qvec: List[float], top_k: int, filter_: Optional[models.Filter], year_min: Optional[int], year_max: Optional[int], offset: int = 0, score_threshold: Optional[float] = None, page_size: Optional[int] = None, max_candidates: int = 5000, timings: Optional[Dict[str, float]] = None, search_params: Optional[models.SearchParams] = None) -> Tuple[List[models.ScoredPoint], int, bool]:
+    """
+    `search_overfetch` à partir du candidat `offset` (pagination) : rend
+    (résultats gardés, nombre de candidats lus, épuisé). Les résultats gardés
+    ne sont pas tronqués à `top_k` (ceux en trop servent la page suivante) ;
+    `max_candidates` borne l'offset absolu, donc toute la pagination.
+    """
+    timings = timings if timings is not None else {}
+    page_size = page_size or max(top_k * 4, 50)
+    kept: List[models.ScoredPoint] = []
+    start = offset
+    exhausted = offset >= max_candidates
+    while len(kept) < top_k and not exhausted:
+        t0 = time.perf_counter()
+        hits = client.search(
+            collection_name=collection_name,
+            query_vector=qvec,
+            limit=min(page_size, max_candidates - offset),
+            offset=offset,
+            with_payload=True,
+            query_filter=filter_,
+            score_threshold=score_threshold,
+            search_params=search_params
+        )
+        t1 = time.perf_counter()
+        kept.extend(h for h in hits if year_in_range(h.payload or {}, year_min, year_max))
+        timings["qdrant"] = timings.get("qdrant", 0.0) + (t1 - t0) * 1000
+        timings["post_filter"] = timings.get("post_filter", 0.0) + (time.perf_counter() - t1) * 1000
+        offset += len(hits)
+        exhausted = len(hits) < page_size or offset >= max_candidates
+    return kept, offset - start, exhausted
@@ -0,0 +1,264 @@
+"""
+Réindexation sans interruption (blue/green) par alias Qdrant.
+
+    python components/reindex.py ./content/tmdb_5000_movies.csv       # construit, valide, bascule, nettoie
+    python components/reindex.py --status
+    python components/reindex.py --rollback                            # revient à la version précédente
+    python components/reindex.py --cleanup --keep 2
+
+COLLECTION_NAME (tmdb_movies) est un alias : l'application et les scripts ne
+lisent que lui. Une réindexation construit une nouvelle collection versionnée
+(tmdb_movies_v20260101120000) pendant que l'alias sert toujours l'ancienne,
+la valide (nombre de points, index, requêtes témoin), puis déplace l'alias
+en une seule opération atomique. Les anciennes versions sont gardées pour
+un retour arrière, puis supprimées au-delà de `--keep`.
+
+Première exécution sur une collection « réelle » nommée COLLECTION_NAME
+(avant alias) : elle est supprimée juste avant la création de l'alias, seule
+coupure (très brève) ; pas de retour arrière possible vers elle.
+"""
+import argparse
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set
+
+from qdrant_client import QdrantClient, models
+
+from qdrant_helpers import client_from_env, resolve_alias, is_local_client, PAYLOAD_INDEXES, CACHE_DIR
+from ingest import (
+    EMBEDDING_MODEL_NAME, IngestPipeline, Checkpoint, prepare_collection, ingest_fingerprint, load_embedder,
+)
+from collection_profiles import PROFILES
+from duplicates import DuplicateIndex
+
+# Requêtes témoin : chacune doit renvoyer des résultats dans la nouvelle version
+SAMPLE_QUERIES = [
+    "un film de science-fiction futuriste avec un héros rebelle",
+    "a romantic comedy in New York",
+    "space adventure with aliens",
+    "crime thriller about a bank heist",
+    "animated movie for kids with talking animals",
+]
+
+
+def version_name(alias: str, now: Optional[datetime] = None) -> str:
+    return f"{alias}_v{(now or datetime.now(timezone.utc)).strftime('%Y%m%d%H%M%S')}"
+
+def is_version_of(alias: str, name: str) -> bool:
+    return re.fullmatch(rf"{re.escape(alias)}_v\d{{14}}", name) is not None
+
+def list_versions(client: QdrantClient, alias: str) -> List[str]:
+    """Collections versionnées de l'alias, de la plus ancienne à la plus récente (le nom suffit à les ordonner)."""
+    return sorted(c.name for c in client.get_collections().collections if is_version_of(alias, c.name))
+
+def switch_alias(client: QdrantClient, alias: str, collection_name: str):
+    """
+    Fait pointer `alias` vers `collection_name` en une seule requête (les deux
+    opérations sont appliquées ensemble : aucune recherche ne voit l'alias absent).
+    """
+    operations = []
+    if resolve_alias(client, alias):
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    elif client.collection_exists(alias):
+        # Ancienne collection « réelle » du même nom : elle doit disparaître avant que l'alias existe
+        client.delete_collection(alias)
+    operations.append(models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+def validate_collection(client: QdrantClient, collection_name: str, embedder, reference: Optional[str] = None, queries: Optional[List[str]] = None, min_ratio: float = 0.95, samples: int = 5, top_k: int = 10) -> Dict[str, Any]:
+    """
+    Contrôles avant bascule ; rend {"ok": bool, "checks": [...]} :
+
+    - nombre de points non nul et au moins `min_ratio` fois celui de `reference` (version servie) ;
+    - index de payload attendus présents (Qdrant serveur) ;
+    - `samples` points retrouvés par leur propre vecteur ;
+    - chaque requête témoin renvoie des résultats (recouvrement top-k avec `reference` indiqué).
+    """
+    checks: List[Dict[str, Any]] = []
+
+    def check(name: str, ok: bool, detail: str):
+        checks.append({"check": name, "ok": bool(ok), "detail": detail})
+
+    count = client.count(collection_name=collection_name, exact=True).count
+    ref_count = client.count(collection_name=reference, exact=True).count if reference else None
+    if ref_count:
+        check("points", count > 0 and count >= min_ratio * ref_count, f"{count} points ({count / ref_count:.1%} de {reference} : {ref_count})")
+    else:
+        check("points", count > 0, f"{count} points")
+
+    if not is_local_client(client):
+        missing = set(PAYLOAD_INDEXES) - set((client.get_collection(collection_name).payload_schema or {}).keys())
+        check("index", not missing, "index de payload complets" if not missing else f"index manquants : {', '.join(sorted(missing))}")
+
+    points, _ = client.scroll(collection_name=collection_name, limit=samples, with_vectors=True, with_payload=False)
+    found = 0
+    for p in points:
+        hits = client.search(collection_name=collection_name, query_vector=p.vector, limit=top_k, with_payload=False)
+        found += any(h.id == p.id for h in hits)
+    check("self_search", found == len(points), f"{found}/{len(points)} points retrouvés par leur vecteur")
+
+    overlaps = []
+    empty = []
+    for query in queries or SAMPLE_QUERIES:
+        qvec = embedder.encode([query], normalize_embeddings=True)[0].tolist()
+        hits = client.search(collection_name=collection_name, query_vector=qvec, limit=top_k, with_payload=False)
+        if not hits:
+            empty.append(query)
+        if reference:
+            ref_ids = {h.id for h in client.search(collection_name=reference, query_vector=qvec, limit=top_k, with_payload=False)}
+            if ref_ids:
+                overlaps.append(len(ref_ids & {h.id for h in hits}) / len(ref_ids))
+    detail = f"{len(queries or SAMPLE_QUERIES) - len(empty)}/{len(queries or SAMPLE_QUERIES)} requêtes avec résultats"
+    if overlaps:
+        detail += f", recouvrement top-{top_k} moyen avec {reference} : {sum(overlaps) / len(overlaps):.0%}"
+    check("queries", not empty, detail)
+
+    return {"collection": collection_name, "ok": all(c["ok"] for c in checks), "checks": checks}
+
+def cleanup_versions(client: QdrantClient, alias: str, keep: int = 2) -> List[str]:
+    """Supprime les versions au-delà des `keep` plus récentes ; la version servie n'est jamais supprimée."""
+    current = resolve_alias(client, alias)
+    versions = list_versions(client, alias)
+    kept = set(versions[-max(1, keep):]) | {current}
+    removed = [v for v in versions if v not in kept]
+    for name in removed:
+        client.delete_collection(name)
+        checkpoint = CACHE_DIR / f"ingest_{name}.json"
+        if checkpoint.exists():
+            checkpoint.unlink()
+    return removed
+
+def rollback(client: QdrantClient, alias: str) -> str:
+    """Remet l'alias sur la version précédant celle servie ; rend son nom."""
+    current = resolve_alias(client, alias)
+    previous = [v for v in list_versions(client, alias) if current is None or v < current]
+    if not previous:
+        raise RuntimeError(f"Aucune version antérieure à {current} pour {alias}.")
+    switch_alias(client, alias, previous[-1])
+    return previous[-1]
+
+def build_version(client: QdrantClient, alias: str, csv_path: Path, embedder, version: Optional[str] = None, profile: Optional[str] = None, skip_ids: Optional[Set[int]] = None, chunk_size: int = 2000, batch_size: int = 500, model_name: str = EMBEDDING_MODEL_NAME, progress: bool = True) -> Dict[str, Any]:
+    """
+    Ingestion complète du CSV dans une nouvelle collection versionnée (l'alias
+    n'est pas touché). Reprend sur checkpoint si `version` existe déjà.
+    """
+    version = version or version_name(alias)
+    if version == resolve_alias(client, alias):
+        raise ValueError(f"{version} est la version servie par {alias} : choisir un autre nom.")
+    checkpoint = Checkpoint(CACHE_DIR / f"ingest_{version}.json", ingest_fingerprint(csv_path, chunk_size, batch_size, model_name, version, skip_ids=skip_ids))
+    prepare_collection(client, version, embedder.get_sentence_embedding_dimension(), profile=profile)
+    pipeline = IngestPipeline(
+        client, version, embedder, chunk_size=chunk_size, batch_size=batch_size,
+        checkpoint=checkpoint, progress=progress, skip_ids=skip_ids
+    )
+    return pipeline.run(csv_path)
+
+def status(client: QdrantClient, alias: str) -> Dict[str, Any]:
+    current = resolve_alias(client, alias)
+    return {
+        "alias": alias,
+        "current": current,
+        "legacy_collection": current is None and client.collection_exists(alias),
+        "versions": [
+            {"name": v, "points": client.count(collection_name=v, exact=True).count, "current": v == current}
+            for v in list_versions(client, alias)
+        ],
+    }
+
+def wait_green(client: QdrantClient, collection_name: str, timeout: float = 600.0):
+    """Attend la fin de l'optimisation (indexation) de la nouvelle version avant de la servir."""
+    deadline = time.monotonic() + timeout
+    while client.get_collection(collection_name).status != models.CollectionStatus.GREEN and time.monotonic() < deadline:
+        time.sleep(1.0)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Réindexation blue/green : nouvelle collection versionnée, validation, bascule atomique de l'alias.")
+    parser.add_argument("csv", nargs="?", default=None, help="CSV TMDB à ingérer dans la nouvelle version")
+    parser.add_argument("--alias", default=os.getenv("COLLECTION_NAME", "tmdb_movies"), help="Alias servi à l'application (COLLECTION_NAME)")
+    parser.add_argument("--path", default=None, help="Qdrant local (dossier ou :memory:) au lieu de QDRANT_URL")
+    parser.add_argument("--version", default=None, help="Nom de la version à construire ou reprendre (défaut : <alias>_v<date UTC>)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--profile", choices=list(PROFILES), default=os.getenv("COLLECTION_PROFILE") or "balanced")
+    parser.add_argument("--skip-duplicates", nargs="?", const="", default=None, metavar="JSON",
+                        help="Ignore les quasi-doublons listés par duplicates.py (défaut : .cache/duplicates_<alias>.json)")
+    parser.add_argument("--min-ratio", type=float, default=0.95, help="Points minimum de la nouvelle version, en fraction de la version servie")
+    parser.add_argument("--no-switch", action="store_true", help="Construire et valider sans basculer l'alias")
+    parser.add_argument("--force", action="store_true", help="Basculer même si la validation échoue")
+    parser.add_argument("--keep", type=int, default=2, help="Versions gardées (servie comprise) après bascule ou --cleanup")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--rollback", action="store_true", help="Remet l'alias sur la version précédente")
+    parser.add_argument("--cleanup", action="store_true", help="Supprime les versions au-delà de --keep")
+    parser.add_argument("--quiet", action="store_true")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = build_arg_parser().parse_args(argv)
+    client = client_from_env(args.path)
+    alias = args.alias
+
+    if args.status:
+        report = status(client, alias)
+        print(f"{alias} -> {report['current'] or ('collection sans alias' if report['legacy_collection'] else 'rien')}")
+        for v in report["versions"]:
+            print(f"  {'*' if v['current'] else ' '} {v['name']}  {v['points']} points")
+        return report
+    if args.rollback:
+        try:
+            previous = rollback(client, alias)
+        except RuntimeError as e:
+            raise SystemExit(str(e))
+        print(f"{alias} -> {previous} (retour arrière)")
+        return {"alias": alias, "current": previous}
+    if args.cleanup:
+        removed = cleanup_versions(client, alias, args.keep)
+        print(f"{len(removed)} version(s) supprimée(s) : {', '.join(removed) or '-'}")
+        return {"alias": alias, "removed": removed}
+    if not args.csv:
+        raise SystemExit("CSV requis pour construire une nouvelle version (ou --status / --rollback / --cleanup).")
+
+    skip_ids: Set[int] = set()
+    if args.skip_duplicates is not None:
+        duplicates_path = Path(args.skip_duplicates) if args.skip_duplicates else CACHE_DIR / f"duplicates_{alias}.json"
+        if not duplicates_path.exists():
+            raise SystemExit(f"{duplicates_path} introuvable : lancer d'abord components/duplicates.py.")
+        skip_ids = DuplicateIndex(duplicates_path).duplicate_ids()
+
+    version = args.version or version_name(alias)
+    if not is_version_of(alias, version):
+        raise SystemExit(f"Nom de version invalide : {version} (attendu : {alias}_v<AAAAMMJJHHMMSS>).")
+    embedder = load_embedder(args.model, args.device)
+    print(f"Construction de {version} ({alias} sert toujours {resolve_alias(client, alias) or alias})")
+    ingest_report = build_version(
+        client, alias, Path(args.csv), embedder, version=version, profile=args.profile, skip_ids=skip_ids,
+        chunk_size=args.chunk_size, batch_size=args.batch_size, model_name=args.model, progress=not args.quiet
+    )
+    wait_green(client, version)
+
+    # Version servie actuellement : cible de l'alias, ou ancienne collection du même nom
+    reference = resolve_alias(client, alias) or (alias if client.collection_exists(alias) else None)
+    validation = validate_collection(client, version, embedder, reference=reference, min_ratio=args.min_ratio)
+    for c in validation["checks"]:
+        print(f"  [{'ok' if c['ok'] else 'ÉCHEC'}] {c['check']}: {c['detail']}")
+    report: Dict[str, Any] = {"alias": alias, "version": version, "ingest": ingest_report, "validation": validation, "switched": False, "removed": []}
+
+    if args.no_switch:
+        print(f"{version} prête, alias inchangé (--no-switch).")
+        return report
+    if not validation["ok"] and not args.force:
+        raise SystemExit(f"Validation échouée : {alias} reste sur {reference or '-'} ; {version} est gardée pour analyse.")
+    switch_alias(client, alias, version)
+    report["switched"] = True
+    report["removed"] = cleanup_versions(client, alias, args.keep)
+    print(f"{alias} -> {version}" + (f" ; versions supprimées : {', '.join(report['removed'])}" if report["removed"] else ""))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Grille de résultats rendue en un seul bloc HTML (un seul message vers le
+navigateur quel que soit le nombre de films), au lieu d'une carte
+`st.markdown` + un `st.divider` par résultat.
+
+Les affiches sont des vignettes TMDB dimensionnées (srcset w92 / w185, le
+navigateur choisit selon la densité d'écran) chargées à l'affichage
+(loading="lazy") ; l'affiche w342 n'est chargée qu'au survol ou au focus de
+la vignette. Le tableau récapitulatif est construit à partir des mêmes
+enregistrements que la grille.
+"""
+import html
+from typing import List, Dict, Any, Optional, Callable
+
+import pandas as pd
+
+from posters import poster_url
+
+# Colonnes du tableau récapitulatif (sous-ensemble des enregistrements de la grille)
+SUMMARY_COLUMNS = ["title", "release_date", "genres", "vote_average", "popularity", "score", "poster_url"]
+
+GRID_CSS = """
+<style>
+    .result-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(340px, 1fr)); gap: 12px; }
+    .result-grid .card {
+        display: flex; gap: 14px; padding: 10px; background: #ffffff; border-radius: 10px;
+        box-shadow: 0 6px 18px rgba(20,30,60,0.06); border: 1px solid rgba(0,0,0,0.03); align-items: flex-start;
+    }
+    .result-grid .thumb { position: relative; flex-shrink: 0; width: 92px; height: 138px; outline: none; }
+    .result-grid .thumb img, .result-grid .thumb .empty { width: 92px; height: 138px; object-fit: cover; border-radius: 6px; background: #f0f2f5; display: block; }
+    .result-grid .zoom { display: none; position: absolute; left: 100px; top: -20px; z-index: 10; box-shadow: 0 10px 30px rgba(0,0,0,0.25); border-radius: 8px; }
+    .result-grid .zoom img { width: 228px; height: 342px; border-radius: 8px; }
+    .result-grid .thumb:hover .zoom, .result-grid .thumb:focus .zoom { display: block; }
+    .result-grid .info { flex: 1; display: flex; flex-direction: column; gap: 4px; min-width: 0; }
+    .result-grid .title { font-size: 1.0rem; font-weight: 700; margin: 0; }
+    .result-grid .meta { color: #556677; font-size: 0.9rem; }
+    .result-grid .score { margin-top: 4px; font-weight: 600; color: #0b6df6; }
+</style>
+"""
+
+
+def _payload_tmdb_id(payload: Dict[str, Any]) -> Optional[Any]:
+    return payload.get("tmdb_id") or payload.get("tmdbId") or payload.get("id")
+
+def hit_tmdb_ids(hits: List[Any]) -> List[Optional[Any]]:
+    return [_payload_tmdb_id(h.payload or {}) for h in hits]
+
+def result_records(hits: List[Any], poster_paths: Dict[int, Optional[str]], title_poster: Optional[Callable[[str], Optional[str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Un enregistrement par résultat (grille et tableau). `poster_paths` :
+    tmdb_id -> poster_path TMDB ; `title_poster` donne le poster_path des
+    résultats sans tmdb_id (recherche par titre), None pour s'en passer.
+    """
+    records = []
+    for rank, (h, tmdb_id) in enumerate(zip(hits, hit_tmdb_ids(hits)), 1):
+        p = h.payload or {}
+        title = p.get("title") or p.get("name") or "N/A"
+        if tmdb_id:
+            try:
+                path = poster_paths.get(int(tmdb_id))
+            except (TypeError, ValueError):
+                path = None
+        else:
+            path = title_poster(title) if title_poster else None
+        records.append({
+            "rank": rank,
+            "id": h.id,
+            "title": title,
+            "release_date": p.get("release_date", "N/A"),
+            "genres": ", ".join(p.get("genres", [])),
+            "vote_average": p.get("vote_average", "N/A"),
+            "popularity": p.get("popularity", "N/A"),
+            "score": round(h.score or 0, 4),
+            "poster_path": path,
+            "poster_url": poster_url(path, "w342"),
+        })
+    return records
+
+def _thumb_html(record: Dict[str, Any]) -> str:
+    path = record["poster_path"]
+    if not path:
+        return '<div class="thumb"><div class="empty"></div></div>'
+    small, medium, large = (html.escape(poster_url(path, size), quote=True) for size in ("w92", "w185", "w342"))
+    alt = html.escape(record["title"], quote=True)
+    return (
+        f'<div class="thumb" tabindex="0">'
+        f'<img src="{medium}" srcset="{small} 92w, {medium} 185w" sizes="92px" loading="lazy" decoding="async" alt="{alt}" />'
+        f'<div class="zoom"><img src="{large}" loading="lazy" decoding="async" alt="{alt}" /></div>'
+        f'</div>'
+    )
+
+def grid_html(records: List[Dict[str, Any]], score_label: str = "search") -> str:
+    """Toute la grille (CSS compris) en une seule chaîne HTML."""
+    cards = []
+    for r in records:
+        e = lambda key: html.escape(str(r[key]))
+        cards.append(
+            f'<div class="card">{_thumb_html(r)}<div class="info">'
+            f'<div class="title">{r["rank"]}. {e("title")}</div>'
+            f'<div class="meta">Date: {e("release_date")} &nbsp;•&nbsp; Genres: {e("genres")}</div>'
+            f'<div class="meta">Note: {e("vote_average")} &nbsp;•&nbsp; Popularité: {e("popularity")}</div>'
+            f'<div class="score">Score ({html.escape(score_label)}): {r["score"]}</div>'
+            f'</div></div>'
+        )
+    return GRID_CSS + '<div class="result-grid">' + "".join(cards) + "</div>"
+
+def summary_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Tableau récapitulatif, colonnes SUMMARY_COLUMNS lues directement dans les enregistrements."""
+    return pd.DataFrame.from_records(records, columns=SUMMARY_COLUMNS)
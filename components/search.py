@@ -1,9 +1,9 @@
+import time
 import streamlit as st
 from typing import List, Optional
 from qdrant_client import QdrantClient
-from sentence_transformers import SentenceTransformer
 
-def render_search_page(client: QdrantClient, embedder: SentenceTransformer, list_known_genres_func, search_semantic_func):
+def render_search_page(client: QdrantClient, embedder, list_known_genres_func, search_semantic_func):
     """Rendu de la page de recherche sémantique"""
     
     # Header (Material Icon + texte)
@@ -53,7 +53,9 @@ def render_search_page(client: QdrantClient, embedder: SentenceTransformer, list
         y_max_val = int(year_max) if use_max else None
         
         with st.spinner("Recherche en cours..."):
+            t0 = time.perf_counter()
             hits = search_semantic_func(client, query, top_k, embedder, sel_genres, y_min_val, y_max_val)
+            elapsed_ms = (time.perf_counter() - t0) * 1000
         
         st.markdown("---")
         
@@ -65,7 +67,7 @@ def render_search_page(client: QdrantClient, embedder: SentenceTransformer, list
             with col1:
                 st.success(f"{len(hits)} film(s) trouvé(s)")
             with col2:
-                st.info(f"Temps estimé: ~{len(hits)*10}ms")
+                st.info(f"Temps de recherche: {elapsed_ms:.0f}ms")
             with col3:
                 if st.button("Analyser ces résultats"):
                     st.info("Fonctionnalité à venir")
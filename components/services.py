@@ -0,0 +1,455 @@
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple, Union
+
+import pandas as pd
+from qdrant_client import QdrantClient, models
+
+from qdrant_helpers import collection_version, indexed_fields, build_search_filter, search_overfetch_from, iter_payload_pages, top_payloads, CACHE_DIR
+from aggregations import decade_frame_from
+from analytics_snapshot import AnalyticsSnapshot
+from sketches import DistributionSketches, sketch_collection
+from similar import NeighborTable
+from duplicates import DuplicateIndex
+from title_index import TitleIndex
+from collection_profiles import search_params as profile_search_params
+from columnar import fetch_frame, ANALYTICS_FIELDS
+from genre_catalog import GenreCatalog
+from genre_counts import count_genres
+from vector_mirror import VectorMirror
+from telemetry import Telemetry
+
+# Fonctions d'accès aux données de la WebApp, sans dépendance à Streamlit :
+# importables par app_streamlit.py comme par les scripts (benchmark...).
+
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "tmdb_movies").strip()
+LOCAL_VECTOR_MIRROR = os.getenv("LOCAL_VECTOR_MIRROR", "0").strip() in ("1", "true", "yes")
+# Paramètres de recherche par défaut (hnsw_ef, rescoring), cf. collection_profiles.py ; vide = défauts Qdrant
+SEARCH_PROFILE = os.getenv("SEARCH_PROFILE", "").strip() or None
+DEFAULT_SEARCH_PARAMS = profile_search_params(SEARCH_PROFILE)
+
+# Ressources partagées par process (équivalent de st.cache_resource)
+_RESOURCES: Dict[str, Any] = {}
+_RESOURCES_LOCK = threading.Lock()
+
+
+def _resource(key: str, factory: Callable[[], Any]) -> Any:
+    with _RESOURCES_LOCK:
+        if key not in _RESOURCES:
+            _RESOURCES[key] = factory()
+        return _RESOURCES[key]
+
+def reset_resources():
+    """Oublie les ressources partagées (ex. changement de client ou de collection)."""
+    with _RESOURCES_LOCK:
+        _RESOURCES.clear()
+
+def get_genre_catalog(collection_name: str) -> GenreCatalog:
+    return _resource(f"genres:{collection_name}", lambda: GenreCatalog(collection_name, cache_path=CACHE_DIR / f"genres_{collection_name}.json"))
+
+def get_telemetry() -> Telemetry:
+    # Temps par étape + journal d'activité (.cache/telemetry.jsonl), cf. telemetry.py
+    return _resource("telemetry", lambda: Telemetry(CACHE_DIR / "telemetry.jsonl"))
+
+def get_vector_mirror(collection_name: str) -> VectorMirror:
+    return _resource(f"mirror:{collection_name}", lambda: VectorMirror(collection_name, CACHE_DIR / f"mirror_{collection_name}"))
+
+def get_analytics_snapshot(collection_name: str) -> AnalyticsSnapshot:
+    return _resource(f"snapshot:{collection_name}", lambda: AnalyticsSnapshot(collection_name, CACHE_DIR / f"analytics_{collection_name}.sqlite"))
+
+def get_neighbor_table(collection_name: str) -> NeighborTable:
+    return _resource(f"neighbors:{collection_name}", lambda: NeighborTable(collection_name, CACHE_DIR / f"neighbors_{collection_name}"))
+
+def get_title_index(collection_name: str) -> TitleIndex:
+    return _resource(f"titles:{collection_name}", lambda: TitleIndex(collection_name))
+
+def get_duplicate_index(collection_name: str) -> DuplicateIndex:
+    # Clusters écrits par duplicates.py ; relus si le fichier a changé
+    index = _resource(f"duplicates:{collection_name}", lambda: DuplicateIndex(CACHE_DIR / f"duplicates_{collection_name}.json"))
+    index.reload()
+    return index
+
+# ----------------------------
+# Qdrant Helper Functions
+# ----------------------------
+def q_count(client: QdrantClient, filter_: Optional[models.Filter]) -> int:
+    res = client.count(collection_name=COLLECTION_NAME, count_filter=filter_, exact=True)
+    return res.count
+
+def fetch_payloads(client: QdrantClient, filter_: Optional[models.Filter] = None, page_size: int = 2000, limit_total: Optional[int] = None, fields: Optional[List[str]] = None, pages: bool = False) -> Union[List[Dict[str, Any]], Iterator[List[Dict[str, Any]]]]:
+    """
+    Payloads de la collection (ou du filtre). `fields` ne rapatrie que ces
+    champs ; `pages=True` rend un générateur de pages (listes de dicts) au lieu
+    d'une seule liste, pour ne garder qu'une page en mémoire.
+    """
+    page_iter = _payload_pages(client, filter_, page_size, limit_total, fields)
+    if pages:
+        return page_iter
+    results: List[Dict[str, Any]] = []
+    for page in page_iter:
+        results.extend(page)
+    return results
+
+def _payload_pages(client: QdrantClient, filter_: Optional[models.Filter], page_size: int, limit_total: Optional[int], fields: Optional[List[str]]) -> Iterator[List[Dict[str, Any]]]:
+    fetched = 0
+    for page in iter_payload_pages(client, COLLECTION_NAME, filter_, page_size=page_size, fields=fields):
+        if limit_total is not None and fetched + len(page) >= limit_total:
+            yield page[:limit_total - fetched]
+            return
+        fetched += len(page)
+        yield page
+
+def fetch_payload_frame(client: QdrantClient, fields: Optional[List[str]] = None, filter_: Optional[models.Filter] = None, page_size: int = 2000, limit_total: Optional[int] = None) -> pd.DataFrame:
+    """Variante colonnes de `fetch_payloads` : DataFrame typé (+ colonne `year`), cf. columnar.py."""
+    return fetch_frame(client, COLLECTION_NAME, fields or ANALYTICS_FIELDS, filter_, page_size, limit_total)
+
+def list_known_genres(client: QdrantClient) -> List[str]:
+    # Catalogue calculé sur toute la collection, recalculé seulement si sa version change
+    return get_genre_catalog(COLLECTION_NAME).get(client).genres
+
+def search_semantic(client: QdrantClient, query: str, top_k: int, embedder, genres: List[str], year_min: Optional[int], year_max: Optional[int], timings: Optional[Dict[str, float]] = None, collapse_duplicates: bool = False, title_lookup: bool = True, search_params: Optional[models.SearchParams] = None) -> List[models.ScoredPoint]:
+    # `timings` (optionnel) reçoit la durée de chaque étape en ms ; `search_params` remplace DEFAULT_SEARCH_PARAMS
+    telemetry = get_telemetry()
+    duplicates = get_duplicate_index(COLLECTION_NAME) if collapse_duplicates else None
+    # Titres exacts / préfixes d'abord (index en mémoire) ; s'ils suffisent, pas d'embedding
+    title_hits = _title_hits(client, query, top_k, genres, year_min, year_max, timings) if title_lookup else []
+    if len(title_hits) >= top_k:
+        return _merge_hits(title_hits, [], duplicates, top_k, timings)
+    with telemetry.span("embedding", timings):
+        qvec = embedder.encode([query], normalize_embeddings=True)[0].tolist()
+    search_params = search_params or DEFAULT_SEARCH_PARAMS
+    if not duplicates:
+        hits = _search_vector(client, qvec, top_k, genres, year_min, year_max, timings, search_params)
+        return _merge_hits(title_hits, hits, duplicates, top_k, timings)
+    hits, read, exhausted = _vector_hits(client, qvec, _collapse_limit(duplicates, top_k), genres, year_min, year_max, timings, search_params)
+    hits = _fill_collapsed(client, qvec, title_hits, hits, read, exhausted, duplicates, top_k, genres, year_min, year_max, timings, search_params)
+    return _merge_hits(title_hits, hits, duplicates, top_k, timings)
+
+def _title_hits(client: QdrantClient, query: str, top_k: int, genres: List[str], year_min: Optional[int], year_max: Optional[int], timings: Optional[Dict[str, float]]) -> List[models.ScoredPoint]:
+    return _title_hits_many(client, [(query, top_k, genres, year_min, year_max)], timings)[0]
+
+def _title_hits_many(client: QdrantClient, lookups: List[Tuple[str, int, List[str], Optional[int], Optional[int]]], timings: Optional[Dict[str, float]]) -> List[List[models.ScoredPoint]]:
+    # Score 1.0 : correspondance de titre, classée avant tout résultat vectoriel ; un seul retrieve pour toutes les requêtes
+    with get_telemetry().span("title_lookup", timings):
+        index = get_title_index(COLLECTION_NAME).get(client)
+        matches = [[i for i, _ in index.lookup(query, top_k, genres, year_min, year_max)] for query, top_k, genres, year_min, year_max in lookups]
+        ids = list(dict.fromkeys(i for hit_ids in matches for i in hit_ids))
+        if not ids:
+            return [[] for _ in lookups]
+        found = {
+            int(p.id): p
+            for p in client.retrieve(collection_name=COLLECTION_NAME, ids=ids, with_payload=True, with_vectors=False)
+        }
+        return [[models.ScoredPoint(id=i, version=0, score=1.0, payload=found[i].payload, vector=None) for i in hit_ids if i in found] for hit_ids in matches]
+
+def _merge_hits(title_hits: List[models.ScoredPoint], hits: List[models.ScoredPoint], duplicates: Optional[DuplicateIndex], top_k: int, timings: Optional[Dict[str, float]]) -> List[models.ScoredPoint]:
+    if title_hits:
+        title_ids = {int(h.id) for h in title_hits}
+        hits = title_hits + [h for h in hits if int(h.id) not in title_ids]
+    if not duplicates:
+        return hits[:top_k]
+    with get_telemetry().span("collapse_duplicates", timings):
+        return duplicates.collapse(hits, top_k)
+
+def _collapse_limit(duplicates: DuplicateIndex, top_k: int) -> int:
+    # Taille de la première lecture : marge pour les doublons masqués, complétée au besoin par _fill_collapsed
+    return top_k + min(top_k, len(duplicates.canonical_of) - len(duplicates))
+
+def _fill_collapsed(client: QdrantClient, qvec: List[float], title_hits: List[models.ScoredPoint], hits: List[models.ScoredPoint], read: int, exhausted: bool, duplicates: DuplicateIndex, top_k: int, genres: List[str], year_min: Optional[int], year_max: Optional[int], timings: Optional[Dict[str, float]], search_params: Optional[models.SearchParams] = None) -> List[models.ScoredPoint]:
+    """
+    Complète `hits` (les `read` premiers candidats) par pages suivantes
+    (offset, comme search_semantic_more) jusqu'à `top_k` films distincts une
+    fois les quasi-doublons masqués, ou jusqu'à épuisement des résultats.
+    """
+    title_ids = {int(h.id) for h in title_hits}
+    while not exhausted:
+        merged = title_hits + [h for h in hits if int(h.id) not in title_ids]
+        if len(duplicates.collapse(merged, top_k)) >= top_k:
+            break
+        more, more_read, exhausted = _vector_hits(client, qvec, top_k, genres, year_min, year_max, timings, search_params, offset=read)
+        if not more_read:
+            break
+        hits = hits + more
+        read += more_read
+    return hits
+
+def _search_vector(client: QdrantClient, qvec: List[float], top_k: int, genres: List[str], year_min: Optional[int], year_max: Optional[int], timings: Optional[Dict[str, float]], search_params: Optional[models.SearchParams] = None) -> List[models.ScoredPoint]:
+    hits, _, _ = _vector_hits(client, qvec, top_k, genres, year_min, year_max, timings, search_params)
+    return hits[:top_k]
+
+def _vector_path(client: QdrantClient, year_min: Optional[int], year_max: Optional[int], mirror: Optional[VectorMirror] = None) -> str:
+    """
+    Chemin de la recherche vectorielle : "mirror" (copie locale à jour),
+    "server" (genres + plage sur release_year filtrés par Qdrant) ou
+    "post_filter" (collection pas encore ré-ingérée : années filtrées ici).
+    """
+    if mirror is not None and mirror.ready(client):
+        return "mirror"
+    if (year_min is None and year_max is None) or "release_year" in indexed_fields(client, COLLECTION_NAME):
+        return "server"
+    return "post_filter"
+
+def _vector_hits(client: QdrantClient, qvec: List[float], limit: int, genres: List[str], year_min: Optional[int], year_max: Optional[int], timings: Optional[Dict[str, float]], search_params: Optional[models.SearchParams] = None, offset: int = 0, score_threshold: Optional[float] = None) -> Tuple[List[models.ScoredPoint], int, bool]:
+    """
+    `limit` résultats à partir du candidat `offset`, par le chemin de
+    `_vector_path`. Rend (résultats, candidats lus, épuisé) ; sur le chemin
+    "post_filter", les résultats peuvent dépasser `limit` (la suite d'une page
+    de candidats) et la pagination reste bornée par `max_candidates`.
+    """
+    telemetry = get_telemetry()
+    mirror = get_vector_mirror(COLLECTION_NAME) if LOCAL_VECTOR_MIRROR else None
+    path = _vector_path(client, year_min, year_max, mirror)
+    if path == "mirror":
+        with telemetry.span("local_search", timings):
+            hits = mirror.search(qvec, limit, genres, year_min, year_max, offset=offset)
+        read = len(hits)
+        if score_threshold is not None:
+            hits = [h for h in hits if h.score >= score_threshold]
+        return hits, read, len(hits) < limit
+
+    if path == "server":
+        with telemetry.span("qdrant", timings):
+            hits = client.search(
+                collection_name=COLLECTION_NAME,
+                query_vector=qvec,
+                limit=limit,
+                offset=offset,
+                with_payload=True,
+                query_filter=build_search_filter(genres, year_min, year_max),
+                score_threshold=score_threshold,
+                search_params=search_params
+            )
+        return hits, len(hits), len(hits) < limit
+
+    stage_ms: Dict[str, float] = {}
+    hits, read, exhausted = search_overfetch_from(
+        client, COLLECTION_NAME, qvec, limit, build_search_filter(genres), year_min, year_max,
+        offset=offset, score_threshold=score_threshold, timings=stage_ms, search_params=search_params
+    )
+    for stage, ms in stage_ms.items():
+        telemetry.observe(stage, ms)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + ms
+    return hits, read, exhausted
+
+def search_semantic_batch(client: QdrantClient, queries: List[Dict[str, Any]], top_k: int, embedder, chunk_size: int = 64, encode_batch_size: int = 64, timings: Optional[Dict[str, float]] = None, collapse_duplicates: bool = False, title_lookup: bool = True, search_params: Optional[models.SearchParams] = None) -> List[List[models.ScoredPoint]]:
+    """
+    Version par lots de `search_semantic` : chaque requête est un dict
+    {"query", "genres"?, "year_min"?, "year_max"?, "top_k"?}. Les textes
+    (dédoublonnés) sont encodés en un seul appel, puis envoyés à Qdrant par
+    `search_batch` par paquets de `chunk_size`. Rend une liste de résultats par
+    requête, dans l'ordre, au même format que `search_semantic` (titres en tête,
+    quasi-doublons masqués si `collapse_duplicates`).
+    """
+    telemetry = get_telemetry()
+    results: List[List[models.ScoredPoint]] = [[] for _ in queries]
+    if not queries:
+        return results
+    search_params = search_params or DEFAULT_SEARCH_PARAMS
+    duplicates = get_duplicate_index(COLLECTION_NAME) if collapse_duplicates else None
+    limits = [q.get("top_k") or top_k for q in queries]
+    fetch_limits = [_collapse_limit(duplicates, k) for k in limits] if duplicates else limits
+    title_hits = _title_hits_many(
+        client, [(q["query"], limits[i], q.get("genres") or [], q.get("year_min"), q.get("year_max")) for i, q in enumerate(queries)], timings
+    ) if title_lookup else [[] for _ in queries]
+    # Requêtes déjà complètes par les titres : ni embedding ni recherche vectorielle
+    pending = [i for i in range(len(queries)) if len(title_hits[i]) < limits[i]]
+    if pending:
+        with telemetry.span("embedding", timings):
+            texts = list(dict.fromkeys(queries[i]["query"] for i in pending))
+            encoded = embedder.encode(texts, normalize_embeddings=True, batch_size=encode_batch_size)
+            vectors = {t: encoded[i].tolist() for i, t in enumerate(texts)}
+
+    # Mêmes chemins que search_semantic (_vector_path) ; celles filtrées par Qdrant partent par search_batch
+    mirror = get_vector_mirror(COLLECTION_NAME) if LOCAL_VECTOR_MIRROR else None
+    batched: List[int] = []
+    # Candidats lus et épuisement, par requête : pour compléter les pages réduites par les doublons masqués
+    read: Dict[int, int] = {}
+    exhausted: Dict[int, bool] = {}
+    for i in pending:
+        q = queries[i]
+        genres = q.get("genres") or []
+        year_min, year_max = q.get("year_min"), q.get("year_max")
+        if _vector_path(client, year_min, year_max, mirror) == "server":
+            batched.append(i)
+        else:
+            results[i], read[i], exhausted[i] = _vector_hits(client, vectors[q["query"]], fetch_limits[i], genres, year_min, year_max, timings, search_params)
+
+    for start in range(0, len(batched), chunk_size):
+        chunk = batched[start:start + chunk_size]
+        requests = [
+            models.SearchRequest(
+                vector=vectors[queries[i]["query"]],
+                limit=fetch_limits[i],
+                with_payload=True,
+                filter=build_search_filter(queries[i].get("genres") or [], queries[i].get("year_min"), queries[i].get("year_max")),
+                params=search_params
+            )
+            for i in chunk
+        ]
+        with telemetry.span("qdrant_batch", timings):
+            answers = client.search_batch(collection_name=COLLECTION_NAME, requests=requests)
+        for i, hits in zip(chunk, answers):
+            results[i], read[i], exhausted[i] = hits, len(hits), len(hits) < fetch_limits[i]
+    if duplicates:
+        for i in pending:
+            q = queries[i]
+            results[i] = _fill_collapsed(
+                client, vectors[q["query"]], title_hits[i], results[i], read[i], exhausted[i], duplicates, limits[i],
+                q.get("genres") or [], q.get("year_min"), q.get("year_max"), timings, search_params
+            )
+    return [_merge_hits(title_hits[i], results[i], duplicates, limits[i], timings) for i in range(len(queries))]
+
+def search_semantic_paged(client: QdrantClient, query: str, page_size: int, embedder, genres: List[str], year_min: Optional[int], year_max: Optional[int], score_threshold: Optional[float] = None, timings: Optional[Dict[str, float]] = None, collapse_duplicates: bool = False, title_lookup: bool = True) -> Tuple[List[models.ScoredPoint], Dict[str, Any]]:
+    """
+    Première page d'une recherche paginée : même classement que
+    `search_semantic` (titres en tête), plus un curseur (vecteur de la
+    requête, filtres, position) à garder, par ex. dans st.session_state. La
+    requête n'est encodée qu'une fois, et seulement quand les titres ne
+    suffisent plus à remplir la page ; les pages suivantes
+    (`search_semantic_more`) ne demandent à Qdrant que la page suivante
+    (offset) ; `score_threshold` arrête la pagination sous ce score.
+    """
+    cursor: Dict[str, Any] = {
+        "query": query, "vector": None, "genres": list(genres or []), "year_min": year_min, "year_max": year_max,
+        "page_size": int(page_size), "score_threshold": score_threshold, "collapse": collapse_duplicates,
+        "offset": 0, "buffer": [], "seen": set(), "exhausted": False, "pages": 0,
+    }
+    if title_lookup:
+        cursor["buffer"] = _title_hits(client, query, page_size, cursor["genres"], year_min, year_max, timings)
+    return search_semantic_more(client, cursor, timings, embedder=embedder), cursor
+
+def search_semantic_more(client: QdrantClient, cursor: Dict[str, Any], timings: Optional[Dict[str, float]] = None, embedder=None) -> List[models.ScoredPoint]:
+    """
+    Page suivante du curseur (vide quand il n'y a plus de résultats) ; met le
+    curseur à jour. `embedder` n'est utilisé que si la requête n'a pas encore
+    été encodée (première page entièrement servie par les titres).
+    """
+    duplicates = get_duplicate_index(COLLECTION_NAME) if cursor["collapse"] else None
+    page: List[models.ScoredPoint] = []
+    while len(page) < cursor["page_size"]:
+        if not cursor["buffer"]:
+            if cursor["exhausted"]:
+                break
+            cursor["buffer"] = _vector_page(client, cursor, timings, embedder)
+            continue
+        hit = cursor["buffer"].pop(0)
+        # Films déjà montrés (titres en tête de la première page) ou doublon d'un film déjà montré
+        key = duplicates.canonical_of.get(int(hit.id), int(hit.id)) if duplicates else int(hit.id)
+        if key in cursor["seen"]:
+            continue
+        cursor["seen"].add(key)
+        page.append(hit)
+    cursor["pages"] += 1
+    return page
+
+def _vector_page(client: QdrantClient, cursor: Dict[str, Any], timings: Optional[Dict[str, float]], embedder=None) -> List[models.ScoredPoint]:
+    # Une page à partir de cursor["offset"], par le même chemin que _search_vector
+    if cursor["vector"] is None:
+        if embedder is None:
+            raise ValueError("requête pas encore encodée : passer `embedder` à search_semantic_more")
+        with get_telemetry().span("embedding", timings):
+            cursor["vector"] = embedder.encode([cursor["query"]], normalize_embeddings=True)[0].tolist()
+    hits, read, exhausted = _vector_hits(
+        client, cursor["vector"], cursor["page_size"], cursor["genres"], cursor["year_min"], cursor["year_max"], timings,
+        DEFAULT_SEARCH_PARAMS, offset=cursor["offset"], score_threshold=cursor["score_threshold"]
+    )
+    cursor["offset"] += read
+    cursor["exhausted"] = exhausted
+    return hits
+
+def similar_movies(client: QdrantClient, point_id: int, top_k: int = 10, timings: Optional[Dict[str, float]] = None) -> List[models.ScoredPoint]:
+    """
+    Films proches d'un film de la collection, à partir de son vecteur stocké
+    (aucun ré-encodage) : table de voisins précalculée (similar.py) si elle
+    contient le film et correspond à la version de la collection, sinon copie
+    locale des vecteurs, sinon `recommend` Qdrant.
+    """
+    telemetry = get_telemetry()
+    table = get_neighbor_table(COLLECTION_NAME)
+    neighbors = table.lookup(point_id, top_k)
+    if neighbors and table.ready(client):
+        with telemetry.span("similar_table", timings):
+            # Les voisins supprimés depuis le build sont absents de retrieve et donc ignorés
+            found = {
+                int(p.id): p
+                for p in client.retrieve(collection_name=COLLECTION_NAME, ids=[i for i, _ in neighbors], with_payload=True, with_vectors=False)
+            }
+            return [
+                models.ScoredPoint(id=i, version=0, score=score, payload=found[i].payload, vector=None)
+                for i, score in neighbors if i in found
+            ]
+
+    if LOCAL_VECTOR_MIRROR:
+        mirror = get_vector_mirror(COLLECTION_NAME)
+        if mirror.ready(client):
+            with telemetry.span("similar_local", timings):
+                hits = mirror.similar(point_id, top_k)
+            if hits is not None:
+                return hits
+
+    with telemetry.span("similar_qdrant", timings):
+        return client.recommend(collection_name=COLLECTION_NAME, positive=[point_id], limit=top_k, with_payload=True)
+
+def analytics_counts_by_genre(client: QdrantClient, genres: List[str], exact: bool = True) -> pd.DataFrame:
+    # Comptes lancés en parallèle (8 requêtes max en vol), cf. genre_counts.py
+    telemetry = get_telemetry()
+    timings: Dict[str, float] = {}
+    with telemetry.span("analytics_counts", timings):
+        counts = count_genres(client, COLLECTION_NAME, genres, exact=exact, max_workers=8)
+    telemetry.record_event("Analytics", "Genres: " + ", ".join(genres)[:80], sum(counts.values()), timings)
+    rows = [{"genre": g, "count": n} for g, n in counts.items()]
+    return pd.DataFrame(rows, columns=["genre", "count"]).sort_values("count", ascending=False)
+
+def analytics_snapshot(client: QdrantClient) -> AnalyticsSnapshot:
+    # Agrégats matérialisés (.cache/analytics_<collection>.sqlite), rafraîchis en incrémental, cf. analytics_snapshot.py
+    with get_telemetry().span("analytics_snapshot"):
+        return get_analytics_snapshot(COLLECTION_NAME).ensure_fresh(client)
+
+def analytics_decade_mean_vote(client: QdrantClient, decades: List[int], live: bool = False) -> pd.DataFrame:
+    if not live:
+        return analytics_snapshot(client).decade_frame(decades)[["decade", "mean_vote", "n"]]
+    # Calcul direct : un seul scroll, limité aux champs utiles, puis agrégats vectorisés (cf. columnar.py / aggregations.py)
+    with get_telemetry().span("analytics_decades"):
+        frame = fetch_frame(client, COLLECTION_NAME, ["release_date", "vote_average"])
+        result = decade_frame_from(frame, decades)
+    return result[["decade", "mean_vote", "n"]]
+
+def analytics_distributions(client: QdrantClient) -> DistributionSketches:
+    # Histogrammes vote / popularité par décennie et par genre (cf. sketches.py), recalculés si la version change
+    state = _resource(f"sketches:{COLLECTION_NAME}", dict)
+    now = time.monotonic()
+    if "sketches" in state and now - state["checked_at"] < 30.0:
+        return state["sketches"]
+    version = collection_version(client, COLLECTION_NAME)
+    state["checked_at"] = now
+    if state.get("version") != version:
+        with get_telemetry().span("analytics_sketches"):
+            state["sketches"] = sketch_collection(client, COLLECTION_NAME)
+        state["version"] = version
+    return state["sketches"]
+
+# Classements proposés : champ trié par Qdrant (order_by), du plus grand au plus petit
+TOP_MOVIE_RANKINGS = {"popularity": "popularity", "vote_average": "vote_average", "recent": "release_date"}
+TOP_MOVIE_FIELDS = ["tmdb_id", "title", "release_date", "genres", "vote_average", "vote_count", "popularity"]
+
+def analytics_top_movies(client: QdrantClient, by: str = "popularity", n: int = 10, min_votes: int = 0, decade: Optional[int] = None, genre: Optional[str] = None, timings: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    Top `n` des films par popularité, note (avec un nombre de votes minimal)
+    ou date de sortie, éventuellement pour une décennie ou un genre. Trié côté
+    serveur (cf. qdrant_helpers.top_payloads) ; `df.attrs["mode"]` indique si
+    Qdrant a trié ("order_by") ou s'il a fallu parcourir la collection ("heap").
+    """
+    must = []
+    if genre:
+        must.append(models.FieldCondition(key="genres", match=models.MatchValue(value=genre)))
+    if decade is not None:
+        must.append(models.FieldCondition(key="release_year", range=models.Range(gte=decade, lte=decade + 9)))
+    if min_votes:
+        must.append(models.FieldCondition(key="vote_count", range=models.Range(gte=min_votes)))
+    with get_telemetry().span("top_movies", timings):
+        payloads, mode = top_payloads(client, COLLECTION_NAME, TOP_MOVIE_RANKINGS[by], n, models.Filter(must=must) if must else None, fields=TOP_MOVIE_FIELDS)
+    df = pd.DataFrame(payloads, columns=TOP_MOVIE_FIELDS)
+    df.attrs["mode"] = mode
+    return df
@@ -0,0 +1,224 @@
+"""
+Table des plus proches voisins de tout le catalogue (« films similaires »).
+
+    python components/similar.py --k 20
+    python components/similar.py --k 20 --path :memory:
+
+Les vecteurs stockés (copie locale de vector_mirror.py, reconstruite si elle
+n'est plus à jour) sont multipliés par blocs de lignes et de colonnes ; pour
+chaque film, seuls les k meilleurs voisins sont gardés. La table est écrite
+dans .cache/neighbors_<collection>/ et une recherche de voisins devient une
+simple lecture par identifiant. Une table construite sur une autre version
+de la collection n'est pas utilisée (cf. `NeighborTable.ready`).
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple
+
+import numpy as np
+
+
+def top_k_neighbors(mat: np.ndarray, k: int, block_rows: int = 1024, block_cols: int = 8192, progress=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosinus de chaque ligne de `mat` (normalisée) contre toutes les
+    autres, par produits matriciels bloc par bloc : la mémoire reste de l'ordre
+    de block_rows x (block_cols + k). Rend (indices, scores), triés par score
+    décroissant, sans la ligne elle-même.
+    """
+    n = len(mat)
+    k = max(0, min(k, n - 1))
+    out_idx = np.empty((n, k), dtype=np.int64)
+    out_scores = np.empty((n, k), dtype=np.float32)
+    if k == 0:
+        return out_idx, out_scores
+    for r0 in range(0, n, block_rows):
+        rows = np.asarray(mat[r0:r0 + block_rows], dtype=np.float32)
+        b = len(rows)
+        best_scores = np.full((b, k), -np.inf, dtype=np.float32)
+        best_idx = np.full((b, k), -1, dtype=np.int64)
+        for c0 in range(0, n, block_cols):
+            cols = np.asarray(mat[c0:c0 + block_cols], dtype=np.float32)
+            sims = rows @ cols.T
+            # Exclure le film lui-même quand le bloc de colonnes le contient
+            lo, hi = max(r0, c0), min(r0 + b, c0 + len(cols))
+            if lo < hi:
+                diag = np.arange(lo, hi)
+                sims[diag - r0, diag - c0] = -np.inf
+            cand_scores = np.concatenate([best_scores, sims], axis=1)
+            cand_idx = np.concatenate([best_idx, np.broadcast_to(np.arange(c0, c0 + len(cols)), sims.shape)], axis=1)
+            part = np.argpartition(-cand_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(cand_scores, part, axis=1)
+            best_idx = np.take_along_axis(cand_idx, part, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        out_scores[r0:r0 + b] = np.take_along_axis(best_scores, order, axis=1)
+        out_idx[r0:r0 + b] = np.take_along_axis(best_idx, order, axis=1)
+        if progress:
+            progress(min(r0 + b, n), n)
+    return out_idx, out_scores
+
+
+class NeighborState(NamedTuple):
+    """Tableaux d'un même build, publiés ensemble : une lecture ne mélange jamais deux builds."""
+    name: str
+    meta: Dict[str, Any]
+    ids: np.ndarray
+    neighbors: np.ndarray
+    scores: np.ndarray
+
+
+class NeighborTable:
+    """
+    Voisins précalculés : identifiants triés, puis pour chaque film les k
+    identifiants voisins et leurs scores (tableaux .npy mappés en mémoire).
+    Même organisation que la copie locale des vecteurs : un sous-dossier par
+    build et un fichier "current" qui pointe sur le dernier, relu au plus
+    toutes les `check_interval` s pour prendre en compte un nouveau build.
+    """
+
+    def __init__(self, collection_name: str, directory: Path, check_interval: float = 30.0):
+        self.collection_name = collection_name
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        # Lu sans verrou par `lookup` : remplacé d'un bloc, jamais modifié en place
+        self.state: Optional[NeighborState] = None
+        self._checked_at = 0.0
+        # Dernière comparaison avec la collection : (build vérifié, à jour, instant)
+        self._fresh: Tuple[Optional[str], bool, float] = (None, False, 0.0)
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        state = self.state
+        return 0 if state is None else len(state.ids)
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        state = self.state
+        return state.meta if state is not None else {}
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.meta.get("version")
+
+    def _load(self):
+        pointer = self.directory / "current"
+        self._checked_at = time.monotonic()
+        if not pointer.exists():
+            return
+        try:
+            name = pointer.read_text(encoding="utf-8").strip()
+            if self.state is not None and name == self.state.name:
+                return
+            current = self.directory / name
+            meta = json.loads((current / "meta.json").read_text(encoding="utf-8"))
+            if meta.get("collection") != self.collection_name:
+                return
+            state = NeighborState(
+                name=name,
+                meta=meta,
+                ids=np.load(current / "ids.npy", mmap_mode="r"),
+                neighbors=np.load(current / "neighbors.npy", mmap_mode="r"),
+                scores=np.load(current / "scores.npy", mmap_mode="r"),
+            )
+        except (OSError, ValueError):
+            self.state = None
+            return
+        self.state = state
+
+    def ready(self, client) -> bool:
+        """
+        Vrai si le build courant a été calculé sur la version actuelle de la
+        collection (vérifié au plus toutes les `check_interval` s, et à chaque
+        nouveau build) ; sinon ses voisins peuvent citer des films modifiés.
+        """
+        from qdrant_helpers import collection_version
+
+        state = self.state
+        if state is None:
+            return False
+        name, fresh, checked_at = self._fresh
+        now = time.monotonic()
+        if name != state.name or now - checked_at >= self.check_interval:
+            try:
+                fresh = state.meta.get("version") is not None and collection_version(client, self.collection_name) == state.meta["version"]
+            except Exception:
+                fresh = False
+            self._fresh = (state.name, fresh, now)
+        return fresh
+
+    def lookup(self, point_id: int, top_k: Optional[int] = None) -> Optional[List[Tuple[int, float]]]:
+        """[(id voisin, score)] du film, ou None s'il n'est pas dans la table."""
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.check_interval:
+                self._load()
+            state = self.state
+        if state is None or not len(state.ids):
+            return None
+        pos = int(np.searchsorted(state.ids, point_id))
+        if pos >= len(state.ids) or int(state.ids[pos]) != int(point_id):
+            return None
+        k = state.neighbors.shape[1] if top_k is None else min(top_k, state.neighbors.shape[1])
+        return [(int(i), float(s)) for i, s in zip(state.neighbors[pos, :k], state.scores[pos, :k])]
+
+    def write(self, ids: np.ndarray, vectors: np.ndarray, k: int, version: Optional[str], block_rows: int = 1024, block_cols: int = 8192, progress=None) -> Dict[str, Any]:
+        """Calcule la table pour (ids, vecteurs normalisés) et la publie comme build courant."""
+        t0 = time.perf_counter()
+        order = np.argsort(ids, kind="stable")
+        ids_sorted = np.asarray(ids, dtype=np.int64)[order]
+        idx, scores = top_k_neighbors(vectors, k, block_rows=block_rows, block_cols=block_cols, progress=progress)
+        # Lignes dans l'ordre des ids triés, voisins exprimés en identifiants de points
+        neighbor_ids = np.asarray(ids, dtype=np.int64)[idx[order]]
+        name = f"v{int(time.time() * 1000)}"
+        target = self.directory / name
+        target.mkdir(parents=True)
+        np.save(target / "ids.npy", ids_sorted)
+        np.save(target / "neighbors.npy", neighbor_ids)
+        np.save(target / "scores.npy", scores[order])
+        meta = {"collection": self.collection_name, "version": version, "k": int(idx.shape[1]), "points": int(len(ids)), "seconds": round(time.perf_counter() - t0, 2)}
+        (target / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        pointer = self.directory / "current.tmp"
+        pointer.write_text(name, encoding="utf-8")
+        with self._lock:
+            pointer.replace(self.directory / "current")
+            self._load()
+        for old in self.directory.iterdir():
+            if old.is_dir() and old.name != name:
+                shutil.rmtree(old, ignore_errors=True)
+        return meta
+
+
+def build_neighbor_table(client, collection_name: str, cache_dir: Path, k: int = 20, block_rows: int = 1024, block_cols: int = 8192, progress=None) -> Dict[str, Any]:
+    """Reconstruit la copie locale des vecteurs si besoin, puis la table de voisins."""
+    from qdrant_helpers import collection_version
+    from vector_mirror import VectorMirror
+
+    mirror = VectorMirror(collection_name, Path(cache_dir) / f"mirror_{collection_name}")
+    if mirror.version is None or mirror.version != collection_version(client, collection_name):
+        mirror.build(client)
+    state = mirror.state
+    table = NeighborTable(collection_name, Path(cache_dir) / f"neighbors_{collection_name}")
+    return table.write(state.ids, state.vectors, k, state.version, block_rows=block_rows, block_cols=block_cols, progress=progress)
+
+
+if __name__ == "__main__":
+    from qdrant_helpers import client_from_env, CACHE_DIR
+
+    parser = argparse.ArgumentParser(description="Précalcule les k plus proches voisins de chaque film (table « films similaires »).")
+    parser.add_argument("--collection", default=os.getenv("COLLECTION_NAME", "tmdb_movies"))
+    parser.add_argument("--path", default=None, help="Qdrant local (dossier ou :memory:) au lieu de QDRANT_URL")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--block-rows", type=int, default=1024)
+    parser.add_argument("--block-cols", type=int, default=8192)
+    args = parser.parse_args()
+
+    client = client_from_env(args.path)
+    meta = build_neighbor_table(
+        client, args.collection, CACHE_DIR, k=args.k, block_rows=args.block_rows, block_cols=args.block_cols,
+        progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True)
+    )
+    print(f"\n{meta['points']} films, {meta['k']} voisins chacun, {meta['seconds']}s")
@@ -0,0 +1,198 @@
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from qdrant_client import QdrantClient, models
+
+from columnar import iter_frames
+
+SKETCH_FIELDS = ["release_date", "vote_average", "popularity", "genres"]
+
+# Votes TMDB : une décimale entre 0 et 10 -> un seau de 0,1 centré sur chaque valeur possible
+VOTE_EDGES = np.round(np.arange(-0.05, 10.1, 0.1), 2)
+# Popularité : distribution à queue lourde -> seaux géométriques (+12 % par seau) de 0,001 à 10 000, plus un seau [0, 0,001)
+POPULARITY_EDGES = np.concatenate([[0.0], np.geomspace(1e-3, 1e4, 142)])
+
+
+class HistogramSketch:
+    """
+    Histogramme à bornes fixes : mémoire constante (un compteur par seau),
+    alimenté par tableaux NumPy et fusionnable avec tout histogramme de mêmes
+    bornes. Les valeurs hors bornes sont comptées à part (et bornées pour les
+    quantiles) ; min, max, somme et effectif sont exacts.
+    """
+
+    __slots__ = ("edges", "counts", "below", "above", "n", "total", "vmin", "vmax")
+
+    def __init__(self, edges: np.ndarray):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+        self.n = 0
+        self.total = 0.0
+        self.vmin = np.inf
+        self.vmax = -np.inf
+
+    def add_many(self, values: Iterable[float]):
+        arr = np.asarray(values, dtype=float)
+        arr = arr[~np.isnan(arr)]
+        if not len(arr):
+            return
+        self.n += len(arr)
+        self.total += float(arr.sum())
+        self.vmin = min(self.vmin, float(arr.min()))
+        self.vmax = max(self.vmax, float(arr.max()))
+        below = arr < self.edges[0]
+        above = arr > self.edges[-1]
+        self.below += int(below.sum())
+        self.above += int(above.sum())
+        inside = arr[~below & ~above]
+        idx = np.clip(np.searchsorted(self.edges, inside, side="right") - 1, 0, len(self.counts) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+
+    def merge(self, other: "HistogramSketch") -> "HistogramSketch":
+        if len(self.edges) != len(other.edges) or not np.allclose(self.edges, other.edges):
+            raise ValueError("Histogrammes de bornes différentes : fusion impossible.")
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+        self.n += other.n
+        self.total += other.total
+        self.vmin = min(self.vmin, other.vmin)
+        self.vmax = max(self.vmax, other.vmax)
+        return self
+
+    def copy(self) -> "HistogramSketch":
+        return HistogramSketch(self.edges).merge(self)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else np.nan
+
+    def quantile(self, q: float) -> float:
+        """Quantile q (0..1) par interpolation linéaire dans le seau, borné par min/max observés."""
+        if not self.n:
+            return np.nan
+        rank = q * self.n
+        if rank <= self.below:
+            return self.vmin
+        cum = self.below + np.cumsum(self.counts)
+        i = int(np.searchsorted(cum, rank, side="left"))
+        if i >= len(self.counts):
+            return self.vmax
+        prev = cum[i - 1] if i > 0 else self.below
+        frac = (rank - prev) / self.counts[i] if self.counts[i] else 0.0
+        value = self.edges[i] + frac * (self.edges[i + 1] - self.edges[i])
+        return float(min(max(value, self.vmin), self.vmax))
+
+    def summary(self, quantiles: Tuple[float, ...] = (0.1, 0.25, 0.5, 0.75, 0.9)) -> Dict[str, Any]:
+        row = {"n": self.n, "mean": self.mean, "min": self.vmin if self.n else np.nan, "max": self.vmax if self.n else np.nan}
+        for q in quantiles:
+            row[f"p{int(q * 100)}"] = self.quantile(q)
+        return row
+
+    def distribution(self) -> pd.DataFrame:
+        """Seaux non vides : bornes basse / haute et effectif."""
+        nz = np.flatnonzero(self.counts)
+        return pd.DataFrame({"low": self.edges[nz], "high": self.edges[nz + 1], "count": self.counts[nz]})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "edges": self.edges.tolist(), "counts": self.counts.tolist(), "below": self.below, "above": self.above,
+            "n": self.n, "total": self.total, "min": self.vmin if self.n else None, "max": self.vmax if self.n else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HistogramSketch":
+        sketch = cls(np.asarray(data["edges"], dtype=float))
+        sketch.counts = np.asarray(data["counts"], dtype=np.int64)
+        sketch.below, sketch.above, sketch.n, sketch.total = data["below"], data["above"], data["n"], data["total"]
+        sketch.vmin = data["min"] if data.get("min") is not None else np.inf
+        sketch.vmax = data["max"] if data.get("max") is not None else -np.inf
+        return sketch
+
+
+METRIC_EDGES = {"vote_average": VOTE_EDGES, "popularity": POPULARITY_EDGES}
+
+
+class DistributionSketches:
+    """
+    Histogrammes de vote_average et popularity par décennie (calendaire) et
+    par genre, alimentés page par page (DataFrames de columnar.py). La mémoire
+    ne dépend que du nombre de groupes et de seaux. Deux jeux de sketches
+    (ex. deux parcours partiels) se combinent avec `merge`.
+    """
+
+    def __init__(self):
+        self.by_decade: Dict[int, Dict[str, HistogramSketch]] = {}
+        self.by_genre: Dict[str, Dict[str, HistogramSketch]] = {}
+        self.undated: Dict[str, HistogramSketch] = self._new_group()
+        self.rows = 0
+
+    @staticmethod
+    def _new_group() -> Dict[str, HistogramSketch]:
+        return {metric: HistogramSketch(edges) for metric, edges in METRIC_EDGES.items()}
+
+    def add_frame(self, frame: pd.DataFrame):
+        """Ajoute une page (colonnes year, vote_average, popularity, genres)."""
+        if frame.empty:
+            return
+        self.rows += len(frame)
+        years = frame["year"].astype("Float64").to_numpy(dtype=float, na_value=np.nan)
+        # Même règle que les autres agrégats : une année nulle compte comme absente
+        years[years == 0] = np.nan
+        decades = np.floor(years / 10) * 10
+        values = {metric: frame[metric].to_numpy(dtype=float) for metric in METRIC_EDGES}
+
+        undated = np.isnan(decades)
+        for metric, arr in values.items():
+            self.undated[metric].add_many(arr[undated])
+        for decade in np.unique(decades[~undated]):
+            mask = decades == decade
+            group = self.by_decade.setdefault(int(decade), self._new_group())
+            for metric, arr in values.items():
+                group[metric].add_many(arr[mask])
+
+        exploded = frame[["genres", *METRIC_EDGES]].assign(
+            genres=frame["genres"].map(lambda gs: [g for g in (gs or []) if isinstance(g, str) and g])
+        ).explode("genres")
+        exploded = exploded[exploded["genres"].notna()]
+        for genre, part in exploded.groupby("genres", sort=False):
+            group = self.by_genre.setdefault(genre, self._new_group())
+            for metric in METRIC_EDGES:
+                group[metric].add_many(part[metric].to_numpy(dtype=float))
+
+    def merge(self, other: "DistributionSketches") -> "DistributionSketches":
+        for target, source in ((self.by_decade, other.by_decade), (self.by_genre, other.by_genre)):
+            for key, group in source.items():
+                mine = target.setdefault(key, self._new_group())
+                for metric, sketch in group.items():
+                    mine[metric].merge(sketch)
+        for metric, sketch in other.undated.items():
+            self.undated[metric].merge(sketch)
+        self.rows += other.rows
+        return self
+
+    def overall(self, metric: str) -> HistogramSketch:
+        """Toute la collection : fusion des décennies (partition des films datés) et des films sans date."""
+        total = self.undated[metric].copy()
+        for group in self.by_decade.values():
+            total.merge(group[metric])
+        return total
+
+    def summary_frame(self, metric: str, by: str = "decade", keys: Optional[List[Any]] = None) -> pd.DataFrame:
+        """Effectif, moyenne, min/max et percentiles de `metric` par décennie ou par genre."""
+        groups = self.by_decade if by == "decade" else self.by_genre
+        keys = sorted(groups) if keys is None else keys
+        rows = [{by: k, **groups[k][metric].summary()} for k in keys if k in groups]
+        columns = [by, "n", "mean", "min", "p10", "p25", "p50", "p75", "p90", "max"]
+        return pd.DataFrame(rows, columns=columns)
+
+
+def sketch_collection(client: QdrantClient, collection_name: str, filter_: Optional[models.Filter] = None, page_size: int = 2000) -> DistributionSketches:
+    """Un parcours de la collection (champs utiles seulement), page par page."""
+    sketches = DistributionSketches()
+    for frame in iter_frames(client, collection_name, SKETCH_FIELDS, filter_, page_size):
+        sketches.add_frame(frame)
+    return sketches
@@ -0,0 +1,167 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+
+class LatencyHistogram:
+    """
+    Histogramme à seaux logarithmiques (0,1 ms -> ~100 s, +10 % par seau) :
+    mémoire fixe quel que soit le nombre de mesures, percentiles à ~5 % près.
+    """
+
+    MIN_MS = 0.1
+    GROWTH = 1.1
+    BUCKETS = 146  # 0.1 * 1.1**145 ≈ 100 s
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def _bucket(self, ms: float) -> int:
+        if ms <= self.MIN_MS:
+            return 0
+        return min(self.BUCKETS - 1, int(math.log(ms / self.MIN_MS, self.GROWTH)) + 1)
+
+    def add(self, ms: float):
+        self.counts[self._bucket(ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Borne haute du seau contenant le q-ième percentile (q entre 0 et 100)."""
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(self.total * q / 100.0))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self.MIN_MS * self.GROWTH ** i, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.total,
+            "mean_ms": self.sum_ms / self.total if self.total else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms if self.total else None,
+        }
+
+
+class Telemetry:
+    """
+    Mesures de l'application : temps par étape (embedding, qdrant, post_filter,
+    posters, render, search_total...) dans des histogrammes bornés, et journal
+    d'événements (recherches, analytics) gardé en mémoire et ajouté à un fichier
+    JSONL tournant. Au démarrage, le journal est relu pour retrouver l'historique.
+    """
+
+    def __init__(self, log_path: Optional[Path] = None, max_events: int = 500, max_log_bytes: int = 5 * 1024 * 1024):
+        self.log_path = Path(log_path) if log_path else None
+        self.max_log_bytes = max_log_bytes
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.events: deque = deque(maxlen=max_events)
+        self.daily_counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._replay()
+
+    # ---- Mesures
+    def observe(self, stage: str, ms: float):
+        with self._lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = LatencyHistogram()
+            hist.add(ms)
+
+    @contextmanager
+    def span(self, stage: str, timings: Optional[Dict[str, float]] = None):
+        """Chronomètre un bloc ; la durée (ms) est ajoutée à l'histogramme et à `timings` si fourni."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            self.observe(stage, ms)
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + ms
+
+    def stage_summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {stage: h.summary() for stage, h in sorted(self.histograms.items())}
+
+    # ---- Événements
+    def record_event(self, action: str, details: str = "", results: Optional[int] = None, timings: Optional[Dict[str, float]] = None, persist: bool = True):
+        event = {
+            "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "action": action,
+            "details": details,
+            "results": results,
+            "timings": {k: round(v, 2) for k, v in (timings or {}).items()},
+        }
+        with self._lock:
+            self._remember(event)
+        if persist:
+            self._append(event)
+
+    def _remember(self, event: Dict[str, Any]):
+        self.events.append(event)
+        day = event["ts"][:10]
+        per_day = self.daily_counts.setdefault(day, {})
+        per_day[event["action"]] = per_day.get(event["action"], 0) + 1
+        # On ne garde que les 30 derniers jours de compteurs
+        if len(self.daily_counts) > 30:
+            for old in sorted(self.daily_counts)[:-30]:
+                del self.daily_counts[old]
+
+    def recent_events(self, n: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.events)[-n:][::-1]
+
+    def count_for_day(self, action: str, days_ago: int = 0) -> int:
+        day = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+        with self._lock:
+            return self.daily_counts.get(day, {}).get(action, 0)
+
+    # ---- Persistance
+    def _append(self, event: Dict[str, Any]):
+        if not self.log_path:
+            return
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                if self.log_path.exists() and self.log_path.stat().st_size > self.max_log_bytes:
+                    self.log_path.replace(self.log_path.with_suffix(self.log_path.suffix + ".1"))
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+
+    def _replay(self):
+        if not self.log_path:
+            return
+        for path in (self.log_path.with_suffix(self.log_path.suffix + ".1"), self.log_path):
+            if not path.exists():
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._remember(event)
+                        for stage, ms in (event.get("timings") or {}).items():
+                            self.observe(stage, float(ms))
+            except OSError:
+                continue
@@ -0,0 +1,149 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import List, Dict, Optional, Tuple, NamedTuple
+
+from qdrant_client import QdrantClient
+
+from qdrant_helpers import collection_version, iter_payload_pages, to_year
+
+TITLE_FIELDS = ["tmdb_id", "title", "genres", "release_date", "popularity"]
+
+# Ligatures que la décomposition Unicode ne sépare pas
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae"})
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def fold_title(text: str) -> str:
+    """Forme de comparaison : minuscules, ponctuation et espaces normalisés (accents conservés)."""
+    text = unicodedata.normalize("NFKC", str(text or "")).translate(_LIGATURES).casefold()
+    return _NON_WORD.sub(" ", text).strip()
+
+def normalize_title(text: str) -> str:
+    """Forme sans accents de `fold_title` (« Amélie » et « amelie » -> "amelie")."""
+    decomposed = unicodedata.normalize("NFKD", fold_title(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class TitleState(NamedTuple):
+    """Contenu d'un build de l'index, publié d'un bloc : une recherche ne mélange jamais deux builds."""
+    version: str
+    built_at: float
+    ids: List[int]
+    folded: List[str]
+    genres: List[List[str]]
+    years: List[Optional[int]]
+    popularity: List[float]
+    exact: Dict[str, List[int]]
+    keys: List[str]
+
+
+class TitleIndex:
+    """
+    Index des titres en mémoire, pour répondre sans embedding quand la requête
+    est un titre : correspondance exacte (sans accents ni ponctuation) par
+    dictionnaire, et par préfixe grâce aux titres normalisés triés (recherche
+    dichotomique de l'intervalle des clés qui commencent par la requête, rôle
+    d'un trie sans son coût mémoire). Reconstruit quand la version de la
+    collection change (vérifiée au plus toutes les `check_interval` s).
+    """
+
+    def __init__(self, collection_name: str, check_interval: float = 30.0, page_size: int = 2000, min_prefix: int = 3, max_prefix: int = 20):
+        self.collection_name = collection_name
+        self.check_interval = check_interval
+        self.page_size = page_size
+        self.min_prefix = min_prefix
+        self.max_prefix = max_prefix
+        # Lu sans verrou par `lookup` : remplacé d'un bloc, jamais modifié en place
+        self.state: Optional[TitleState] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        state = self.state
+        return 0 if state is None else len(state.ids)
+
+    @property
+    def version(self) -> Optional[str]:
+        state = self.state
+        return state.version if state is not None else None
+
+    def get(self, client: QdrantClient) -> "TitleIndex":
+        """Rend l'index, après l'avoir reconstruit si la collection a changé."""
+        with self._lock:
+            now = time.monotonic()
+            if self.version is not None and now - self._checked_at < self.check_interval:
+                return self
+            version = collection_version(client, self.collection_name)
+            self._checked_at = now
+            if version != self.version:
+                self._build(client, version)
+            return self
+
+    def _build(self, client: QdrantClient, version: str):
+        ids, folded, genres, years, popularity = [], [], [], [], []
+        exact: Dict[str, List[int]] = {}
+        for page in iter_payload_pages(client, self.collection_name, page_size=self.page_size, fields=TITLE_FIELDS):
+            for p in page:
+                title = p.get("title")
+                if not title or p.get("tmdb_id") is None:
+                    continue
+                row = len(ids)
+                ids.append(int(p["tmdb_id"]))
+                folded.append(fold_title(title))
+                genres.append([g for g in (p.get("genres") or []) if isinstance(g, str)])
+                years.append(to_year(p.get("release_date")))
+                popularity.append(float(p.get("popularity") or 0.0))
+                exact.setdefault(normalize_title(title), []).append(row)
+        # Une clé par titre normalisé distinct ; les homonymes partagent la clé
+        self.state = TitleState(
+            version=version, built_at=time.time(), ids=ids, folded=folded, genres=genres,
+            years=years, popularity=popularity, exact=exact, keys=sorted(exact),
+        )
+
+    @staticmethod
+    def _keep(state: TitleState, row: int, genres: List[str], year_min: Optional[int], year_max: Optional[int]) -> bool:
+        # Mêmes règles que la recherche : genres en OU, années bornes incluses (film sans date exclu)
+        if genres and not set(genres).intersection(state.genres[row]):
+            return False
+        y = state.years[row]
+        if year_min is not None and (y is None or y < year_min):
+            return False
+        if year_max is not None and (y is None or y > year_max):
+            return False
+        return True
+
+    def lookup(self, query: str, top_k: int, genres: Optional[List[str]] = None, year_min: Optional[int] = None, year_max: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        [(id, "exact" | "prefix")] des films dont le titre est la requête, puis
+        de ceux dont le titre commence par elle. Exacts : orthographe identique
+        (accents compris) d'abord, puis par popularité ; préfixes par
+        popularité, ignorés s'il y en a plus de `max_prefix` (requête trop vague).
+        """
+        state = self.state
+        key = normalize_title(query)
+        if state is None or not key:
+            return []
+        genres = genres or []
+        folded = fold_title(query)
+        exact = [r for r in state.exact.get(key, []) if self._keep(state, r, genres, year_min, year_max)]
+        exact.sort(key=lambda r: (state.folded[r] != folded, -state.popularity[r]))
+        out = [(state.ids[r], "exact") for r in exact[:top_k]]
+        if len(out) >= top_k or len(key) < self.min_prefix:
+            return out
+
+        lo = bisect_left(state.keys, key)
+        hi = bisect_left(state.keys, key + "\uffff")
+        prefix: List[int] = []
+        for i in range(lo, hi):
+            k = state.keys[i]
+            if k == key:
+                continue
+            prefix.extend(r for r in state.exact[k] if self._keep(state, r, genres, year_min, year_max))
+            if len(prefix) > self.max_prefix:
+                return out
+        prefix.sort(key=lambda r: -state.popularity[r])
+        out.extend((state.ids[r], "prefix") for r in prefix[:top_k - len(out)])
+        return out
@@ -0,0 +1,229 @@
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, NamedTuple
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from qdrant_helpers import to_year, collection_version
+
+# Sous-ensemble du payload gardé localement (ce qu'affichent les cartes de résultats)
+MIRROR_FIELDS = ["tmdb_id", "title", "genres", "release_date", "release_year", "vote_average", "popularity"]
+
+
+class MirrorState(NamedTuple):
+    """Tableaux d'un même build, publiés ensemble (une seule affectation) : une recherche ne mélange jamais deux builds."""
+    version: Optional[str]
+    ids: np.ndarray
+    vectors: np.ndarray
+    years: np.ndarray
+    genre_matrix: np.ndarray
+    genre_index: Dict[str, int]
+    payloads: List[Dict[str, Any]]
+
+
+class VectorMirror:
+    """
+    Copie locale de la collection pour la recherche : vecteurs normalisés dans
+    une matrice float32 mappée en mémoire, années et genres en tableaux NumPy
+    (filtres = masques booléens), payloads réduits en JSON. La copie est taguée
+    avec la version de la collection ; si elle ne correspond plus, `ready()`
+    renvoie False (l'appelant repasse par Qdrant) et une reconstruction est
+    lancée en arrière-plan.
+    """
+
+    def __init__(self, collection_name: str, directory: Path, check_interval: float = 30.0, page_size: int = 1000):
+        self.collection_name = collection_name
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self.page_size = page_size
+        # Lu sans verrou par les recherches : remplacé d'un bloc, jamais modifié en place
+        self.state: Optional[MirrorState] = None
+        self._fresh = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._load()
+
+    def __len__(self) -> int:
+        state = self.state
+        return 0 if state is None else len(state.ids)
+
+    # Accès en lecture (un seul attribut ; lire `state` une fois pour plusieurs tableaux cohérents)
+    @property
+    def version(self) -> Optional[str]:
+        state = self.state
+        return state.version if state is not None else None
+
+    @property
+    def ids(self) -> Optional[np.ndarray]:
+        state = self.state
+        return state.ids if state is not None else None
+
+    # ---- Synchronisation
+    def ready(self, client: QdrantClient) -> bool:
+        """Vrai si la copie locale correspond à la collection (vérifié au plus toutes les `check_interval` s)."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            try:
+                state = self.state
+                self._fresh = state is not None and collection_version(client, self.collection_name) == state.version
+            except Exception:
+                self._fresh = False
+            if not self._fresh:
+                self.rebuild_async(client)
+        return self._fresh
+
+    def rebuild_async(self, client: QdrantClient):
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(target=self._rebuild_quietly, args=(client,), name="vector-mirror", daemon=True)
+            self._rebuild_thread.start()
+
+    def _rebuild_quietly(self, client: QdrantClient):
+        try:
+            self.build(client)
+        except Exception:
+            pass
+
+    def build(self, client: QdrantClient):
+        """Télécharge vecteurs + payloads réduits, écrit les fichiers puis les recharge."""
+        version = collection_version(client, self.collection_name)
+        ids: List[int] = []
+        vectors: List[List[float]] = []
+        payloads: List[Dict[str, Any]] = []
+        next_offset = None
+        while True:
+            points, next_offset = client.scroll(
+                collection_name=self.collection_name,
+                with_vectors=True,
+                with_payload=MIRROR_FIELDS,
+                limit=self.page_size,
+                offset=next_offset
+            )
+            for p in points:
+                ids.append(p.id)
+                vectors.append(p.vector)
+                payloads.append(p.payload or {})
+            if not points or next_offset is None:
+                break
+
+        mat = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        mat /= np.where(norms == 0, 1, norms)
+        years = np.array([
+            p.get("release_year") if isinstance(p.get("release_year"), int) else (to_year(p.get("release_date")) or -1)
+            for p in payloads
+        ], dtype=np.int32)
+        vocab = sorted({g for p in payloads for g in (p.get("genres") or []) if isinstance(g, str) and g})
+        index = {g: i for i, g in enumerate(vocab)}
+        genre_matrix = np.zeros((len(payloads), len(vocab)), dtype=bool)
+        for row, p in enumerate(payloads):
+            for g in p.get("genres") or []:
+                if g in index:
+                    genre_matrix[row, index[g]] = True
+
+        # Chaque build va dans son propre sous-dossier ; le fichier "current" pointe sur le dernier
+        # (un ancien fichier encore mappé en mémoire n'est jamais écrasé)
+        name = f"v{int(time.time() * 1000)}"
+        tmp = self.directory / name
+        tmp.mkdir(parents=True)
+        np.save(tmp / "vectors.npy", mat)
+        np.save(tmp / "ids.npy", np.asarray(ids, dtype=np.int64))
+        np.save(tmp / "years.npy", years)
+        np.save(tmp / "genres.npy", genre_matrix)
+        (tmp / "payloads.json").write_text(json.dumps(payloads, ensure_ascii=False), encoding="utf-8")
+        (tmp / "meta.json").write_text(json.dumps({"collection": self.collection_name, "version": version, "genres": vocab}, ensure_ascii=False), encoding="utf-8")
+        pointer = self.directory / "current.tmp"
+        pointer.write_text(name, encoding="utf-8")
+        with self._lock:
+            pointer.replace(self.directory / "current")
+            self._load()
+            self._fresh = True
+            self._checked_at = time.monotonic()
+        for old in self.directory.iterdir():
+            if old.is_dir() and old.name != name:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def _load(self):
+        pointer = self.directory / "current"
+        if not pointer.exists():
+            return
+        try:
+            current = self.directory / pointer.read_text(encoding="utf-8").strip()
+            meta = json.loads((current / "meta.json").read_text(encoding="utf-8"))
+            if meta.get("collection") != self.collection_name:
+                return
+            state = MirrorState(
+                version=meta.get("version"),
+                ids=np.load(current / "ids.npy"),
+                vectors=np.load(current / "vectors.npy", mmap_mode="r"),
+                years=np.load(current / "years.npy"),
+                genre_matrix=np.load(current / "genres.npy"),
+                genre_index={g: i for i, g in enumerate(meta.get("genres") or [])},
+                payloads=json.loads((current / "payloads.json").read_text(encoding="utf-8")),
+            )
+        except (OSError, ValueError):
+            self.state = None
+            return
+        self.state = state
+
+    # ---- Recherche
+    @staticmethod
+    def filter_mask(state: MirrorState, genres: Optional[List[str]], year_min: Optional[int], year_max: Optional[int]) -> Optional[np.ndarray]:
+        """Masque booléen des points admissibles de `state` (None = pas de filtre)."""
+        mask = None
+        if genres:
+            cols = [state.genre_index[g] for g in genres if g in state.genre_index]
+            mask = state.genre_matrix[:, cols].any(axis=1) if cols else np.zeros(len(state.ids), dtype=bool)
+        if year_min is not None or year_max is not None:
+            ym = state.years >= 0
+            if year_min is not None:
+                ym &= state.years >= year_min
+            if year_max is not None:
+                ym &= state.years <= year_max
+            mask = ym if mask is None else mask & ym
+        return mask
+
+    def search(self, qvec: List[float], top_k: int, genres: Optional[List[str]] = None, year_min: Optional[int] = None, year_max: Optional[int] = None, offset: int = 0) -> List[models.ScoredPoint]:
+        """Top-k cosinus par produit matriciel, mêmes filtres, même ordre et même `offset` que `client.search`."""
+        return self._search(self.state, qvec, top_k, genres, year_min, year_max, offset)
+
+    def _search(self, state: Optional[MirrorState], qvec: List[float], top_k: int, genres: Optional[List[str]] = None, year_min: Optional[int] = None, year_max: Optional[int] = None, offset: int = 0) -> List[models.ScoredPoint]:
+        if state is None or len(state.ids) == 0:
+            return []
+        q = np.asarray(qvec, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm > 0:
+            q = q / norm
+        scores = state.vectors @ q
+        mask = self.filter_mask(state, genres, year_min, year_max)
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+        if len(candidates) == 0:
+            return []
+        cand_scores = scores[candidates]
+        k = min(offset + top_k, len(candidates))
+        if k <= offset:
+            return []
+        top = np.argpartition(-cand_scores, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        top = top[np.argsort(-cand_scores[top], kind="stable")][offset:]
+        return [
+            models.ScoredPoint(id=int(state.ids[candidates[i]]), version=0, score=float(cand_scores[i]), payload=state.payloads[candidates[i]], vector=None)
+            for i in top
+        ]
+
+    def similar(self, point_id: int, top_k: int) -> Optional[List[models.ScoredPoint]]:
+        """Voisins d'un film à partir de son vecteur local (None si le film n'est pas dans la copie)."""
+        state = self.state
+        if state is None:
+            return None
+        rows = np.flatnonzero(state.ids == int(point_id))
+        if not len(rows):
+            return None
+        hits = self._search(state, state.vectors[rows[0]], top_k + 1)
+        return [h for h in hits if h.id != int(point_id)][:top_k]